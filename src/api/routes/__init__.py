@@ -9,6 +9,10 @@ from .notifications_routes import notifications_bp
 from .brewfather_routes import brewfather_bp
 from .register import register_bp 
 from .dashboard_routes import dashboard_bp
+from .fermentacao_routes import fermentacao_bp
+from .alertas_routes import alertas_bp
+from .ispindel_routes import ispindel_bp
+from .sessoes_routes import sessoes_bp
 
 
 # Lista de todos os blueprints para facilitar o registro
@@ -22,5 +26,9 @@ all_blueprints = [
     notifications_bp,
     brewfather_bp,
     register_bp,
-    dashboard_bp
+    dashboard_bp,
+    fermentacao_bp,
+    alertas_bp,
+    ispindel_bp,
+    sessoes_bp
 ]
\ No newline at end of file
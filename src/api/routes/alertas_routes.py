@@ -0,0 +1,130 @@
+# routes/alertas_routes.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from model.regras_alerta import RegraAlerta, DisparoRegra, motor_regras
+from db.database import db
+
+
+alertas_bp = Blueprint('alertas', __name__)
+
+@alertas_bp.route('/alertas/regras', methods=['GET'])
+@login_required
+def get_regras_alerta():
+    """Listar regras de alerta (filtros: dispositivo_id, sessao_id)"""
+    try:
+        query = RegraAlerta.query
+        
+        dispositivo_id = request.args.get('dispositivo_id', type=int)
+        if dispositivo_id:
+            query = query.filter_by(dispositivo_id=dispositivo_id)
+        sessao_id = request.args.get('sessao_id', type=int)
+        if sessao_id:
+            query = query.filter_by(sessao_brasagem_id=sessao_id)
+        
+        return jsonify([regra.to_dict() for regra in query.order_by(RegraAlerta.id).all()]), 200
+    except Exception as e:
+        print(f"Erro ao buscar regras de alerta: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@alertas_bp.route('/alertas/regras', methods=['POST'])
+@login_required
+def create_regra_alerta():
+    """Criar regra de alerta"""
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('nome') or not data.get('tipo'):
+            return jsonify({'error': 'Campos nome e tipo são obrigatórios'}), 400
+        
+        parametros = data.get('parametros', {})
+        erro = RegraAlerta.validar(data['tipo'], data.get('campo'), parametros)
+        if erro:
+            return jsonify({'error': erro}), 400
+        
+        user_id = data.get('user_id') or getattr(current_user, 'id', None)
+        if not user_id:
+            return jsonify({'error': 'Campo user_id é obrigatório'}), 400
+        
+        regra = RegraAlerta(
+            nome=data['nome'],
+            tipo=data['tipo'],
+            campo=data.get('campo'),
+            parametros=parametros,
+            dispositivo_id=data.get('dispositivo_id'),
+            sessao_brasagem_id=data.get('sessao_brasagem_id'),
+            user_id=user_id,
+            cooldown_segundos=data.get('cooldown_segundos', 3600),
+            ativo=data.get('ativo', True)
+        )
+        db.session.add(regra)
+        db.session.commit()
+        motor_regras.recarregar()
+        
+        return jsonify({
+            'message': 'Regra criada com sucesso',
+            'regra': regra.to_dict()
+        }), 201
+        
+    except Exception as e:
+        print(f"Erro ao criar regra de alerta: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@alertas_bp.route('/alertas/regras/<int:regra_id>', methods=['PUT'])
+@login_required
+def update_regra_alerta(regra_id):
+    """Atualizar regra de alerta"""
+    try:
+        regra = db.session.get(RegraAlerta, regra_id)
+        
+        if not regra:
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        
+        data = request.get_json() or {}
+        
+        tipo = data.get('tipo', regra.tipo)
+        campo = data.get('campo', regra.campo)
+        parametros = data.get('parametros', regra.parametros)
+        erro = RegraAlerta.validar(tipo, campo, parametros)
+        if erro:
+            return jsonify({'error': erro}), 400
+        
+        regra.tipo, regra.campo, regra.parametros = tipo, campo, parametros
+        for campo_regra in ('nome', 'dispositivo_id', 'sessao_brasagem_id', 'cooldown_segundos', 'ativo'):
+            if campo_regra in data:
+                setattr(regra, campo_regra, data[campo_regra])
+        
+        db.session.commit()
+        motor_regras.recarregar()
+        
+        return jsonify({
+            'message': 'Regra atualizada com sucesso',
+            'regra': regra.to_dict()
+        }), 200
+        
+    except Exception as e:
+        print(f"Erro ao atualizar regra de alerta {regra_id}: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@alertas_bp.route('/alertas/regras/<int:regra_id>', methods=['DELETE'])
+@login_required
+def delete_regra_alerta(regra_id):
+    """Deletar regra de alerta"""
+    try:
+        regra = db.session.get(RegraAlerta, regra_id)
+        
+        if not regra:
+            return jsonify({'error': 'Regra não encontrada'}), 404
+        
+        DisparoRegra.query.filter_by(regra_id=regra_id).delete(synchronize_session=False)
+        db.session.delete(regra)
+        db.session.commit()
+        motor_regras.recarregar()
+        
+        return jsonify({'message': 'Regra deletada com sucesso'}), 200
+        
+    except Exception as e:
+        print(f"Erro ao deletar regra de alerta {regra_id}: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -34,25 +34,29 @@ def get_brewfather_status():
     
     return jsonify(status)
 
+def _full_sync():
+    """?full=true regrava todos os itens, mesmo os que não mudaram"""
+    return request.args.get('full', '').lower() == 'true'
+
 @brewfather_bp.route('/brewfather/sync/recipes', methods=['POST'])
 @login_required
 def sync_recipes():
     """Sincroniza receitas do BrewFather"""
-    result = BrewFatherService.sync_recipes()
+    result = BrewFatherService.sync_recipes(force=_full_sync())
     return jsonify(result)
 
 @brewfather_bp.route('/brewfather/sync/batches', methods=['POST'])
 @login_required
 def sync_batches():
     """Sincroniza lotes do BrewFather"""
-    result = BrewFatherService.sync_batches()
+    result = BrewFatherService.sync_batches(force=_full_sync())
     return jsonify(result)
 
 @brewfather_bp.route('/brewfather/sync/inventory', methods=['POST'])
 @login_required
 def sync_inventory():
     """Sincroniza estoque do BrewFather"""
-    result = BrewFatherService.sync_inventory()
+    result = BrewFatherService.sync_inventory(force=_full_sync())
     return jsonify(result)
 
 @brewfather_bp.route('/brewfather/sync/all', methods=['POST'])
@@ -63,14 +67,16 @@ def sync_all():
     
     print("Iniciando sincronização completa com BrewFather...")
     
+    force = _full_sync()
+    
     # Sincronizar receitas
-    results['recipes'] = BrewFatherService.sync_recipes()
+    results['recipes'] = BrewFatherService.sync_recipes(force=force)
     
     # Sincronizar lotes
-    results['batches'] = BrewFatherService.sync_batches()
+    results['batches'] = BrewFatherService.sync_batches(force=force)
     
     # Sincronizar estoque
-    results['inventory'] = BrewFatherService.sync_inventory()
+    results['inventory'] = BrewFatherService.sync_inventory(force=force)
     
     print("Sincronização completa com BrewFather finalizada.")
     
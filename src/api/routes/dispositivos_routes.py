@@ -1,30 +1,116 @@
 # routes/dispositivos_routes.py
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from sqlalchemy import func
-from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao, StatusDispositivo, HistoricoDispositivo
+from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao, StatusDispositivo, HistoricoDispositivo, ExclusaoDispositivo
+from model.ingestao import IngestaoService, MAX_LEITURAS_POR_LOTE
+from model.agregados import HistoricoAgregado, RESOLUCOES, escolher_resolucao, reconstruir_agregados, recalcular_intervalo
+from model.exclusao_dispositivos import expurgo_dispositivos
+from model.cache_leituras import cache_leituras
+from model.campos_leitura import HistoricoCampo, registro_campos
+from model.hub_eventos import hub_eventos, POLITICAS_BUFFER, POLITICA_DESCARTAR_ANTIGOS
+from utils.calibracao import validar_parametros
 from db.database import db
     
 
 dispositivos_bp = Blueprint('dispositivos', __name__)
 
+# Tamanho máximo de página na paginação por cursor do histórico
+MAX_REGISTROS_POR_PAGINA = 5000
+
+# Colunas numéricas do histórico disponíveis como séries para gráficos
+SERIES_HISTORICO = ('temperatura', 'gravidade', 'pressao', 'bateria', 'qualidade_sinal')
+
+# Limites da consulta de séries alinhadas (várias séries em uma grade comum)
+MAX_INTERVALOS_ALINHADOS = 20000
+MAX_DISPOSITIVOS_ALINHADOS = 20
+PREENCHIMENTOS = ('nenhum', 'anterior')
+
+# Limites do stream SSE: buffer por cliente e intervalo de keep-alive (segundos)
+MAX_BUFFER_STREAM = 1000
+INTERVALO_KEEPALIVE_STREAM = 15
+
+# Colunas do histórico na exportação (dados é incluído sob demanda)
+COLUNAS_EXPORTACAO = (
+    'id', 'dispositivo_id', 'timestamp', 'temperatura', 'gravidade',
+    'pressao', 'unidade', 'qualidade_sinal', 'bateria'
+)
+
 @dispositivos_bp.route('/dispositivos', methods=['GET'])
 @login_required
 def get_dispositivos():
     """Obter lista de dispositivos"""
     try:
-        dispositivos = Dispositivo.query.all()
-        return jsonify([dispositivo.to_dict() for dispositivo in dispositivos]), 200
+        dispositivos = Dispositivo.visiveis().all()
+        return jsonify([cache_leituras.aplicar(dispositivo.to_dict()) for dispositivo in dispositivos]), 200
     except Exception as e:
         print(f"Erro ao buscar dispositivos: {e}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@dispositivos_bp.route('/dispositivos/live', methods=['GET'])
+@login_required
+def get_dispositivos_live():
+    """Últimos valores de todos os dispositivos, servidos do cache em memória"""
+    try:
+        return jsonify(cache_leituras.todos()), 200
+    except Exception as e:
+        print(f"Erro ao buscar leituras ao vivo: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+def _formatar_sse(evento, dados, id_evento=None):
+    linhas = f'id: {id_evento}\n' if id_evento is not None else ''
+    return linhas + f'event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n'
+
+@dispositivos_bp.route('/dispositivos/stream', methods=['GET'])
+@login_required
+def stream_dispositivos():
+    """Stream SSE de novas leituras e mudanças de status (filtros: dispositivo_id, sessao_id)"""
+    try:
+        dispositivo_ids = [int(i) for i in request.args.get('dispositivo_id', '').split(',') if i.strip()]
+        sessao_id = request.args.get('sessao_id', type=int)
+        tamanho_buffer = min(request.args.get('buffer', 256, type=int), MAX_BUFFER_STREAM)
+        politica = request.args.get('politica', POLITICA_DESCARTAR_ANTIGOS)
+    except ValueError:
+        return jsonify({'error': 'Parâmetro dispositivo_id inválido'}), 400
+
+    if politica not in POLITICAS_BUFFER:
+        return jsonify({'error': f'Política inválida. Use: {", ".join(POLITICAS_BUFFER)}'}), 400
+    if tamanho_buffer < 1:
+        return jsonify({'error': 'Parâmetro buffer deve ser positivo'}), 400
+
+    assinatura = hub_eventos.assinar(dispositivo_ids, sessao_id, tamanho_buffer, politica)
+
+    def gerar():
+        descartados = 0
+        yield 'retry: 3000\n\n'
+        while True:
+            eventos = assinatura.aguardar(INTERVALO_KEEPALIVE_STREAM)
+            if assinatura.descartados > descartados:
+                # Avisa o cliente de que perdeu eventos e deve ressincronizar (ex.: /dispositivos/live)
+                yield _formatar_sse('descartados', {'descartados': assinatura.descartados - descartados})
+                descartados = assinatura.descartados
+            for evento in eventos:
+                yield _formatar_sse(evento['tipo'], evento['dados'], evento['id'])
+            if assinatura.encerrada:
+                yield _formatar_sse('encerrado', {'motivo': 'buffer cheio'})
+                break
+            if not eventos:
+                yield ': keep-alive\n\n'
+
+    response = Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(lambda: hub_eventos.cancelar(assinatura))
+    return response
+
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>', methods=['GET'])
 @login_required
 def get_dispositivo(dispositivo_id):
     """Obter dispositivo específico por ID"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -90,7 +176,7 @@ def create_dispositivo():
 def update_dispositivo(dispositivo_id):
     """Atualizar dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -135,32 +221,62 @@ def update_dispositivo(dispositivo_id):
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>', methods=['DELETE'])
 @login_required
 def delete_dispositivo(dispositivo_id):
-    """Deletar dispositivo"""
+    """Deletar dispositivo: oculta na hora e remove o histórico em segundo plano"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
-            
-        # Deletar histórico associado primeiro
-        HistoricoDispositivo.query.filter_by(dispositivo_id=dispositivo_id).delete()
         
-        db.session.delete(dispositivo)
-        db.session.commit()
+        exclusao = expurgo_dispositivos.agendar(dispositivo, getattr(current_user, 'username', None))
+        expurgo_dispositivos.iniciar(current_app._get_current_object())
         
-        return jsonify({'message': 'Dispositivo deletado com sucesso'}), 200
+        return jsonify({
+            'message': 'Exclusão do dispositivo agendada',
+            'exclusao': exclusao.to_dict()
+        }), 202
         
     except Exception as e:
         print(f"Erro ao deletar dispositivo {dispositivo_id}: {e}")
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@dispositivos_bp.route('/dispositivos/exclusoes', methods=['GET'])
+@login_required
+def get_exclusoes_dispositivos():
+    """Progresso das exclusões de dispositivos"""
+    try:
+        query = ExclusaoDispositivo.query
+        status = request.args.get('status')
+        if status:
+            query = query.filter_by(status=status)
+        exclusoes = query.order_by(ExclusaoDispositivo.id.desc()).limit(100).all()
+        return jsonify([exclusao.to_dict() for exclusao in exclusoes]), 200
+    except Exception as e:
+        print(f"Erro ao buscar exclusões de dispositivos: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@dispositivos_bp.route('/dispositivos/exclusoes/<int:exclusao_id>', methods=['GET'])
+@login_required
+def get_exclusao_dispositivo(exclusao_id):
+    """Progresso de uma exclusão de dispositivo"""
+    try:
+        exclusao = db.session.get(ExclusaoDispositivo, exclusao_id)
+        
+        if not exclusao:
+            return jsonify({'error': 'Exclusão não encontrada'}), 404
+        
+        return jsonify(exclusao.to_dict()), 200
+    except Exception as e:
+        print(f"Erro ao buscar exclusão {exclusao_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/status', methods=['POST'])
 @login_required
 def atualizar_status_dispositivo(dispositivo_id):
     """Atualizar status do dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -177,7 +293,7 @@ def atualizar_status_dispositivo(dispositivo_id):
         
         return jsonify({
             'message': 'Status atualizado com sucesso',
-            'dispositivo': dispositivo.to_dict()
+            'dispositivo': cache_leituras.aplicar(dispositivo.to_dict())
         }), 200
         
     except ValueError as e:
@@ -191,7 +307,7 @@ def atualizar_status_dispositivo(dispositivo_id):
 def calibrar_dispositivo(dispositivo_id):
     """Calibrar dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -202,6 +318,11 @@ def calibrar_dispositivo(dispositivo_id):
             return jsonify({'error': 'Parâmetros de calibração são obrigatórios'}), 400
             
         parametros_calibracao = data['parametros_calibracao']
+        if isinstance(parametros_calibracao, dict) and 'polinomio' in parametros_calibracao:
+            erro = validar_parametros(parametros_calibracao)
+            if erro:
+                return jsonify({'error': erro}), 400
+            
         dispositivo.calibrar(parametros_calibracao)
         
         return jsonify({
@@ -234,7 +355,7 @@ def get_dispositivos_ativos():
     """Obter dispositivos ativos"""
     try:
         dispositivos = Dispositivo.get_ativos()
-        return jsonify([dispositivo.to_dict() for dispositivo in dispositivos]), 200
+        return jsonify([cache_leituras.aplicar(dispositivo.to_dict()) for dispositivo in dispositivos]), 200
     except Exception as e:
         print(f"Erro ao buscar dispositivos ativos: {e}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -262,7 +383,7 @@ def get_historico_dispositivo(dispositivo_id):
     """Obter histórico de um dispositivo"""
     try:
         # Verificar se dispositivo existe
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
         
@@ -271,6 +392,18 @@ def get_historico_dispositivo(dispositivo_id):
         inicio = request.args.get('inicio')
         fim = request.args.get('fim')
         
+        # Resolução: raw, 1m, 1h, 1d ou auto (escolhe a tabela mais barata para o período)
+        if 'resolucao' in request.args:
+            return get_historico_resolucao(dispositivo, limite, inicio, fim)
+        
+        # Redução para gráficos: ?max_pontos=N&modo=lttb|minmax&series=temperatura,gravidade
+        if 'max_pontos' in request.args:
+            return get_historico_reduzido(dispositivo_id, inicio, fim)
+        
+        # Paginação por cursor: ?after=<timestamp,id> (ou ?paginado=true na primeira página)
+        if 'after' in request.args or request.args.get('paginado', '').lower() == 'true':
+            return get_historico_paginado(dispositivo_id, limite, inicio, fim)
+        
         if inicio and fim:
             # Buscar por período
             from datetime import datetime
@@ -290,12 +423,195 @@ def get_historico_dispositivo(dispositivo_id):
         print(f"Erro ao buscar histórico do dispositivo {dispositivo_id}: {e}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+def get_historico_resolucao(dispositivo, limite, inicio, fim):
+    """Histórico bruto ou agregado (1m/1h/1d) conforme o parâmetro resolucao"""
+    from model.ingestao import parse_timestamp
+    
+    resolucao = request.args.get('resolucao')
+    if resolucao not in ('raw', 'auto') + tuple(RESOLUCOES):
+        return jsonify({'error': 'Parâmetro resolucao deve ser raw, 1m, 1h, 1d ou auto'}), 400
+    
+    try:
+        inicio_dt = parse_timestamp(inicio)
+        fim_dt = parse_timestamp(fim)
+    except ValueError:
+        return jsonify({'error': 'Período inválido'}), 400
+    
+    if resolucao == 'auto':
+        if not (inicio_dt and fim_dt):
+            return jsonify({'error': 'resolucao=auto requer inicio e fim'}), 400
+        resolucao = escolher_resolucao(
+            inicio_dt, fim_dt,
+            max_pontos=request.args.get('max_pontos', 2000, type=int),
+            intervalo_amostra=dispositivo.intervalo_atualizacao
+        )
+    
+    if resolucao == 'raw':
+        if inicio_dt and fim_dt:
+            registros = HistoricoDispositivo.get_leituras_por_periodo(dispositivo.id, inicio_dt, fim_dt)
+        else:
+            registros = HistoricoDispositivo.get_ultimas_leituras(dispositivo.id, limite)
+    else:
+        registros = HistoricoAgregado.get_por_periodo(
+            dispositivo.id, resolucao, inicio_dt, fim_dt,
+            limite=None if (inicio_dt or fim_dt) else limite
+        )
+    
+    return jsonify({
+        'resolucao': resolucao,
+        'registros': [registro.to_dict() for registro in registros]
+    }), 200
+
+def get_historico_reduzido(dispositivo_id, inicio, fim):
+    """Séries do histórico reduzidas a no máximo max_pontos por série (LTTB ou min/max)"""
+    import numpy as np
+    from model.ingestao import parse_timestamp
+    from utils.downsampling import reduzir_serie
+    
+    max_pontos = request.args.get('max_pontos', type=int)
+    modo = request.args.get('modo', 'lttb')
+    series = request.args.get('series', ','.join(SERIES_HISTORICO)).split(',')
+    
+    if not max_pontos or max_pontos < 3:
+        return jsonify({'error': 'max_pontos deve ser um inteiro maior ou igual a 3'}), 400
+    if modo not in ('lttb', 'minmax'):
+        return jsonify({'error': 'Parâmetro modo deve ser lttb ou minmax'}), 400
+    if any(serie not in SERIES_HISTORICO for serie in series):
+        return jsonify({'error': f'Séries válidas: {", ".join(SERIES_HISTORICO)}'}), 400
+    
+    try:
+        inicio_dt = parse_timestamp(inicio)
+        fim_dt = parse_timestamp(fim)
+    except ValueError:
+        return jsonify({'error': 'Período inválido'}), 400
+    
+    timestamps, valores = HistoricoDispositivo.get_series(dispositivo_id, series, inicio_dt, fim_dt)
+    x = timestamps.astype(np.int64).astype(float)
+    
+    resultado = {}
+    for serie in series:
+        indices = reduzir_serie(x, valores[serie], max_pontos, modo)
+        resultado[serie] = {
+            'timestamp': np.datetime_as_string(timestamps[indices], unit='s').tolist(),
+            'valor': valores[serie][indices].tolist()
+        }
+    
+    return jsonify({
+        'modo': modo,
+        'max_pontos': max_pontos,
+        'total_pontos': len(timestamps),
+        'series': resultado
+    }), 200
+
+def get_historico_paginado(dispositivo_id, limite, inicio, fim):
+    """Página de histórico usando o cursor (timestamp, id) do último registro"""
+    from model.ingestao import parse_timestamp
+    
+    limite = max(1, min(limite, MAX_REGISTROS_POR_PAGINA))
+    ordem = request.args.get('ordem', 'asc')
+    if ordem not in ('asc', 'desc'):
+        return jsonify({'error': 'Parâmetro ordem deve ser asc ou desc'}), 400
+    
+    try:
+        after = request.args.get('after') or None
+        if after:
+            after = HistoricoDispositivo.decodificar_cursor(after)
+        inicio_dt = parse_timestamp(inicio)
+        fim_dt = parse_timestamp(fim)
+    except ValueError:
+        return jsonify({'error': 'Cursor ou período inválido'}), 400
+    
+    registros, proximo_cursor = HistoricoDispositivo.get_pagina(
+        dispositivo_id, limite, after=after, inicio=inicio_dt, fim=fim_dt, ordem=ordem
+    )
+    
+    return jsonify({
+        'registros': [registro.to_dict() for registro in registros],
+        'proximo_cursor': proximo_cursor,
+        'limite': limite
+    }), 200
+
+@dispositivos_bp.route('/dispositivos/historico/series', methods=['GET'])
+@login_required
+def get_series_alinhadas():
+    """
+    Séries de vários dispositivos alinhadas em intervalos fixos.
+
+    ?ids=1,2&series=temperatura,gravidade&inicio=&fim=&intervalo=5m&preenchimento=anterior
+    Retorna uma matriz valores[i][j]: média da série j no intervalo que começa em timestamps[i].
+    """
+    import numpy as np
+    from datetime import datetime, timedelta
+    from model.ingestao import parse_timestamp
+    from utils.alinhamento import parse_intervalo, grade_temporal, media_por_intervalo, preencher_adiante
+    
+    try:
+        try:
+            ids = [int(i) for i in request.args.get('ids', '').split(',') if i]
+            passo = parse_intervalo(request.args.get('intervalo', '1m'))
+            fim = parse_timestamp(request.args.get('fim')) or datetime.now()
+            inicio = parse_timestamp(request.args.get('inicio')) or fim - timedelta(days=1)
+        except ValueError as e:
+            return jsonify({'error': f'Parâmetro inválido: {e}'}), 400
+        
+        series = request.args.get('series', 'temperatura,gravidade').split(',')
+        preenchimento = request.args.get('preenchimento', 'nenhum')
+        preenchimento_max = request.args.get('preenchimento_max', type=int)
+        
+        if not ids or len(ids) > MAX_DISPOSITIVOS_ALINHADOS:
+            return jsonify({'error': f'Informe de 1 a {MAX_DISPOSITIVOS_ALINHADOS} ids de dispositivos'}), 400
+        if any(serie not in SERIES_HISTORICO for serie in series):
+            return jsonify({'error': f'Séries válidas: {", ".join(SERIES_HISTORICO)}'}), 400
+        if preenchimento not in PREENCHIMENTOS:
+            return jsonify({'error': f'Parâmetro preenchimento deve ser {" ou ".join(PREENCHIMENTOS)}'}), 400
+        if fim < inicio:
+            return jsonify({'error': 'fim deve ser posterior a inicio'}), 400
+        
+        passo_ms = passo * 1000
+        grade = grade_temporal(inicio, fim, passo_ms)
+        if len(grade) > MAX_INTERVALOS_ALINHADOS:
+            return jsonify({'error': f'Período gera mais de {MAX_INTERVALOS_ALINHADOS} intervalos; aumente o intervalo'}), 400
+        
+        dispositivos = {d.id: d for d in Dispositivo.visiveis().filter(Dispositivo.id.in_(ids)).all()}
+        faltando = [i for i in ids if i not in dispositivos]
+        if faltando:
+            return jsonify({'error': f'Dispositivos não encontrados: {faltando}'}), 404
+        
+        colunas = []
+        matriz = np.full((len(grade), len(ids) * len(series)), np.nan)
+        for dispositivo_id in ids:
+            timestamps, valores = HistoricoDispositivo.get_series(dispositivo_id, series, inicio, fim)
+            for serie in series:
+                matriz[:, len(colunas)] = media_por_intervalo(timestamps, valores[serie], grade[0], passo_ms, len(grade))
+                colunas.append({
+                    'dispositivo_id': dispositivo_id,
+                    'nome': dispositivos[dispositivo_id].nome,
+                    'serie': serie
+                })
+        
+        if preenchimento == 'anterior':
+            matriz = preencher_adiante(matriz, preenchimento_max)
+        
+        return jsonify({
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'intervalo_segundos': passo,
+            'preenchimento': preenchimento,
+            'series': colunas,
+            'timestamps': np.datetime_as_string(grade, unit='s').tolist(),
+            'valores': np.where(np.isnan(matriz), None, matriz).tolist()
+        }), 200
+        
+    except Exception as e:
+        print(f"Erro ao buscar séries alinhadas: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/historico', methods=['POST'])
 @login_required
 def adicionar_historico_dispositivo(dispositivo_id):
     """Adicionar registro ao histórico do dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -305,25 +621,23 @@ def adicionar_historico_dispositivo(dispositivo_id):
         if 'dados' not in data:
             return jsonify({'error': 'Campo dados é obrigatório'}), 400
         
-        # Criar registro de histórico
-        historico = HistoricoDispositivo(
-            dispositivo_id=dispositivo_id,
-            dados=data['dados'],
-            temperatura=data.get('temperatura'),
-            gravidade=data.get('gravidade'),
-            pressao=data.get('pressao'),
-            unidade=data.get('unidade'),
-            qualidade_sinal=data.get('qualidade_sinal'),
-            bateria=data.get('bateria')
-        )
+        registro, erro = IngestaoService.validar_leitura(data, dispositivo_id_padrao=dispositivo_id)
+        if erro:
+            return jsonify({'error': erro}), 400
+        registro['dispositivo_id'] = dispositivo_id
+        
+        # Extrair campos conhecidos de dados para colunas/tabela de campos
+        registro_campos.gravar(dispositivo, [registro])
         
+        # Criar registro de histórico
+        historico = HistoricoDispositivo(**registro)
         db.session.add(historico)
         
-        # Atualizar último valor recebido no dispositivo
-        dispositivo.ultimo_valor_recebido = data['dados']
-        dispositivo.ultima_comunicacao = func.now()
+        # Atualizar último valor recebido e agregados do dispositivo
+        publicacao = IngestaoService.registrar_pos_ingestao(dispositivo, [registro])
         
         db.session.commit()
+        IngestaoService.publicar_pos_commit([publicacao])
         
         return jsonify({
             'message': 'Histórico adicionado com sucesso',
@@ -335,6 +649,109 @@ def adicionar_historico_dispositivo(dispositivo_id):
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@dispositivos_bp.route('/dispositivos/historico/lote', methods=['POST'])
+@dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/historico/lote', methods=['POST'])
+@login_required
+def adicionar_historico_lote(dispositivo_id=None):
+    """Adicionar um lote de leituras (de um ou vários dispositivos) ao histórico"""
+    try:
+        data = request.get_json(silent=True)
+        leituras = data.get('leituras') if isinstance(data, dict) else data
+        
+        if not isinstance(leituras, list) or not leituras:
+            return jsonify({'error': 'Campo leituras deve ser uma lista não vazia'}), 400
+        if len(leituras) > MAX_LEITURAS_POR_LOTE:
+            return jsonify({'error': f'Lote excede o limite de {MAX_LEITURAS_POR_LOTE} leituras'}), 413
+        
+        resultado = IngestaoService.ingerir_lote(leituras, dispositivo_id_padrao=dispositivo_id)
+        
+        if resultado['rejeitados'] == 0:
+            status_code = 201
+        elif resultado['aceitos'] == 0:
+            status_code = 400
+        else:
+            status_code = 207
+        
+        return jsonify(resultado), status_code
+        
+    except Exception as e:
+        print(f"Erro ao adicionar lote de histórico: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/historico/agregados/reconstruir', methods=['POST'])
+@login_required
+def reconstruir_agregados_dispositivo(dispositivo_id):
+    """Recalcula os agregados (1m/1h/1d) a partir do histórico bruto"""
+    try:
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
+        
+        if not dispositivo:
+            return jsonify({'error': 'Dispositivo não encontrado'}), 404
+        
+        total = reconstruir_agregados(dispositivo_id)
+        
+        return jsonify({
+            'message': 'Agregados reconstruídos com sucesso',
+            'leituras_processadas': total
+        }), 200
+        
+    except Exception as e:
+        print(f"Erro ao reconstruir agregados do dispositivo {dispositivo_id}: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+# ========== ROTAS PARA CAMPOS EXTRAÍDOS DE DADOS ==========
+
+@dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/campos', methods=['GET'])
+@login_required
+def get_campos_dispositivo(dispositivo_id):
+    """Campos extraídos de dados disponíveis para o dispositivo e o mapeamento do seu tipo"""
+    try:
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
+        
+        if not dispositivo:
+            return jsonify({'error': 'Dispositivo não encontrado'}), 404
+        
+        return jsonify({
+            'campos': HistoricoCampo.get_campos(dispositivo_id),
+            'mapeamento': registro_campos.mapeamento(dispositivo.tipo)
+        }), 200
+        
+    except Exception as e:
+        print(f"Erro ao buscar campos do dispositivo {dispositivo_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/campos/<campo>', methods=['GET'])
+@login_required
+def get_campo_dispositivo(dispositivo_id, campo):
+    """Série e estatísticas de um campo extraído (?inicio=&fim=&limite=)"""
+    from model.ingestao import parse_timestamp
+    
+    try:
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
+        
+        if not dispositivo:
+            return jsonify({'error': 'Dispositivo não encontrado'}), 404
+        
+        try:
+            inicio = parse_timestamp(request.args.get('inicio'))
+            fim = parse_timestamp(request.args.get('fim'))
+        except ValueError:
+            return jsonify({'error': 'Período inválido'}), 400
+        limite = min(request.args.get('limite', 1000, type=int), MAX_REGISTROS_POR_PAGINA)
+        
+        serie = HistoricoCampo.get_serie(dispositivo_id, campo, inicio, fim, limite)
+        return jsonify({
+            'campo': campo,
+            'estatisticas': HistoricoCampo.get_estatisticas(dispositivo_id, campo, inicio, fim),
+            'registros': [{'timestamp': r.timestamp.isoformat(), 'valor': r.valor} for r in serie]
+        }), 200
+        
+    except Exception as e:
+        print(f"Erro ao buscar campo {campo} do dispositivo {dispositivo_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/historico/<int:historico_id>', methods=['DELETE'])
 @login_required
 def delete_historico_dispositivo(dispositivo_id, historico_id):
@@ -349,6 +766,8 @@ def delete_historico_dispositivo(dispositivo_id, historico_id):
             return jsonify({'error': 'Registro de histórico não encontrado'}), 404
             
         db.session.delete(historico)
+        # Intervalos 1m/1h/1d que continham a leitura
+        recalcular_intervalo(dispositivo_id, historico.timestamp)
         db.session.commit()
         
         return jsonify({'message': 'Registro de histórico deletado com sucesso'}), 200
@@ -358,6 +777,82 @@ def delete_historico_dispositivo(dispositivo_id, historico_id):
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+# ========== ROTAS PARA EXPORTAÇÃO DE HISTÓRICO ==========
+
+def exportar_historico(dispositivo_ids, nome_arquivo, inicio=None, fim=None):
+    """Resposta em streaming (NDJSON ou CSV, opcionalmente gzip) do histórico"""
+    from model.ingestao import parse_timestamp
+    from utils.exportacao import gerar_ndjson, gerar_csv, comprimir_gzip
+    
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Parâmetro formato deve ser ndjson ou csv'}), 400
+    
+    try:
+        inicio = parse_timestamp(request.args.get('inicio')) or inicio
+        fim = parse_timestamp(request.args.get('fim')) or fim
+    except ValueError:
+        return jsonify({'error': 'Período inválido'}), 400
+    
+    colunas = list(COLUNAS_EXPORTACAO)
+    if request.args.get('incluir_dados', '').lower() == 'true':
+        colunas.append('dados')
+    
+    linhas = HistoricoDispositivo.iterar_linhas(dispositivo_ids, colunas, inicio, fim)
+    blocos = gerar_ndjson(linhas, colunas) if formato == 'ndjson' else gerar_csv(linhas, colunas)
+    mimetype = 'application/x-ndjson' if formato == 'ndjson' else 'text/csv'
+    nome_arquivo = f'{nome_arquivo}.{formato}'
+    
+    if request.args.get('gzip', '').lower() == 'true':
+        blocos = comprimir_gzip(blocos)
+        mimetype = 'application/gzip'
+        nome_arquivo += '.gz'
+    
+    return Response(
+        stream_with_context(blocos),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    )
+
+@dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/historico/exportar', methods=['GET'])
+@login_required
+def exportar_historico_dispositivo(dispositivo_id):
+    """Exportar histórico de um dispositivo em streaming"""
+    try:
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
+        
+        if not dispositivo:
+            return jsonify({'error': 'Dispositivo não encontrado'}), 404
+        
+        return exportar_historico([dispositivo_id], f'historico_dispositivo_{dispositivo_id}')
+        
+    except Exception as e:
+        print(f"Erro ao exportar histórico do dispositivo {dispositivo_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@dispositivos_bp.route('/dispositivos/sessao/<int:sessao_id>/historico/exportar', methods=['GET'])
+@login_required
+def exportar_historico_sessao(sessao_id):
+    """Exportar histórico dos dispositivos de uma sessão de brassagem em streaming"""
+    from model.sessao_brasagem import SessaoBrasagem
+    
+    try:
+        sessao = db.session.get(SessaoBrasagem, sessao_id)
+        
+        if not sessao:
+            return jsonify({'error': 'Sessão de brassagem não encontrada'}), 404
+        
+        dispositivo_ids = [dispositivo.id for dispositivo in Dispositivo.get_por_sessao(sessao_id)]
+        
+        return exportar_historico(
+            dispositivo_ids, f'historico_sessao_{sessao_id}',
+            inicio=sessao.data_inicio, fim=sessao.data_fim
+        )
+        
+    except Exception as e:
+        print(f"Erro ao exportar histórico da sessão {sessao_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 # ========== ROTAS PARA CONFIGURAÇÃO DE DISPOSITIVOS ==========
 
 @dispositivos_bp.route('/dispositivos/<int:dispositivo_id>/config', methods=['GET'])
@@ -365,7 +860,7 @@ def delete_historico_dispositivo(dispositivo_id, historico_id):
 def get_config_dispositivo(dispositivo_id):
     """Obter configuração específica do dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -389,7 +884,7 @@ def get_config_dispositivo(dispositivo_id):
 def set_config_dispositivo(dispositivo_id):
     """Definir configuração do dispositivo"""
     try:
-        dispositivo = Dispositivo.query.get(dispositivo_id)
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
         
         if not dispositivo:
             return jsonify({'error': 'Dispositivo não encontrado'}), 404
@@ -0,0 +1,42 @@
+# routes/fermentacao_routes.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from db.database import db
+from model.analise_fermentacao import analise_fermentacao
+from model.sessao_brasagem import SessaoBrasagem
+
+
+fermentacao_bp = Blueprint('fermentacao', __name__)
+
+@fermentacao_bp.route('/fermentacao/previsoes', methods=['GET'])
+@login_required
+def get_previsoes_fermentacao():
+    """Previsão de gravidade final, atenuação e ETA de todas as sessões em andamento"""
+    try:
+        forcar = request.args.get('atualizar', '').lower() == 'true'
+        return jsonify(analise_fermentacao.get_previsoes(forcar)), 200
+    except Exception as e:
+        print(f"Erro ao calcular previsões de fermentação: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@fermentacao_bp.route('/fermentacao/sessoes/<int:sessao_id>/previsao', methods=['GET'])
+@login_required
+def get_previsao_sessao(sessao_id):
+    """Previsão de fermentação de uma sessão"""
+    try:
+        sessao = db.session.get(SessaoBrasagem, sessao_id)
+        
+        if not sessao:
+            return jsonify({'error': 'Sessão não encontrada'}), 404
+        
+        forcar = request.args.get('atualizar', '').lower() == 'true'
+        previsao = analise_fermentacao.get_previsao(sessao_id, forcar)
+        
+        if not previsao:
+            return jsonify({'error': 'Sessão sem leituras de gravidade ou fora de andamento'}), 404
+        
+        return jsonify(previsao), 200
+        
+    except Exception as e:
+        print(f"Erro ao calcular previsão da sessão {sessao_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
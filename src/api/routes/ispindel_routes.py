@@ -0,0 +1,74 @@
+# routes/ispindel_routes.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from db.database import db
+from model.dispositivos import Dispositivo, TipoDispositivo
+from model.ingestao import IngestaoService
+from model.ispindel import localizar_dispositivo, leitura_ispindel, recalibrar_historico
+from utils.calibracao import validar_parametros
+
+
+ispindel_bp = Blueprint('ispindel', __name__)
+
+def _token_requisicao(payload):
+    """Token do iSpindel: cabeçalho Authorization, parâmetro ?token= ou campo token do JSON"""
+    autorizacao = request.headers.get('Authorization', '')
+    if autorizacao.lower().startswith('bearer '):
+        return autorizacao[7:].strip()
+    return request.args.get('token') or payload.get('token')
+
+@ispindel_bp.route('/ispindel', methods=['POST'])
+def receber_ispindel():
+    """Recebe o payload nativo do firmware do iSpindel (modo HTTP, autenticado pelo token do dispositivo)"""
+    try:
+        payload = request.get_json(silent=True)
+
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Payload JSON é obrigatório'}), 400
+
+        dispositivo, erro = localizar_dispositivo(_token_requisicao(payload), payload.get('name'))
+
+        if erro:
+            return jsonify({'error': erro}), 401
+
+        leitura, erro = leitura_ispindel(dispositivo, payload)
+
+        if erro:
+            return jsonify({'error': erro}), 400
+
+        resultado = IngestaoService.ingerir_lote([leitura], dispositivo.id)
+
+        if not resultado['aceitos']:
+            return jsonify({'error': resultado['resultados'][0].get('erro')}), 400
+
+        return jsonify({'message': 'Leitura registrada', 'dispositivo_id': dispositivo.id}), 201
+
+    except Exception as e:
+        print(f"Erro ao receber dados do iSpindel: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@ispindel_bp.route('/ispindel/<int:dispositivo_id>/recalibrar', methods=['POST'])
+@login_required
+def recalibrar_ispindel(dispositivo_id):
+    """Reaplica o polinômio de calibração atual a todo o histórico do dispositivo"""
+    try:
+        dispositivo = Dispositivo.get_visivel(dispositivo_id)
+
+        if not dispositivo or dispositivo.tipo != TipoDispositivo.ISPINDEL:
+            return jsonify({'error': 'Dispositivo não encontrado'}), 404
+
+        erro = validar_parametros(dispositivo.parametros_calibracao)
+        if erro:
+            return jsonify({'error': erro}), 400
+
+        atualizadas = recalibrar_historico(dispositivo)
+
+        return jsonify({
+            'message': 'Histórico recalibrado com sucesso',
+            'leituras_atualizadas': atualizadas
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao recalibrar histórico do dispositivo {dispositivo_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -0,0 +1,84 @@
+# routes/sessoes_routes.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from db.database import db
+from model.ingestao import parse_timestamp
+from model.resumo_sessao import ResumoSessao, ResumoSessaoService, TOLERANCIA_TEMPERATURA
+from model.sessao_brasagem import SessaoBrasagem
+
+
+sessoes_bp = Blueprint('sessoes', __name__)
+
+@sessoes_bp.route('/sessoes/resumos', methods=['GET'])
+@login_required
+def get_resumos_sessoes():
+    """Resumos materializados das sessões finalizadas (filtro ids=1,2,3 para comparação)"""
+    try:
+        query = db.session.query(ResumoSessao, SessaoBrasagem.nome)\
+            .join(SessaoBrasagem, SessaoBrasagem.id == ResumoSessao.sessao_brasagem_id)
+
+        ids = request.args.get('ids')
+        if ids:
+            try:
+                query = query.filter(ResumoSessao.sessao_brasagem_id.in_([int(i) for i in ids.split(',') if i]))
+            except ValueError:
+                return jsonify({'error': 'Parâmetro ids inválido'}), 400
+
+        resumos = []
+        for resumo, nome in query.order_by(ResumoSessao.fim.desc()).all():
+            dados = resumo.to_dict()
+            dados['nome'] = nome
+            resumos.append(dados)
+        return jsonify(resumos), 200
+    except Exception as e:
+        print(f"Erro ao buscar resumos de sessões: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@sessoes_bp.route('/sessoes/<int:sessao_id>/resumo', methods=['GET'])
+@login_required
+def get_resumo_sessao(sessao_id):
+    """Resumo de telemetria da sessão (perfil de temperatura, estatísticas, tempo na faixa, queda de gravidade)"""
+    try:
+        sessao = db.session.get(SessaoBrasagem, sessao_id)
+
+        if not sessao:
+            return jsonify({'error': 'Sessão não encontrada'}), 404
+
+        tolerancia = request.args.get('tolerancia', TOLERANCIA_TEMPERATURA, type=float)
+        return jsonify(ResumoSessaoService.obter(sessao, tolerancia)), 200
+
+    except Exception as e:
+        print(f"Erro ao calcular resumo da sessão {sessao_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@sessoes_bp.route('/sessoes/<int:sessao_id>/finalizar', methods=['POST'])
+@login_required
+def finalizar_sessao(sessao_id):
+    """Finaliza a sessão e grava o resumo de telemetria"""
+    try:
+        sessao = db.session.get(SessaoBrasagem, sessao_id)
+
+        if not sessao:
+            return jsonify({'error': 'Sessão não encontrada'}), 404
+        if sessao.status == 'cancelada':
+            return jsonify({'error': 'Sessão cancelada não pode ser finalizada'}), 400
+
+        data = request.get_json(silent=True) or {}
+        try:
+            data_fim = parse_timestamp(data.get('data_fim'))
+            tolerancia = float(data.get('tolerancia', TOLERANCIA_TEMPERATURA))
+        except (TypeError, ValueError, OverflowError, OSError):
+            return jsonify({'error': 'data_fim ou tolerancia inválidos'}), 400
+
+        resumo = ResumoSessaoService.finalizar(sessao, data_fim, tolerancia)
+
+        return jsonify({
+            'message': 'Sessão finalizada com sucesso',
+            'sessao': sessao.to_dict(),
+            'resumo': resumo.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro ao finalizar sessão {sessao_id}: {e}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
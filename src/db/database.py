@@ -2,5 +2,11 @@ import os
 if os.getenv('FLASK_ENV') == 'DEV':
     from db.dev_database import init_db , db, test_connection 
 else:        
-    from db.prd_database import init_db , db, test_connection 
-    
\ No newline at end of file
+    from db.prd_database import init_db , db, test_connection
+
+
+def criar_indices_faltantes(banco):
+    """Cria índices novos em tabelas que já existiam (create_all só cria tabelas novas)"""
+    for table in banco.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(banco.engine, checkfirst=True)
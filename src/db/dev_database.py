@@ -32,6 +32,10 @@ def init_db(app):
             import model.ingredientes            
             import model.sessao_brasagem
             import model.dispositivos
+            import model.agregados
+            import model.campos_leitura
+            import model.regras_alerta
+            import model.resumo_sessao
             import model.notification   
             import model.brewfather
                        
@@ -39,6 +43,8 @@ def init_db(app):
             
             # Criar tabelas
             db.create_all()
+            from db.database import criar_indices_faltantes
+            criar_indices_faltantes(db)
             print("Tabelas criadas com sucesso!")
             
     except Exception as e:
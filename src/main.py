@@ -55,6 +55,21 @@ def create_app():
     
     return app
 
+def iniciar_servicos_web(app):
+    """
+    Inicia as threads de fundo do processo web.
+    
+    Fica fora de create_app(): os workers importam o app deste módulo e não
+    podem ter o próprio write-behind e heartbeat disputando as mesmas linhas.
+    """
+    # Cache de últimas leituras (write-behind opcional)
+    from model.cache_leituras import configurar_cache_leituras
+    configurar_cache_leituras(app)
+    
+    # Detecção de dispositivos offline
+    from model.heartbeat import configurar_heartbeat
+    configurar_heartbeat(app)
+
 def register_blueprints(app):
     """Registra todos os blueprints da aplicação"""
     try:
@@ -137,6 +152,11 @@ def initialize_app_data(app):
 # =================================================================
 app = create_app()
 
+# Só o processo web inicia as threads de fundo; os workers definem
+# BREWSTATION_PROCESSO=worker antes de importar o app (workers.app_worker)
+if os.getenv('BREWSTATION_PROCESSO', 'web') == 'web':
+    iniciar_servicos_web(app)
+
 if __name__ == '__main__':
     # Configurações do servidor
     host = os.getenv('HOST', '0.0.0.0')
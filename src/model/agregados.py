@@ -0,0 +1,295 @@
+# model/agregados.py
+from datetime import timedelta
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, UniqueConstraint, case, func
+from db.database import db
+
+# Métricas agregadas por dispositivo e intervalo
+METRICAS_AGREGADAS = ('temperatura', 'gravidade', 'pressao', 'bateria')
+
+# Resoluções disponíveis e duração de cada intervalo, da mais fina para a mais grossa
+RESOLUCOES = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+
+def inicio_intervalo(timestamp, resolucao):
+    """Trunca um timestamp para o início do intervalo da resolução"""
+    if resolucao == '1m':
+        return timestamp.replace(second=0, microsecond=0)
+    if resolucao == '1h':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolucao == '1d':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f'Resolução inválida: {resolucao}')
+
+
+def escolher_resolucao(inicio, fim, max_pontos=2000, intervalo_amostra=30):
+    """
+    Escolhe a tabela mais barata que ainda cobre o período com até max_pontos.
+
+    O histórico bruto é usado enquanto o número estimado de leituras
+    (pelo intervalo de atualização do dispositivo) couber em max_pontos.
+    """
+    duracao = (fim - inicio).total_seconds()
+    if duracao / max(intervalo_amostra or 30, 1) <= max_pontos:
+        return 'raw'
+    for resolucao, intervalo in RESOLUCOES.items():
+        if duracao / intervalo.total_seconds() <= max_pontos:
+            return resolucao
+    return '1d'
+
+
+class HistoricoAgregado(db.Model):
+    """Agregados (min/max/média/contagem/último) do histórico por dispositivo e intervalo"""
+    __tablename__ = 'historico_agregados'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id'), nullable=False)
+    resolucao = Column(String(5), nullable=False)  # 1m, 1h, 1d
+    inicio = Column(DateTime, nullable=False)       # Início do intervalo
+    contagem = Column(Integer, nullable=False, default=0)
+    ultimo_timestamp = Column(DateTime, nullable=True)
+
+    temperatura_min = Column(Float, nullable=True)
+    temperatura_max = Column(Float, nullable=True)
+    temperatura_soma = Column(Float, nullable=False, default=0)
+    temperatura_contagem = Column(Integer, nullable=False, default=0)
+    temperatura_ultimo = Column(Float, nullable=True)
+
+    gravidade_min = Column(Float, nullable=True)
+    gravidade_max = Column(Float, nullable=True)
+    gravidade_soma = Column(Float, nullable=False, default=0)
+    gravidade_contagem = Column(Integer, nullable=False, default=0)
+    gravidade_ultimo = Column(Float, nullable=True)
+
+    pressao_min = Column(Float, nullable=True)
+    pressao_max = Column(Float, nullable=True)
+    pressao_soma = Column(Float, nullable=False, default=0)
+    pressao_contagem = Column(Integer, nullable=False, default=0)
+    pressao_ultimo = Column(Float, nullable=True)
+
+    bateria_min = Column(Float, nullable=True)
+    bateria_max = Column(Float, nullable=True)
+    bateria_soma = Column(Float, nullable=False, default=0)
+    bateria_contagem = Column(Integer, nullable=False, default=0)
+    bateria_ultimo = Column(Float, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('dispositivo_id', 'resolucao', 'inicio', name='uq_historico_agregado_intervalo'),
+    )
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        data = {
+            'dispositivo_id': self.dispositivo_id,
+            'resolucao': self.resolucao,
+            'inicio': self.inicio.isoformat() if self.inicio else None,
+            'timestamp': self.inicio.isoformat() if self.inicio else None,
+            'contagem': self.contagem,
+            'ultimo_timestamp': self.ultimo_timestamp.isoformat() if self.ultimo_timestamp else None
+        }
+        for metrica in METRICAS_AGREGADAS:
+            contagem = getattr(self, f'{metrica}_contagem') or 0
+            data[metrica] = {
+                'min': getattr(self, f'{metrica}_min'),
+                'max': getattr(self, f'{metrica}_max'),
+                'media': getattr(self, f'{metrica}_soma') / contagem if contagem else None,
+                'ultimo': getattr(self, f'{metrica}_ultimo'),
+                'contagem': contagem
+            }
+        return data
+
+    @classmethod
+    def get_por_periodo(cls, dispositivo_id, resolucao, inicio=None, fim=None, limite=None):
+        """Obtém agregados de um dispositivo; sem período, retorna os mais recentes"""
+        query = cls.query.filter(cls.dispositivo_id == dispositivo_id, cls.resolucao == resolucao)
+
+        if inicio or fim:
+            if inicio:
+                query = query.filter(cls.inicio >= inicio_intervalo(inicio, resolucao))
+            if fim:
+                query = query.filter(cls.inicio <= fim)
+            query = query.order_by(cls.inicio.asc())
+        else:
+            query = query.order_by(cls.inicio.desc())
+
+        if limite:
+            query = query.limit(limite)
+        return query.all()
+
+
+def calcular_agregados(dispositivo_id, registros):
+    """Agrega registros (dicts do lote) em linhas por resolução e intervalo"""
+    linhas = {}
+    ultimos = {}  # (resolucao, inicio, metrica) -> timestamp do último valor
+
+    for registro in registros:
+        timestamp = registro['timestamp']
+        for resolucao in RESOLUCOES:
+            chave = (resolucao, inicio_intervalo(timestamp, resolucao))
+            linha = linhas.get(chave)
+            if linha is None:
+                linha = {
+                    'dispositivo_id': dispositivo_id,
+                    'resolucao': resolucao,
+                    'inicio': chave[1],
+                    'contagem': 0,
+                    'ultimo_timestamp': timestamp
+                }
+                for metrica in METRICAS_AGREGADAS:
+                    linha.update({
+                        f'{metrica}_min': None, f'{metrica}_max': None,
+                        f'{metrica}_soma': 0.0, f'{metrica}_contagem': 0,
+                        f'{metrica}_ultimo': None
+                    })
+                linhas[chave] = linha
+
+            linha['contagem'] += 1
+            if timestamp > linha['ultimo_timestamp']:
+                linha['ultimo_timestamp'] = timestamp
+
+            for metrica in METRICAS_AGREGADAS:
+                valor = registro.get(metrica)
+                if valor is None:
+                    continue
+                if linha[f'{metrica}_min'] is None or valor < linha[f'{metrica}_min']:
+                    linha[f'{metrica}_min'] = valor
+                if linha[f'{metrica}_max'] is None or valor > linha[f'{metrica}_max']:
+                    linha[f'{metrica}_max'] = valor
+                linha[f'{metrica}_soma'] += valor
+                linha[f'{metrica}_contagem'] += 1
+
+                ultimo = ultimos.get(chave + (metrica,))
+                if ultimo is None or timestamp >= ultimo:
+                    ultimos[chave + (metrica,)] = timestamp
+                    linha[f'{metrica}_ultimo'] = valor
+
+    return list(linhas.values())
+
+
+def _insert_upsert():
+    """Retorna o insert com suporte a ON CONFLICT do dialeto em uso"""
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'Upsert não suportado para o banco {dialeto}')
+    return insert
+
+
+def _menor(atual, novo):
+    return case((atual.is_(None), novo), (novo.is_(None), atual), (novo < atual, novo), else_=atual)
+
+
+def _maior(atual, novo):
+    return case((atual.is_(None), novo), (novo.is_(None), atual), (novo > atual, novo), else_=atual)
+
+
+def atualizar_agregados(dispositivo_id, registros):
+    """
+    Mescla um lote de registros nos agregados do dispositivo.
+
+    Usa INSERT ... ON CONFLICT DO UPDATE (SQLite e PostgreSQL), então cada
+    resolução custa um único comando, e escritores concorrentes não se perdem.
+    """
+    linhas = calcular_agregados(dispositivo_id, registros)
+    if not linhas:
+        return 0
+
+    insert = _insert_upsert()
+    tabela = HistoricoAgregado.__table__
+    stmt = insert(tabela)
+    atual = tabela.c
+    novo = stmt.excluded
+    mais_novo = novo.ultimo_timestamp >= atual.ultimo_timestamp
+
+    valores = {
+        'contagem': atual.contagem + novo.contagem,
+        'ultimo_timestamp': _maior(atual.ultimo_timestamp, novo.ultimo_timestamp),
+    }
+    for metrica in METRICAS_AGREGADAS:
+        ultimo_atual = atual[f'{metrica}_ultimo']
+        ultimo_novo = novo[f'{metrica}_ultimo']
+        valores.update({
+            f'{metrica}_min': _menor(atual[f'{metrica}_min'], novo[f'{metrica}_min']),
+            f'{metrica}_max': _maior(atual[f'{metrica}_max'], novo[f'{metrica}_max']),
+            f'{metrica}_soma': atual[f'{metrica}_soma'] + novo[f'{metrica}_soma'],
+            f'{metrica}_contagem': atual[f'{metrica}_contagem'] + novo[f'{metrica}_contagem'],
+            f'{metrica}_ultimo': case(
+                (mais_novo, func.coalesce(ultimo_novo, ultimo_atual)),
+                else_=func.coalesce(ultimo_atual, ultimo_novo)
+            ),
+        })
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['dispositivo_id', 'resolucao', 'inicio'],
+        set_=valores
+    )
+    db.session.execute(stmt, linhas)
+    return len(linhas)
+
+
+def recalcular_intervalo(dispositivo_id, timestamp):
+    """
+    Recalcula os agregados do dia que contém timestamp (e os intervalos de
+    1m e 1h dentro dele) depois de uma leitura ser removida ou alterada.
+
+    Lê só as leituras desse dia (banco + arquivo frio); não faz commit.
+    """
+    import numpy as np
+    from model.dispositivos import HistoricoDispositivo
+
+    inicio = inicio_intervalo(timestamp, '1d')
+    fim = inicio + RESOLUCOES['1d']
+    HistoricoAgregado.query.filter(
+        HistoricoAgregado.dispositivo_id == dispositivo_id,
+        HistoricoAgregado.inicio >= inicio,
+        HistoricoAgregado.inicio < fim
+    ).delete(synchronize_session=False)
+
+    timestamps, series = HistoricoDispositivo.get_series(
+        dispositivo_id, METRICAS_AGREGADAS, inicio, fim - timedelta(microseconds=1)
+    )
+    registros = [
+        {'timestamp': instante, **{
+            metrica: None if np.isnan(series[metrica][i]) else float(series[metrica][i])
+            for metrica in METRICAS_AGREGADAS
+        }}
+        for i, instante in enumerate(timestamps.astype('datetime64[us]').astype(object))
+    ]
+    return atualizar_agregados(dispositivo_id, registros)
+
+
+def reconstruir_agregados(dispositivo_id, tamanho_bloco=5000):
+    """
+    Recalcula todos os agregados de um dispositivo a partir do histórico bruto.
+
+    Lê também o arquivo frio (HistoricoDispositivo.iterar_linhas), então os
+    intervalos de leituras já movidas pela retenção não se perdem.
+    """
+    from model.dispositivos import HistoricoDispositivo
+
+    HistoricoAgregado.query.filter_by(dispositivo_id=dispositivo_id).delete()
+
+    linhas = HistoricoDispositivo.iterar_linhas(
+        [dispositivo_id], ('timestamp',) + METRICAS_AGREGADAS, tamanho_bloco=tamanho_bloco
+    )
+
+    bloco = []
+    total = 0
+    for linha in linhas:
+        bloco.append(dict(zip(('timestamp',) + METRICAS_AGREGADAS, linha)))
+        if len(bloco) >= tamanho_bloco:
+            atualizar_agregados(dispositivo_id, bloco)
+            total += len(bloco)
+            bloco = []
+    if bloco:
+        atualizar_agregados(dispositivo_id, bloco)
+        total += len(bloco)
+
+    db.session.commit()
+    return total
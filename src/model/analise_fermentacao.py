@@ -0,0 +1,228 @@
+# model/analise_fermentacao.py
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, or_
+from db.database import db
+from utils.ajuste_fermentacao import N_SOMAS, grade_modelos, avaliar_phi, acumular, ajustar, horas_ate_estabilizar
+
+# Status de sessão considerado em fermentação
+STATUS_ATIVO = 'em_andamento'
+
+# Variação restante (em pontos, 1 ponto = 0.001) abaixo da qual a fermentação é dada como concluída
+TOLERANCIA_PONTOS = 1.0
+
+# Leituras lidas do banco por bloco ao acumular
+TAMANHO_BLOCO = 2000
+
+
+def _pontos(gravidade):
+    """Gravidade específica em pontos (1.050 -> 50), o que evita perda de precisão nas somas"""
+    return (np.asarray(gravidade, dtype=float) - 1.0) * 1000.0
+
+
+def _gravidade(pontos):
+    return round(1.0 + float(pontos) / 1000.0, 4)
+
+
+class AnaliseFermentacao:
+    """
+    Previsão de gravidade final, atenuação e ETA das sessões em andamento.
+
+    Mantém, por sessão, as somas do ajuste de cada modelo candidato
+    (utils/ajuste_fermentacao). Cada atualização lê do banco apenas as
+    leituras novas (id acima da última marca), soma-as e reajusta todas as
+    sessões em uma única passada vetorizada. Os resultados ficam em cache
+    por intervalo_atualizacao segundos.
+
+    Uma leitura gravada depois da marca com id abaixo dela (commit fora de
+    ordem do gravador em lote, backfill) ou removida do banco faz a contagem
+    da sessão até a marca divergir das somas; essa sessão é recalculada
+    do zero na mesma atualização.
+    """
+
+    def __init__(self, intervalo_atualizacao=30, tolerancia_pontos=TOLERANCIA_PONTOS):
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self.tolerancia_pontos = tolerancia_pontos
+        self.modelos = grade_modelos()
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        """Descarta o estado acumulado; a próxima atualização relê as sessões"""
+        self._indices = {}        # sessao_id -> linha em _somas
+        self._referencias = []    # Instante t = 0 de cada linha
+        self._somas = np.zeros((0, len(self.modelos), N_SOMAS))
+        self._ultimas = {}        # linha -> (timestamp, gravidade) da leitura mais recente
+        self._ultimo_id = 0
+        self._resultados = {}
+        self._atualizado_em = None
+
+    def _remover_sessoes(self, ativas):
+        manter = [sessao_id for sessao_id in self._indices if sessao_id in ativas]
+        if len(manter) == len(self._indices):
+            return
+        linhas = [self._indices[sessao_id] for sessao_id in manter]
+        self._somas = self._somas[linhas]
+        self._referencias = [self._referencias[linha] for linha in linhas]
+        self._ultimas = {
+            nova: self._ultimas[antiga] for nova, antiga in enumerate(linhas) if antiga in self._ultimas
+        }
+        self._indices = {sessao_id: nova for nova, sessao_id in enumerate(manter)}
+
+    def _divergentes(self, sessoes):
+        """Sessões cujas somas não batem com as leituras do banco até a última marca"""
+        from model.dispositivos import Dispositivo, HistoricoDispositivo
+        from model.sessao_brasagem import SessaoBrasagem
+
+        acumuladas = [sessao_id for sessao_id in self._indices if sessao_id in sessoes]
+        if not acumuladas:
+            return set()
+        contagens = dict(
+            db.session.query(Dispositivo.sessao_brasagem_id, func.count(HistoricoDispositivo.id))
+            .join(Dispositivo, Dispositivo.id == HistoricoDispositivo.dispositivo_id)
+            .join(SessaoBrasagem, SessaoBrasagem.id == Dispositivo.sessao_brasagem_id)
+            .filter(
+                Dispositivo.sessao_brasagem_id.in_(acumuladas),
+                HistoricoDispositivo.gravidade.isnot(None),
+                HistoricoDispositivo.id <= self._ultimo_id,
+                or_(SessaoBrasagem.data_inicio.is_(None), HistoricoDispositivo.timestamp >= SessaoBrasagem.data_inicio)
+            ).group_by(Dispositivo.sessao_brasagem_id).all()
+        )
+        return {
+            sessao_id for sessao_id in acumuladas
+            if contagens.get(sessao_id, 0) != int(self._somas[self._indices[sessao_id], 0, 0])
+        }
+
+    def _linha(self, sessao_id, referencia):
+        linha = self._indices.get(sessao_id)
+        if linha is None:
+            linha = len(self._referencias)
+            self._indices[sessao_id] = linha
+            self._referencias.append(referencia)
+            self._somas = np.concatenate([self._somas, np.zeros((1,) + self._somas.shape[1:])])
+        return linha
+
+    def _acumular_bloco(self, bloco, sessoes):
+        indices, horas, pontos = [], [], []
+        for sessao_id, timestamp, gravidade in bloco:
+            inicio = sessoes[sessao_id].data_inicio
+            if inicio and timestamp < inicio:
+                continue
+            # Sem data de início, a primeira leitura (ordem por timestamp) é a referência
+            linha = self._linha(sessao_id, inicio or timestamp)
+            indices.append(linha)
+            horas.append((timestamp - self._referencias[linha]).total_seconds() / 3600.0)
+            pontos.append(gravidade)
+            ultima = self._ultimas.get(linha)
+            if ultima is None or timestamp >= ultima[0]:
+                self._ultimas[linha] = (timestamp, gravidade)
+        acumular(self._somas, indices, np.array(horas), _pontos(pontos), self.modelos)
+
+    def atualizar(self, forcar=False):
+        """Acumula as leituras novas e reajusta as sessões (requer app context)"""
+        from model.dispositivos import Dispositivo, HistoricoDispositivo
+        from model.sessao_brasagem import SessaoBrasagem
+
+        with self._lock:
+            if not forcar and self._atualizado_em and time.monotonic() - self._atualizado_em < self.intervalo_atualizacao:
+                return self._resultados
+
+            sessoes = {s.id: s for s in SessaoBrasagem.query.filter_by(status=STATUS_ATIVO).all()}
+            recalcular = self._divergentes(sessoes)
+            self._remover_sessoes({sessao_id for sessao_id in sessoes if sessao_id not in recalcular})
+            novas = [sessao_id for sessao_id in sessoes if sessao_id not in self._indices]
+            marca = db.session.query(func.max(HistoricoDispositivo.id)).scalar() or 0
+
+            if sessoes:
+                filtro_novas = [HistoricoDispositivo.id > self._ultimo_id]
+                if novas:
+                    filtro_novas.append(Dispositivo.sessao_brasagem_id.in_(novas))
+                query = db.session.query(
+                    Dispositivo.sessao_brasagem_id, HistoricoDispositivo.timestamp, HistoricoDispositivo.gravidade
+                ).join(Dispositivo, Dispositivo.id == HistoricoDispositivo.dispositivo_id)\
+                    .filter(
+                        Dispositivo.sessao_brasagem_id.in_(list(sessoes)),
+                        HistoricoDispositivo.gravidade.isnot(None),
+                        HistoricoDispositivo.id <= marca,
+                        or_(*filtro_novas)
+                    ).order_by(HistoricoDispositivo.timestamp.asc())\
+                    .execution_options(yield_per=TAMANHO_BLOCO)
+
+                bloco = []
+                for linha in query:
+                    bloco.append(linha)
+                    if len(bloco) >= TAMANHO_BLOCO:
+                        self._acumular_bloco(bloco, sessoes)
+                        bloco = []
+                if bloco:
+                    self._acumular_bloco(bloco, sessoes)
+
+            self._ultimo_id = marca
+            self._resultados = self._calcular_resultados(sessoes)
+            self._atualizado_em = time.monotonic()
+            return self._resultados
+
+    def _calcular_resultados(self, sessoes):
+        if not self._indices:
+            return {}
+
+        melhor, gf, a, rmse = ajustar(self._somas)
+        horas = horas_ate_estabilizar(self.modelos, melhor, a, self.tolerancia_pontos)
+        agora = datetime.now()
+        phi_inicio = avaliar_phi(self.modelos, [0.0])[0]
+
+        resultados = {}
+        for sessao_id, linha in self._indices.items():
+            sessao = sessoes[sessao_id]
+            leituras = int(self._somas[linha, 0, 0])
+            ultima = self._ultimas.get(linha)
+            resultado = {
+                'sessao_id': sessao_id,
+                'nome': sessao.nome,
+                'leituras': leituras,
+                'referencia': self._referencias[linha].isoformat(),
+                'gravidade_atual': ultima[1] if ultima else None,
+                'ultima_leitura': ultima[0].isoformat() if ultima else None,
+                'modelo': None,
+                'gravidade_final_prevista': None,
+                'atenuacao_aparente_prevista': None,
+                'atenuacao_aparente_atual': None,
+                'eta': None,
+                'concluida': False
+            }
+            if melhor[linha] < 0:
+                resultados[sessao_id] = resultado
+                continue
+
+            familia, k, t0 = self.modelos[melhor[linha]]
+            pontos_og = _pontos(sessao.gravidade_original) if sessao.gravidade_original \
+                else gf[linha] + a[linha] * phi_inicio[melhor[linha]]
+            eta = self._referencias[linha] + timedelta(hours=float(horas[linha]))
+
+            resultado.update({
+                'modelo': {'familia': familia, 'k': k, 't0_horas': t0, 'rmse_pontos': round(float(rmse[linha]), 3)},
+                'gravidade_original': _gravidade(pontos_og),
+                'gravidade_final_prevista': _gravidade(gf[linha]),
+                'eta': eta.isoformat(),
+                'concluida': eta <= agora
+            })
+            if pontos_og > 0:
+                resultado['atenuacao_aparente_prevista'] = round(float((pontos_og - gf[linha]) / pontos_og * 100), 1)
+                if ultima:
+                    resultado['atenuacao_aparente_atual'] = round(float((pontos_og - _pontos(ultima[1])) / pontos_og * 100), 1)
+            resultados[sessao_id] = resultado
+        return resultados
+
+    def get_previsoes(self, forcar=False):
+        """Previsões de todas as sessões em andamento"""
+        return list(self.atualizar(forcar).values())
+
+    def get_previsao(self, sessao_id, forcar=False):
+        """Previsão de uma sessão em andamento (None se não houver leituras de gravidade)"""
+        return self.atualizar(forcar).get(sessao_id)
+
+
+# Instância única por processo
+analise_fermentacao = AnaliseFermentacao()
@@ -0,0 +1,364 @@
+# model/arquivo_historico.py
+import json
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from db.database import db
+
+# Colunas numéricas guardadas no arquivo
+COLUNAS_NUMERICAS = ('temperatura', 'gravidade', 'pressao', 'qualidade_sinal', 'bateria')
+
+# Política padrão quando RETENCAO_HISTORICO_DIAS não define o tipo do dispositivo
+CHAVE_POLITICA_PADRAO = 'padrao'
+
+
+def diretorio_arquivo():
+    """Diretório raiz dos arquivos frios do histórico"""
+    from model.config import Configuracao
+    return Configuracao.get_config('ARQUIVO_HISTORICO_DIR') or os.path.join('instance', 'arquivo_historico')
+
+
+def caminho_particao(dispositivo_id, ano, mes, raiz=None):
+    """Pasta com os blocos .npz de um dispositivo em um mês"""
+    return os.path.join(raiz or diretorio_arquivo(), f'dispositivo_{dispositivo_id}', f'{ano:04d}-{mes:02d}')
+
+
+def _colunas_vazias():
+    colunas = {
+        'id': np.array([], dtype=np.int64),
+        'timestamp': np.array([], dtype='datetime64[ms]'),
+        'unidade': np.array([], dtype=str),
+        'dados': np.array([], dtype=str),
+    }
+    for coluna in COLUNAS_NUMERICAS:
+        colunas[coluna] = np.array([], dtype=float)
+    return colunas
+
+
+def _ler_arquivo(caminho):
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+
+def _ler_particao(pasta):
+    """
+    Junta os blocos de um mês em ordem (timestamp, id).
+
+    Um bloco regravado depois de uma execução interrompida (mesmos ids)
+    aparece uma vez só. O antigo arquivo único do mês (<pasta>.npz) também é lido.
+    """
+    caminhos = [pasta + '.npz'] if os.path.exists(pasta + '.npz') else []
+    if os.path.isdir(pasta):
+        caminhos += [os.path.join(pasta, nome) for nome in sorted(os.listdir(pasta)) if nome.endswith('.npz')]
+    blocos = [_ler_arquivo(caminho) for caminho in caminhos]
+    if not blocos:
+        return _colunas_vazias()
+
+    colunas = {nome: np.concatenate([bloco[nome] for bloco in blocos]) for nome in blocos[0]}
+    _, unicos = np.unique(colunas['id'], return_index=True)
+    ordem = unicos[np.lexsort((colunas['id'][unicos], colunas['timestamp'][unicos]))]
+    return {nome: valores[ordem] for nome, valores in colunas.items()}
+
+
+def gravar_bloco(pasta, registros, campos=None):
+    """
+    Grava um bloco de registros (objetos HistoricoDispositivo) de um mês.
+
+    Cada bloco arquivado vira um arquivo novo, nomeado pelo primeiro
+    (timestamp, id): arquivar não relê nem regrava o que já está no mês, e
+    repetir um bloco interrompido antes da exclusão no banco só substitui o
+    mesmo arquivo. campos ({timestamp: {campo: valor}}, de historico_campos)
+    entra em dados sem sobrescrever as chaves do payload.
+    """
+    campos = campos or {}
+    registros = sorted(registros, key=lambda r: (r.timestamp, r.id))
+    colunas = {
+        'id': np.array([r.id for r in registros], dtype=np.int64),
+        'timestamp': np.array([r.timestamp for r in registros], dtype='datetime64[ms]'),
+        'unidade': np.array([r.unidade or '' for r in registros], dtype=str),
+        'dados': np.array([
+            json.dumps({**campos.get(r.timestamp, {}), **(r.dados or {})}, ensure_ascii=False) for r in registros
+        ], dtype=str),
+    }
+    for coluna in COLUNAS_NUMERICAS:
+        colunas[coluna] = np.array([getattr(r, coluna) for r in registros], dtype=float)
+
+    os.makedirs(pasta, exist_ok=True)
+    primeiro = colunas['timestamp'][0].astype(np.int64)
+    caminho = os.path.join(pasta, f'{primeiro:015d}-{registros[0].id:012d}.npz')
+    temporario = caminho + '.tmp.npz'
+    np.savez_compressed(temporario, **colunas)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def reescrever_blocos(dispositivo_id, transformar, raiz=None):
+    """
+    Aplica transformar(colunas) a cada arquivo arquivado de um dispositivo.
+
+    transformar altera as colunas no lugar e retorna quantas linhas mudou;
+    só os arquivos alterados são regravados (temporário + os.replace). Um
+    arquivo por vez fica em memória. Retorna o total de linhas alteradas.
+    """
+    raiz = raiz or diretorio_arquivo()
+    total = 0
+    for ano, mes in _meses_arquivados(dispositivo_id, raiz):
+        pasta = caminho_particao(dispositivo_id, ano, mes, raiz)
+        caminhos = [pasta + '.npz'] if os.path.exists(pasta + '.npz') else []
+        if os.path.isdir(pasta):
+            caminhos += [os.path.join(pasta, nome) for nome in sorted(os.listdir(pasta)) if nome.endswith('.npz')]
+        for caminho in caminhos:
+            colunas = _ler_arquivo(caminho)
+            alteradas = transformar(colunas)
+            if not alteradas:
+                continue
+            temporario = caminho[:-4] + '.tmp.npz'
+            np.savez_compressed(temporario, **colunas)
+            os.replace(temporario, caminho)
+            total += alteradas
+    return total
+
+
+def _meses_arquivados(dispositivo_id, raiz):
+    """(ano, mes) com dados arquivados de um dispositivo, em ordem"""
+    pasta = os.path.join(raiz, f'dispositivo_{dispositivo_id}')
+    if not os.path.isdir(pasta):
+        return []
+    meses = set()
+    for nome in os.listdir(pasta):
+        chave = nome[:-4] if nome.endswith('.npz') else nome
+        try:
+            ano, mes = chave.split('-')
+            meses.add((int(ano), int(mes)))
+        except ValueError:
+            continue
+    return sorted(meses)
+
+
+def iterar_particoes(dispositivo_id, inicio=None, fim=None, raiz=None, decrescente=False):
+    """
+    Gera as colunas arquivadas de um dispositivo mês a mês, já filtradas pelo período.
+
+    Só um mês fica em memória por vez; decrescente=True percorre do mais
+    novo para o mais antigo.
+    """
+    raiz = raiz or diretorio_arquivo()
+    meses = _meses_arquivados(dispositivo_id, raiz)
+    if inicio:
+        meses = [m for m in meses if m >= (inicio.year, inicio.month)]
+    if fim:
+        meses = [m for m in meses if m <= (fim.year, fim.month)]
+    if decrescente:
+        meses.reverse()
+
+    for ano, mes in meses:
+        colunas = _ler_particao(caminho_particao(dispositivo_id, ano, mes, raiz))
+        mascara = np.ones(len(colunas['id']), dtype=bool)
+        if inicio:
+            mascara &= colunas['timestamp'] >= np.datetime64(inicio, 'ms')
+        if fim:
+            mascara &= colunas['timestamp'] <= np.datetime64(fim, 'ms')
+        if mascara.any():
+            yield {nome: valores[mascara] for nome, valores in colunas.items()}
+
+
+def ler_periodo(dispositivo_id, inicio=None, fim=None, raiz=None):
+    """Lê do arquivo frio as colunas de um dispositivo no período (arrays NumPy)"""
+    particoes = list(iterar_particoes(dispositivo_id, inicio, fim, raiz))
+    if not particoes:
+        return _colunas_vazias()
+    return {nome: np.concatenate([p[nome] for p in particoes]) for nome in particoes[0]}
+
+
+def _registros(dispositivo_id, colunas, indices):
+    """Objetos HistoricoDispositivo transientes (fora da sessão) para as linhas indicadas"""
+    from model.dispositivos import HistoricoDispositivo
+
+    registros = []
+    for i in indices:
+        registro = HistoricoDispositivo(
+            id=int(colunas['id'][i]),
+            dispositivo_id=dispositivo_id,
+            timestamp=colunas['timestamp'][i].astype(datetime),
+            unidade=str(colunas['unidade'][i]) or None,
+            dados=json.loads(str(colunas['dados'][i]))
+        )
+        for coluna in COLUNAS_NUMERICAS:
+            valor = colunas[coluna][i]
+            setattr(registro, coluna, None if np.isnan(valor) else float(valor))
+        registros.append(registro)
+    return registros
+
+
+def registros_periodo(dispositivo_id, inicio=None, fim=None):
+    """Registros arquivados como objetos HistoricoDispositivo transientes (fora da sessão)"""
+    registros = []
+    for colunas in iterar_particoes(dispositivo_id, inicio, fim):
+        registros.extend(_registros(dispositivo_id, colunas, range(len(colunas['id']))))
+    return registros
+
+
+def registros_pagina(dispositivo_id, limite, after=None, inicio=None, fim=None, ordem='asc', raiz=None):
+    """
+    Até limite registros arquivados depois do cursor (timestamp, id), na ordem pedida.
+
+    Percorre os meses a partir do cursor e para assim que a página enche,
+    então cada página lê só os meses que ela alcança.
+    """
+    decrescente = ordem == 'desc'
+    if after:
+        after_ts, after_id = after
+        if decrescente:
+            fim = min(fim, after_ts) if fim else after_ts
+        else:
+            inicio = max(inicio, after_ts) if inicio else after_ts
+
+    registros = []
+    for colunas in iterar_particoes(dispositivo_id, inicio, fim, raiz, decrescente=decrescente):
+        mascara = np.ones(len(colunas['id']), dtype=bool)
+        if after:
+            cursor = np.datetime64(after_ts, 'ms')
+            if decrescente:
+                mascara = (colunas['timestamp'] < cursor) | ((colunas['timestamp'] == cursor) & (colunas['id'] < after_id))
+            else:
+                mascara = (colunas['timestamp'] > cursor) | ((colunas['timestamp'] == cursor) & (colunas['id'] > after_id))
+        indices = np.flatnonzero(mascara)
+        if decrescente:
+            indices = indices[::-1]
+        registros.extend(_registros(dispositivo_id, colunas, indices[:limite - len(registros)]))
+        if len(registros) >= limite:
+            break
+    return registros
+
+
+def linhas_periodo(dispositivo_id, colunas, inicio=None, fim=None):
+    """
+    Tuplas arquivadas com as colunas pedidas, no formato de HistoricoDispositivo.iterar_linhas.
+
+    Lê um mês por vez, então a exportação continua com memória constante
+    (um mês de um dispositivo) mesmo quando o período alcança o arquivo.
+    """
+    for arquivo in iterar_particoes(dispositivo_id, inicio, fim):
+        for i in range(len(arquivo['id'])):
+            linha = []
+            for coluna in colunas:
+                if coluna == 'dispositivo_id':
+                    linha.append(dispositivo_id)
+                elif coluna == 'timestamp':
+                    linha.append(arquivo['timestamp'][i].astype(datetime))
+                elif coluna == 'id':
+                    linha.append(int(arquivo['id'][i]))
+                elif coluna == 'dados':
+                    linha.append(json.loads(str(arquivo['dados'][i])))
+                elif coluna == 'unidade':
+                    linha.append(str(arquivo['unidade'][i]) or None)
+                else:
+                    valor = arquivo[coluna][i]
+                    linha.append(None if np.isnan(valor) else float(valor))
+            yield tuple(linha)
+
+
+class RetencaoService:
+    """Move o histórico antigo para arquivos frios e o remove do banco em blocos"""
+
+    @staticmethod
+    def get_politica():
+        """Dias de retenção por tipo de dispositivo (0 ou ausente = manter tudo)"""
+        from model.config import Configuracao
+        politica = Configuracao.get_config('RETENCAO_HISTORICO_DIAS') or {}
+        return politica if isinstance(politica, dict) else {}
+
+    @staticmethod
+    def dias_retencao(dispositivo, politica):
+        dias = politica.get(dispositivo.tipo.value, politica.get(CHAVE_POLITICA_PADRAO))
+        try:
+            return int(dias) if dias else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def arquivar_dispositivo(dispositivo_id, corte, tamanho_bloco=5000, raiz=None):
+        """
+        Arquiva e exclui, em blocos com commit, as leituras anteriores ao corte.
+
+        Os valores de historico_campos das leituras arquivadas vão junto,
+        dentro de dados no arquivo, e saem do banco com o mesmo corte.
+        """
+        from model.campos_leitura import HistoricoCampo
+        from model.dispositivos import HistoricoDispositivo
+
+        total = 0
+        while True:
+            bloco = HistoricoDispositivo.query.filter(
+                HistoricoDispositivo.dispositivo_id == dispositivo_id,
+                HistoricoDispositivo.timestamp < corte
+            ).order_by(HistoricoDispositivo.timestamp.asc(), HistoricoDispositivo.id.asc())\
+                .limit(tamanho_bloco).all()
+            if not bloco:
+                break
+
+            inicio_bloco, fim_bloco = bloco[0].timestamp, bloco[-1].timestamp
+            campos = {}
+            for timestamp, campo, valor in db.session.query(
+                HistoricoCampo.timestamp, HistoricoCampo.campo, HistoricoCampo.valor
+            ).filter(
+                HistoricoCampo.dispositivo_id == dispositivo_id,
+                HistoricoCampo.timestamp >= inicio_bloco,
+                HistoricoCampo.timestamp <= fim_bloco
+            ):
+                campos.setdefault(timestamp, {})[campo] = valor
+
+            por_mes = {}
+            for registro in bloco:
+                por_mes.setdefault((registro.timestamp.year, registro.timestamp.month), []).append(registro)
+            for (ano, mes), registros in por_mes.items():
+                gravar_bloco(caminho_particao(dispositivo_id, ano, mes, raiz), registros, campos)
+
+            # Só exclui depois que o arquivo foi gravado. Os campos do último
+            # instante ficam para o próximo bloco, que pode ter leituras nele
+            ids = [registro.id for registro in bloco]
+            HistoricoDispositivo.query.filter(HistoricoDispositivo.id.in_(ids))\
+                .delete(synchronize_session=False)
+            HistoricoCampo.query.filter(
+                HistoricoCampo.dispositivo_id == dispositivo_id,
+                HistoricoCampo.timestamp < fim_bloco
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            total += len(ids)
+
+        HistoricoCampo.query.filter(
+            HistoricoCampo.dispositivo_id == dispositivo_id,
+            HistoricoCampo.timestamp < corte
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return total
+
+    @staticmethod
+    def executar(tamanho_bloco=5000):
+        """Aplica a política de retenção a todos os dispositivos"""
+        from model.dispositivos import Dispositivo
+
+        politica = RetencaoService.get_politica()
+        raiz = diretorio_arquivo()
+        resultado = {}
+        dispositivos = [
+            (dispositivo.id, RetencaoService.dias_retencao(dispositivo, politica))
+            for dispositivo in Dispositivo.visiveis().all()
+        ]
+        for dispositivo_id, dias in dispositivos:
+            if not dias:
+                continue
+            corte = datetime.now() - timedelta(days=dias)
+            arquivados = RetencaoService.arquivar_dispositivo(dispositivo_id, corte, tamanho_bloco, raiz)
+            if arquivados:
+                resultado[dispositivo_id] = arquivados
+                print(f"🗄️  Dispositivo {dispositivo_id}: {arquivados} leituras arquivadas")
+        return resultado
+
+
+def remover_arquivo_dispositivo(dispositivo_id):
+    """Remove todos os arquivos frios de um dispositivo"""
+    import shutil
+    pasta = os.path.join(diretorio_arquivo(), f'dispositivo_{dispositivo_id}')
+    if os.path.isdir(pasta):
+        shutil.rmtree(pasta)
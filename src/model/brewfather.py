@@ -1,8 +1,17 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Float, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from db.database import db
+from model.agregados import _insert_upsert
+from utils.cache_respostas import CacheRespostas, TTL_PADRAO, MAX_BYTES_PADRAO
 
 class BrewFatherSync(db.Model):
     """Modelo para controle de sincronização com BrewFather"""
@@ -93,29 +102,221 @@ class BrewFatherInventory(db.Model):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+class BrewFatherFingerprint(db.Model):
+    """Hash do último JSON recebido de cada item, para pular os que não mudaram"""
+    __tablename__ = 'brewfather_fingerprints'
+    __table_args__ = (UniqueConstraint('sync_type', 'brewfather_id'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sync_type = Column(String(50), nullable=False)  # recipes, batches, inventory
+    brewfather_id = Column(String(100), nullable=False)
+    summary_hash = Column(String(64), nullable=True)  # Item da lista (receitas: resumo)
+    content_hash = Column(String(64), nullable=True)  # Receitas: detalhe completo
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def fingerprint(data):
+    """SHA-256 do JSON canônico (chaves ordenadas) de um item da API"""
+    texto = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+# Limite da API do BrewFather: 500 requisições por hora por chave
+REQUISICOES_POR_HORA = 500
+
+# Requisições que podem sair de uma vez antes de o limite de taxa segurar
+RAJADA_REQUISICOES = 50
+
+# Buscas de detalhes em paralelo durante a sincronização
+WORKERS_DETALHES = 4
+
+# Novas tentativas quando a API responde 429 (Too Many Requests)
+TENTATIVAS_LIMITE_TAXA = 3
+ESPERA_PADRAO_LIMITE_TAXA = 60
+
+# Itens gravados por comando de upsert (e por commit) durante a sincronização
+TAMANHO_LOTE_UPSERT = 500
+
+class LimitadorTaxa:
+    """
+    Token bucket compartilhado pelas threads que chamam a API.
+    
+    Cada requisição consome um token; os tokens voltam a `taxa` por segundo
+    até `capacidade`. Uma resposta 429 pausa todas as threads pelo tempo
+    pedido pela API (Retry-After).
+    """
+    
+    def __init__(self, taxa=REQUISICOES_POR_HORA / 3600.0, capacidade=RAJADA_REQUISICOES):
+        self._lock = threading.Lock()
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._atualizado = time.monotonic()
+        self._pausado_ate = 0.0
+    
+    def configurar(self, taxa, capacidade):
+        with self._lock:
+            self.taxa = max(taxa, 1e-6)
+            self.capacidade = max(capacidade, 1)
+            self._tokens = min(self._tokens, self.capacidade)
+    
+    def adquirir(self):
+        """Bloqueia até haver um token disponível"""
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                espera = self._pausado_ate - agora
+                if espera <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+    
+    def pausar(self, segundos):
+        with self._lock:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+            self._tokens = 0.0
+
+# Instância única por processo (o limite da API vale para a chave, não para o cliente)
+limitador_brewfather = LimitadorTaxa()
+
+# Cache em disco das respostas da API, compartilhado pelos clientes (configurado em get_api_client)
+cache_brewfather = CacheRespostas()
+
+# Maior página aceita pelos endpoints de lista da API
+LIMITE_PAGINA = 50
+
+class ErroPaginacao(Exception):
+    """Uma página de um endpoint de lista não pôde ser obtida"""
+
+class PaginadorBrewFather:
+    """
+    Percorre todos os itens de um endpoint de lista, página a página.
+    
+    A próxima página é pedida com start_after = _id do último item recebido
+    (ordem padrão da API, por _id). Só a página atual fica em memória; os
+    itens são gerados um a um. paginas e itens contam o progresso.
+    """
+    
+    def __init__(self, api, endpoint, params=None, per_page=LIMITE_PAGINA):
+        self.api = api
+        self.endpoint = endpoint
+        self.params = dict(params or {})
+        self.per_page = min(per_page, LIMITE_PAGINA)
+        self.paginas = 0
+        self.itens = 0
+        self.concluido = False
+    
+    def __iter__(self):
+        params = dict(self.params, limit=self.per_page)
+        while True:
+            pagina = self.api._make_request(self.endpoint, params)
+            if pagina is None:
+                raise ErroPaginacao(f'Nenhum dado recebido da API ({self.endpoint}, página {self.paginas + 1})')
+            self.paginas += 1
+            print(f"📄 {self.endpoint}: página {self.paginas} ({self.itens + len(pagina)} itens)")
+            for item in pagina:
+                self.itens += 1
+                yield item
+            
+            ultimo_id = pagina[-1].get('_id') if pagina else None
+            if len(pagina) < self.per_page or not ultimo_id:
+                break
+            params['start_after'] = ultimo_id
+        self.concluido = True
+    
+    def progresso(self):
+        return {'pages': self.paginas, 'fetched': self.itens}
+
+def _retry_after(response):
+    try:
+        return max(float(response.headers.get('Retry-After', ESPERA_PADRAO_LIMITE_TAXA)), 1.0)
+    except (TypeError, ValueError):
+        return ESPERA_PADRAO_LIMITE_TAXA
+
 class BrewFatherAPI:
     """Classe para integração com a API do BrewFather"""
     
     BASE_URL = "https://api.brewfather.app/v2"
     
-    def __init__(self, user_id=None, api_key=None):
+    def __init__(self, user_id=None, api_key=None, limitador=None, cache=None, revalidar=False):
         self.user_id = user_id
         self.api_key = api_key
+        self.limitador = limitador
+        self.cache = cache
+        # revalidar=True: nunca usa o cache sem perguntar à API (sincronização)
+        self.revalidar = revalidar
+        self._inventario = None
+        self._inventario_lock = threading.Lock()
         self.session = requests.Session()
         
         if user_id and api_key:
             self.session.auth = (user_id, api_key)
+        
+        # requests.Session não é thread-safe: cada thread do pool usa a sua
+        self._local = threading.local()
+        self._local.session = self.session
+    
+    def _get_session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.auth = self.session.auth
+            self._local.session = session
+        return session
     
     def _make_request(self, endpoint, params=None):
-        """Faz requisição para a API do BrewFather"""
+        """
+        Faz requisição para a API do BrewFather.
+        
+        Com cache, uma resposta dentro da validade é devolvida sem
+        requisição; vencida (ou com revalidar=True), é revalidada com
+        If-None-Match / If-Modified-Since e reaproveitada se a API
+        responder 304.
+        """
         if not self.user_id or not self.api_key:
             raise ValueError("User ID e API Key são necessários")
         
         url = f"{self.BASE_URL}/{endpoint}"
+        chave = entrada = None
+        headers = {}
+        if self.cache and self.cache.ativo:
+            chave = self.cache.chave(self.user_id, endpoint, params or {})
+            entrada = self.cache.obter(chave)
+            if entrada:
+                if not self.revalidar and self.cache.fresca(entrada):
+                    return entrada['corpo']
+                if entrada.get('etag'):
+                    headers['If-None-Match'] = entrada['etag']
+                if entrada.get('last_modified'):
+                    headers['If-Modified-Since'] = entrada['last_modified']
+        
         try:
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            for tentativa in range(TENTATIVAS_LIMITE_TAXA + 1):
+                if self.limitador:
+                    self.limitador.adquirir()
+                response = self._get_session().get(url, params=params, headers=headers, timeout=30)
+                if response.status_code == 429 and tentativa < TENTATIVAS_LIMITE_TAXA:
+                    espera = _retry_after(response)
+                    print(f"⏳ Limite da API do BrewFather atingido; aguardando {espera:.0f}s")
+                    if self.limitador:
+                        self.limitador.pausar(espera)
+                    else:
+                        time.sleep(espera)
+                    continue
+                if response.status_code == 304 and entrada:
+                    self.cache.renovar(chave, entrada)
+                    return entrada['corpo']
+                response.raise_for_status()
+                data = response.json()
+                if chave:
+                    self.cache.gravar(
+                        chave, data,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified')
+                    )
+                return data
         except requests.exceptions.RequestException as e:
             print(f"Erro na requisição para {endpoint}: {e}")
             return None
@@ -128,21 +329,61 @@ class BrewFatherAPI:
         except:
             return False
     
-    def get_recipes(self, page=1, per_page=50):
-        """Obtém receitas do BrewFather"""
+    def paginate(self, endpoint, params=None, per_page=LIMITE_PAGINA):
+        """Iterador sobre todas as páginas de um endpoint de lista"""
+        return PaginadorBrewFather(self, endpoint, params, per_page)
+    
+    def get_recipes(self, page=1, per_page=50, start_after=None):
+        """Obtém uma página de receitas do BrewFather"""
         params = {
             'page': page,
             'limit': per_page,
             'order_by': 'name'
         }
+        if start_after:
+            params['start_after'] = start_after
         return self._make_request("recipes", params)
     
+    def get_recipes_list(self):
+        """Obtém o resumo de todas as receitas (todas as páginas)"""
+        return list(self.paginate("recipes"))
+    
     def get_recipe(self, recipe_id):
         """Obtém uma receita específica"""
         return self._make_request(f"recipes/{recipe_id}")
     
-    def get_batches(self, page=1, per_page=50, status=None):
-        """Obtém lotes do BrewFather"""
+    # Nome usado pelas rotas de busca direta
+    get_recipe_detail = get_recipe
+    
+    def get_recipe_details(self, recipe_ids, max_workers=WORKERS_DETALHES):
+        """
+        Busca os detalhes de várias receitas em um pool de threads.
+        
+        Gera (recipe_id, detalhe) na ordem em que as respostas chegam; no
+        máximo 2 x max_workers buscas ficam pendentes, então a lista de ids
+        pode ser um iterador longo. O ritmo é dado pelo limitador de taxa.
+        """
+        ids = iter(recipe_ids)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='brewfather') as executor:
+            pendentes = {
+                executor.submit(self.get_recipe, recipe_id): recipe_id
+                for recipe_id in itertools.islice(ids, max_workers * 2)
+            }
+            while pendentes:
+                concluidas, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    recipe_id = pendentes.pop(futuro)
+                    for proximo in itertools.islice(ids, 1):
+                        pendentes[executor.submit(self.get_recipe, proximo)] = proximo
+                    try:
+                        detalhe = futuro.result()
+                    except Exception as e:
+                        print(f"Erro ao buscar detalhes da receita {recipe_id}: {e}")
+                        detalhe = None
+                    yield recipe_id, detalhe
+    
+    def get_batches(self, page=1, per_page=50, status=None, start_after=None):
+        """Obtém uma página de lotes do BrewFather"""
         params = {
             'page': page,
             'limit': per_page,
@@ -150,49 +391,68 @@ class BrewFatherAPI:
         }
         if status:
             params['status'] = status
+        if start_after:
+            params['start_after'] = start_after
         return self._make_request("batches", params)
     
     def get_batch(self, batch_id):
         """Obtém um lote específico"""
         return self._make_request(f"batches/{batch_id}")
     
-    def get_inventory(self, page=1, per_page=50):
-        """Obtém estoque do BrewFather"""
+    def get_inventory(self, page=1, per_page=50, start_after=None):
+        """Obtém uma página do estoque do BrewFather"""
         params = {
             'page': page,
             'limit': per_page,
             'sort': 'name'
         }
+        if start_after:
+            params['start_after'] = start_after
         return self._make_request("inventory", params)
     
+    def get_inventory_snapshot(self):
+        """
+        Todo o estoque (todas as páginas), lido uma vez por cliente.
+        
+        Os filtros por tipo usam esta mesma lista, e as páginas vêm do
+        cache de respostas enquanto estiverem válidas.
+        """
+        with self._inventario_lock:
+            if self._inventario is None:
+                try:
+                    self._inventario = list(self.paginate("inventory"))
+                except ErroPaginacao as e:
+                    print(f"Erro ao buscar estoque do BrewFather: {e}")
+                    return []
+            return self._inventario
+    
+    def _inventory_by_type(self, item_type):
+        return [item for item in self.get_inventory_snapshot() if item.get('type') == item_type]
+    
     def get_fermentables(self):
         """Obtém fermentáveis do estoque"""
-        inventory = self.get_inventory(per_page=50)
-        if inventory:
-            return [item for item in inventory if item.get('type') == 'fermentable']
-        return []
+        return self._inventory_by_type('fermentable')
     
     def get_hops(self):
         """Obtém lúpulos do estoque"""
-        inventory = self.get_inventory(per_page=50)
-        if inventory:
-            return [item for item in inventory if item.get('type') == 'hop']
-        return []
+        return self._inventory_by_type('hop')
     
     def get_yeasts(self):
         """Obtém leveduras do estoque"""
-        inventory = self.get_inventory(per_page=50)
-        if inventory:
-            return [item for item in inventory if item.get('type') == 'yeast']
-        return []
+        return self._inventory_by_type('yeast')
 
 # Serviço de Sincronização
 class BrewFatherService:
     """Serviço para sincronização com BrewFather"""
     
     @staticmethod
-    def get_api_client():
-        """Obtém cliente API configurado"""
+    def get_api_client(revalidar=False):
+        """
+        Obtém cliente API configurado.
+        
+        revalidar=True faz o cliente confirmar cada resposta do cache com a
+        API (usado pela sincronização, que precisa ver toda alteração).
+        """
         from model.config import Configuracao
         
         user_id = Configuracao.get_config('BREWFATHER_USER_ID')
@@ -202,13 +462,195 @@ class BrewFatherService:
         if not enabled or not user_id or not api_key:
             return None
         
-        return BrewFatherAPI(user_id, api_key)
+        requisicoes_por_hora = float(Configuracao.get_config('BREWFATHER_REQUISICOES_POR_HORA', REQUISICOES_POR_HORA))
+        limitador_brewfather.configurar(
+            requisicoes_por_hora / 3600.0,
+            min(RAJADA_REQUISICOES, max(int(requisicoes_por_hora), 1))
+        )
+        
+        cache_brewfather.configurar(
+            Configuracao.get_config('BREWFATHER_CACHE_DIR') or os.path.join('instance', 'cache_brewfather'),
+            ttl=float(Configuracao.get_config('BREWFATHER_CACHE_TTL', TTL_PADRAO)),
+            max_bytes=int(float(Configuracao.get_config('BREWFATHER_CACHE_MAX_MB', MAX_BYTES_PADRAO / 1048576)) * 1048576)
+        )
+        return BrewFatherAPI(user_id, api_key, limitador=limitador_brewfather, cache=cache_brewfather, revalidar=revalidar)
+    
+    @staticmethod
+    def _load_fingerprints(sync_type, model):
+        """Hashes da última sincronização e ids já gravados, em duas consultas"""
+        fingerprints = {
+            fp.brewfather_id: fp
+            for fp in db.session.query(
+                BrewFatherFingerprint.brewfather_id,
+                BrewFatherFingerprint.summary_hash,
+                BrewFatherFingerprint.content_hash
+            ).filter_by(sync_type=sync_type).all()
+        }
+        existing_ids = {brewfather_id for (brewfather_id,) in db.session.query(model.brewfather_id).all()}
+        return fingerprints, existing_ids
+    
+    @staticmethod
+    def _bulk_upsert(model, rows, conflict=('brewfather_id',)):
+        """
+        Grava as linhas com um único INSERT ... ON CONFLICT DO UPDATE (SQLite e PostgreSQL).
+        
+        Todas as linhas devem ter as mesmas chaves; as colunas que não estão
+        nas linhas (id, created_at, is_active) ficam como estão nas existentes.
+        """
+        if not rows:
+            return
+        # O PostgreSQL recusa o mesmo id duas vezes no mesmo comando: fica a última versão
+        rows = list({tuple(row[coluna] for coluna in conflict): row for row in rows}.values())
+        insert = _insert_upsert()
+        stmt = insert(model.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(conflict),
+            set_={coluna: stmt.excluded[coluna] for coluna in rows[0] if coluna not in conflict}
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def _flush(model, rows, fp_rows):
+        """Grava o lote acumulado (itens e hashes) e faz o commit"""
+        BrewFatherService._bulk_upsert(model, rows)
+        BrewFatherService._bulk_upsert(BrewFatherFingerprint, fp_rows, conflict=('sync_type', 'brewfather_id'))
+        db.session.commit()
+        rows.clear()
+        fp_rows.clear()
+    
+    @staticmethod
+    def _fingerprint_row(sync_type, brewfather_id, summary_hash=None, content_hash=None):
+        return {
+            'sync_type': sync_type,
+            'brewfather_id': brewfather_id,
+            'summary_hash': summary_hash,
+            'content_hash': content_hash,
+            'updated_at': datetime.now(),
+        }
+    
+    @staticmethod
+    def _recipe_row(recipe_id, recipe_detail):
+        """Linha de brewfather_recipes a partir do JSON de detalhes da receita"""
+        # Estilo - verificar diferentes formatos
+        style_data = recipe_detail.get('style')
+        if isinstance(style_data, dict):
+            style = style_data.get('name', '')
+        else:
+            style = str(style_data) if style_data else ''
+        
+        # Datas - converter corretamente
+        created = None
+        created_date = recipe_detail.get('_created')
+        if created_date and isinstance(created_date, dict):
+            try:
+                created = datetime.fromtimestamp(created_date.get('_seconds', 0))
+            except:
+                created = None
+        
+        brewed = None
+        last_brewed = recipe_detail.get('lastBrewed')
+        if last_brewed:
+            try:
+                # Pode ser timestamp ou objeto de data
+                if isinstance(last_brewed, (int, float)):
+                    brewed = datetime.fromtimestamp(last_brewed / 1000)
+                elif isinstance(last_brewed, dict):
+                    brewed = datetime.fromtimestamp(last_brewed.get('_seconds', 0))
+            except Exception as e:
+                print(f"Erro ao converter data: {e}")
+                brewed = None
+        
+        agora = datetime.now()
+        return {
+            'brewfather_id': recipe_id,
+            'name': recipe_detail.get('name', ''),
+            'style': style,
+            'abv': recipe_detail.get('abv'),
+            'ibu': recipe_detail.get('ibu'),
+            'color': recipe_detail.get('color'),
+            'batch_size': recipe_detail.get('batchSize'),
+            'efficiency': recipe_detail.get('efficiency'),
+            'original_gravity': recipe_detail.get('og'),
+            'final_gravity': recipe_detail.get('fg'),
+            'ingredients': {
+                'fermentables': recipe_detail.get('fermentables', []),
+                'hops': recipe_detail.get('hops', []),
+                'yeasts': recipe_detail.get('yeasts', []),
+                'miscs': recipe_detail.get('miscs', [])
+            },
+            'created_date': created,
+            'last_brewed': brewed,
+            'notes': recipe_detail.get('notes', ''),
+            'rating': recipe_detail.get('rating', 0),
+            'brew_count': recipe_detail.get('brewCount', 0),
+            'raw_data': recipe_detail,
+            'synchronized_at': agora,
+            'updated_at': agora,
+        }
+    
+    @staticmethod
+    def _batch_row(batch_data):
+        """Linha de brewfather_batches a partir de um item da lista de lotes"""
+        brew_date = None
+        if batch_data.get('brewDate'):
+            brew_date = datetime.fromtimestamp(batch_data.get('brewDate') / 1000)
+        
+        agora = datetime.now()
+        return {
+            'brewfather_id': batch_data.get('_id'),
+            'recipe_id': batch_data.get('recipe', {}).get('_id', ''),
+            'recipe_name': batch_data.get('recipe', {}).get('name', ''),
+            'batch_no': batch_data.get('batchNo', 0),
+            'status': batch_data.get('status', ''),
+            'brew_date': brew_date,
+            # Gravidades e medidas
+            'estimated_og': batch_data.get('estimatedOg', 0),
+            'measured_og': batch_data.get('measuredOg', 0),
+            'estimated_fg': batch_data.get('estimatedFg', 0),
+            'measured_fg': batch_data.get('measuredFg', 0),
+            'estimated_abv': batch_data.get('estimatedAbv', 0),
+            'measured_abv': batch_data.get('measuredAbv', 0),
+            'estimated_ibu': batch_data.get('estimatedIbu', 0),
+            'estimated_color': batch_data.get('estimatedColor', 0),
+            'batch_size': batch_data.get('batchSize', 0),
+            'efficiency': batch_data.get('efficiency', 0),
+            'notes': batch_data.get('notes', ''),
+            'rating': batch_data.get('rating', 0),
+            'raw_data': batch_data,
+            'synchronized_at': agora,
+            'updated_at': agora,
+        }
     
     @staticmethod
-    def sync_recipes():
-        """Sincroniza receitas do BrewFather"""
+    def _inventory_row(item_data):
+        """Linha de brewfather_inventory a partir de um item do estoque"""
+        agora = datetime.now()
+        return {
+            'brewfather_id': item_data.get('_id'),
+            'name': item_data.get('name', ''),
+            'type': item_data.get('type', ''),
+            'category': item_data.get('category', ''),
+            'quantity': item_data.get('quantity', 0),
+            'unit': item_data.get('unit', ''),
+            'price': item_data.get('price', 0),
+            'supplier': item_data.get('supplier', ''),
+            'notes': item_data.get('notes', ''),
+            'raw_data': item_data,
+            'synchronized_at': agora,
+            'updated_at': agora,
+        }
+    
+    @staticmethod
+    def sync_recipes(force=False):
+        """
+        Sincroniza receitas do BrewFather.
+        
+        Só busca o detalhe das receitas cujo resumo mudou desde a última
+        sincronização, e só grava as que mudaram de fato (force=True grava tudo).
+        As receitas são gravadas em lotes de TAMANHO_LOTE_UPSERT, um upsert por lote.
+        """
         print("Iniciando sincronização de receitas do BrewFather...")
-        api = BrewFatherService.get_api_client()
+        api = BrewFatherService.get_api_client(revalidar=True)
         print(f"API Client: {api}")
         if not api:
             return {'success': False, 'error': 'BrewFather não configurado'}
@@ -219,108 +661,69 @@ class BrewFatherService:
             db.session.add(sync)
             db.session.flush()
             
-            # Buscar lista básica de receitas
-            recipes_list = api.get_recipes(per_page=50)
-            if not recipes_list:
-                sync.status = 'error'
-                sync.error_message = 'Nenhum dado recebido da API'
-                db.session.commit()
-                return {'success': False, 'error': 'Nenhum dado recebido da API'}
+            # Lista de receitas percorrida página a página, sob demanda.
+            # _timestamp_ms faz o resumo mudar sempre que a receita é editada
+            paginador = api.paginate("recipes", {'include': '_timestamp_ms'})
+            fingerprints, existing_ids = BrewFatherService._load_fingerprints('recipes', BrewFatherRecipe)
+            summary_hashes = {}
+            rows, fp_rows = [], []
             
             count = 0
             error_count = 0
+            unchanged = 0
             
-            for recipe_summary in recipes_list:
-                try:
-                    recipe_id = recipe_summary.get('_id')
+            def changed_recipe_ids():
+                nonlocal unchanged
+                for summary in paginador:
+                    recipe_id = summary.get('_id')
                     if not recipe_id:
                         continue
-                    
-                    # BUSCAR DETALHES COMPLETOS DA RECEITA
-                    recipe_detail = api.get_recipe(recipe_id)
+                    summary_hash = fingerprint(summary)
+                    fp = fingerprints.get(recipe_id)
+                    if not force and recipe_id in existing_ids and fp and fp.summary_hash == summary_hash:
+                        unchanged += 1
+                        continue
+                    summary_hashes[recipe_id] = summary_hash
+                    yield recipe_id
+            
+            # Detalhes buscados em paralelo (limitados pela taxa da API);
+            # a gravação no banco fica nesta thread, conforme as respostas chegam
+            from model.config import Configuracao
+            max_workers = int(Configuracao.get_config('BREWFATHER_WORKERS', WORKERS_DETALHES) or WORKERS_DETALHES)
+            
+            for recipe_id, recipe_detail in api.get_recipe_details(changed_recipe_ids(), max_workers=max(max_workers, 1)):
+                try:
+                    summary_hash = summary_hashes.pop(recipe_id, None)
                     if not recipe_detail:
                         print(f"⚠️  Não foi possível buscar detalhes da receita {recipe_id}")
                         error_count += 1
                         continue
                     
-                    # Verificar se já existe
-                    existing = BrewFatherRecipe.query.filter_by(
-                        brewfather_id=recipe_id
-                    ).first()
-                
-                    if existing:
-                        recipe = existing
-                    else:
-                        recipe = BrewFatherRecipe(brewfather_id=recipe_id)
-                        db.session.add(recipe)
-                    
-                    # ATUALIZAR COM DADOS COMPLETOS DO JSON DE DETALHES
-                    recipe.name = recipe_detail.get('name', '')
+                    content_hash = fingerprint(recipe_detail)
+                    fp_rows.append(BrewFatherService._fingerprint_row(
+                        'recipes', recipe_id, summary_hash=summary_hash, content_hash=content_hash
+                    ))
                     
-                    # Estilo - verificar diferentes formatos
-                    style_data = recipe_detail.get('style')
-                    if isinstance(style_data, dict):
-                        recipe.style = style_data.get('name', '')
+                    # Resumo mudou, mas o conteúdo não: só o hash do resumo é atualizado
+                    fp = fingerprints.get(recipe_id)
+                    if not force and recipe_id in existing_ids and fp and fp.content_hash == content_hash:
+                        unchanged += 1
                     else:
-                        recipe.style = str(style_data) if style_data else ''
-                    
-                    # Dados numéricos - usar valores do JSON detalhado
-                    recipe.abv = recipe_detail.get('abv')
-                    recipe.ibu = recipe_detail.get('ibu')
-                    recipe.color = recipe_detail.get('color')
-                    recipe.batch_size = recipe_detail.get('batchSize')
-                    recipe.efficiency = recipe_detail.get('efficiency')
-                    
-                    # Gravidades - usar valores corretos do JSON
-                    recipe.original_gravity = recipe_detail.get('og')
-                    recipe.final_gravity = recipe_detail.get('fg')
-                    
-                    # Ingredientes - estruturar corretamente
-                    ingredients = {
-                        'fermentables': recipe_detail.get('fermentables', []),
-                        'hops': recipe_detail.get('hops', []),
-                        'yeasts': recipe_detail.get('yeasts', []),
-                        'miscs': recipe_detail.get('miscs', [])
-                    }
-                    recipe.ingredients = ingredients
-                    
-                    # Datas - converter corretamente
-                    created_date = recipe_detail.get('_created')
-                    if created_date and isinstance(created_date, dict):
-                        try:
-                            seconds = created_date.get('_seconds', 0)
-                            recipe.created_date = datetime.fromtimestamp(seconds)
-                        except:
-                            recipe.created_date = None
-                    
-                    last_brewed = recipe_detail.get('lastBrewed')
-                    if last_brewed:
-                        try:
-                            # Pode ser timestamp ou objeto de data
-                            if isinstance(last_brewed, (int, float)):
-                                recipe.last_brewed = datetime.fromtimestamp(last_brewed / 1000)
-                            elif isinstance(last_brewed, dict):
-                                seconds = last_brewed.get('_seconds', 0)
-                                recipe.last_brewed = datetime.fromtimestamp(seconds)
-                        except Exception as e:
-                            print(f"Erro ao converter data: {e}")
-                            recipe.last_brewed = None
+                        row = BrewFatherService._recipe_row(recipe_id, recipe_detail)
+                        rows.append(row)
+                        count += 1
+                        print(f"✅ Receita sincronizada: {row['name']}")
                     
-                    # Outros campos
-                    recipe.notes = recipe_detail.get('notes', '')
-                    recipe.rating = recipe_detail.get('rating', 0)
-                    recipe.brew_count = recipe_detail.get('brewCount', 0)
-                    recipe.raw_data = recipe_detail
-                    recipe.synchronized_at = datetime.now()
-                    
-                    count += 1
-                    print(f"✅ Receita sincronizada: {recipe.name}")
+                    if len(fp_rows) >= TAMANHO_LOTE_UPSERT:
+                        BrewFatherService._flush(BrewFatherRecipe, rows, fp_rows)
                     
                 except Exception as e:
                     print(f"❌ Erro ao processar receita {recipe_id}: {e}")
                     error_count += 1
                     continue
             
+            BrewFatherService._flush(BrewFatherRecipe, rows, fp_rows)
+            
             sync.status = 'success'
             sync.items_count = count
             sync.last_sync = datetime.now()
@@ -330,7 +733,9 @@ class BrewFatherService:
                 'success': True, 
                 'count': count,
                 'error_count': error_count,
-                'message': f'{count} receitas sincronizadas, {error_count} erros'
+                'unchanged': unchanged,
+                'progress': paginador.progresso(),
+                'message': f'{count} receitas sincronizadas, {unchanged} sem alteração, {error_count} erros'
             }
             
         except Exception as e:
@@ -345,9 +750,9 @@ class BrewFatherService:
     
     
     @staticmethod
-    def sync_batches():
-        """Sincroniza lotes do BrewFather"""
-        api = BrewFatherService.get_api_client()
+    def sync_batches(force=False):
+        """Sincroniza lotes do BrewFather (só grava os que mudaram, exceto com force=True)"""
+        api = BrewFatherService.get_api_client(revalidar=True)
         if not api:
             return {'success': False, 'error': 'BrewFather não configurado'}
         
@@ -356,53 +761,27 @@ class BrewFatherService:
             db.session.add(sync)
             db.session.flush()
             
-            batches_data = api.get_batches(per_page=50)
-            if not batches_data:
-                sync.status = 'error'
-                sync.error_message = 'Nenhum dado recebido da API'
-                db.session.commit()
-                return {'success': False, 'error': 'Nenhum dado recebido da API'}
+            paginador = api.paginate("batches")
+            fingerprints, existing_ids = BrewFatherService._load_fingerprints('batches', BrewFatherBatch)
+            rows, fp_rows = [], []
             
             count = 0
-            for batch_data in batches_data:
-                existing = BrewFatherBatch.query.filter_by(
-                    brewfather_id=batch_data.get('_id')
-                ).first()
-                
-                if existing:
-                    batch = existing
-                else:
-                    batch = BrewFatherBatch(brewfather_id=batch_data.get('_id'))
-                    db.session.add(batch)
-                
-                # Atualizar dados
-                batch.recipe_id = batch_data.get('recipe', {}).get('_id', '')
-                batch.recipe_name = batch_data.get('recipe', {}).get('name', '')
-                batch.batch_no = batch_data.get('batchNo', 0)
-                batch.status = batch_data.get('status', '')
-                
-                # Datas
-                if batch_data.get('brewDate'):
-                    batch.brew_date = datetime.fromtimestamp(batch_data.get('brewDate') / 1000)
-                
-                # Gravidades e medidas
-                batch.estimated_og = batch_data.get('estimatedOg', 0)
-                batch.measured_og = batch_data.get('measuredOg', 0)
-                batch.estimated_fg = batch_data.get('estimatedFg', 0)
-                batch.measured_fg = batch_data.get('measuredFg', 0)
-                batch.estimated_abv = batch_data.get('estimatedAbv', 0)
-                batch.measured_abv = batch_data.get('measuredAbv', 0)
-                batch.estimated_ibu = batch_data.get('estimatedIbu', 0)
-                batch.estimated_color = batch_data.get('estimatedColor', 0)
-                batch.batch_size = batch_data.get('batchSize', 0)
-                batch.efficiency = batch_data.get('efficiency', 0)
-                
-                batch.notes = batch_data.get('notes', '')
-                batch.rating = batch_data.get('rating', 0)
-                batch.raw_data = batch_data
-                batch.synchronized_at = datetime.now()
+            unchanged = 0
+            for batch_data in paginador:
+                batch_hash = fingerprint(batch_data)
+                fp = fingerprints.get(batch_data.get('_id'))
+                if not force and batch_data.get('_id') in existing_ids and fp and fp.summary_hash == batch_hash:
+                    unchanged += 1
+                    continue
                 
+                rows.append(BrewFatherService._batch_row(batch_data))
+                fp_rows.append(BrewFatherService._fingerprint_row('batches', batch_data.get('_id'), summary_hash=batch_hash))
                 count += 1
+                
+                if len(rows) >= TAMANHO_LOTE_UPSERT:
+                    BrewFatherService._flush(BrewFatherBatch, rows, fp_rows)
+            
+            BrewFatherService._flush(BrewFatherBatch, rows, fp_rows)
             
             sync.status = 'success'
             sync.items_count = count
@@ -412,7 +791,9 @@ class BrewFatherService:
             return {
                 'success': True, 
                 'count': count,
-                'message': f'{count} lotes sincronizados'
+                'unchanged': unchanged,
+                'progress': paginador.progresso(),
+                'message': f'{count} lotes sincronizados, {unchanged} sem alteração'
             }
             
         except Exception as e:
@@ -424,9 +805,9 @@ class BrewFatherService:
             return {'success': False, 'error': str(e)}
     
     @staticmethod
-    def sync_inventory():
-        """Sincroniza estoque do BrewFather"""
-        api = BrewFatherService.get_api_client()
+    def sync_inventory(force=False):
+        """Sincroniza estoque do BrewFather (só grava os itens que mudaram, exceto com force=True)"""
+        api = BrewFatherService.get_api_client(revalidar=True)
         if not api:
             return {'success': False, 'error': 'BrewFather não configurado'}
         
@@ -435,38 +816,27 @@ class BrewFatherService:
             db.session.add(sync)
             db.session.flush()
             
-            inventory_data = api.get_inventory(per_page=50)
-            if not inventory_data:
-                sync.status = 'error'
-                sync.error_message = 'Nenhum dado recebido da API'
-                db.session.commit()
-                return {'success': False, 'error': 'Nenhum dado recebido da API'}
+            paginador = api.paginate("inventory")
+            fingerprints, existing_ids = BrewFatherService._load_fingerprints('inventory', BrewFatherInventory)
+            rows, fp_rows = [], []
             
             count = 0
-            for item_data in inventory_data:
-                existing = BrewFatherInventory.query.filter_by(
-                    brewfather_id=item_data.get('_id')
-                ).first()
-                
-                if existing:
-                    item = existing
-                else:
-                    item = BrewFatherInventory(brewfather_id=item_data.get('_id'))
-                    db.session.add(item)
-                
-                # Atualizar dados
-                item.name = item_data.get('name', '')
-                item.type = item_data.get('type', '')
-                item.category = item_data.get('category', '')
-                item.quantity = item_data.get('quantity', 0)
-                item.unit = item_data.get('unit', '')
-                item.price = item_data.get('price', 0)
-                item.supplier = item_data.get('supplier', '')
-                item.notes = item_data.get('notes', '')
-                item.raw_data = item_data
-                item.synchronized_at = datetime.now()
+            unchanged = 0
+            for item_data in paginador:
+                item_hash = fingerprint(item_data)
+                fp = fingerprints.get(item_data.get('_id'))
+                if not force and item_data.get('_id') in existing_ids and fp and fp.summary_hash == item_hash:
+                    unchanged += 1
+                    continue
                 
+                rows.append(BrewFatherService._inventory_row(item_data))
+                fp_rows.append(BrewFatherService._fingerprint_row('inventory', item_data.get('_id'), summary_hash=item_hash))
                 count += 1
+                
+                if len(rows) >= TAMANHO_LOTE_UPSERT:
+                    BrewFatherService._flush(BrewFatherInventory, rows, fp_rows)
+            
+            BrewFatherService._flush(BrewFatherInventory, rows, fp_rows)
             
             sync.status = 'success'
             sync.items_count = count
@@ -476,7 +846,9 @@ class BrewFatherService:
             return {
                 'success': True, 
                 'count': count,
-                'message': f'{count} itens de estoque sincronizados'
+                'unchanged': unchanged,
+                'progress': paginador.progresso(),
+                'message': f'{count} itens de estoque sincronizados, {unchanged} sem alteração'
             }
             
         except Exception as e:
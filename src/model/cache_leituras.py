@@ -0,0 +1,238 @@
+# model/cache_leituras.py
+import atexit
+import json
+import threading
+from datetime import datetime
+
+
+def _serializar(entrada):
+    data = dict(entrada)
+    if isinstance(data.get('ultima_comunicacao'), datetime):
+        data['ultima_comunicacao'] = data['ultima_comunicacao'].isoformat()
+    return data
+
+
+class CacheLeituras:
+    """
+    Cache do último valor recebido por dispositivo.
+
+    É atualizado na ingestão e atende /dispositivos/live sem consultar o banco.
+    Com intervalo_persistencia > 0, ultimo_valor_recebido/ultima_comunicacao
+    deixam de ser gravados a cada leitura e passam a ser persistidos em lote
+    (write-behind) por uma thread. Com redis_url, as entradas também são
+    publicadas em um hash do Redis e compartilhadas entre processos.
+    """
+
+    CHAVE_REDIS = 'brewstation:ultimas_leituras'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._pendentes = set()
+        self._carregado = False
+        self._redis = None
+        self._thread = None
+        self._parar = threading.Event()
+        self.intervalo_persistencia = 0
+
+    @property
+    def write_behind(self):
+        return self.intervalo_persistencia > 0
+
+    def configurar(self, intervalo_persistencia=0, redis_url=None):
+        """Define o intervalo de write-behind (0 = gravar a cada leitura) e o Redis opcional"""
+        self.intervalo_persistencia = float(intervalo_persistencia or 0)
+        self._redis = None
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            except ImportError:
+                print("⚠️  Pacote redis não instalado; cache de leituras apenas local")
+
+    @staticmethod
+    def montar_entrada(dispositivo, dados, ultima_comunicacao):
+        """Entrada do cache para a leitura mais recente de um dispositivo"""
+        return {
+            'id': dispositivo.id,
+            'nome': dispositivo.nome,
+            'tipo': dispositivo.tipo.value if dispositivo.tipo else None,
+            'status': dispositivo.status.value if dispositivo.status else None,
+            'ultimo_valor_recebido': dados or {},
+            'ultima_comunicacao': ultima_comunicacao
+        }
+
+    def atualizar(self, entrada):
+        """Registra a leitura mais recente de um dispositivo; ignora leituras mais antigas"""
+        with self._lock:
+            atual = self._entradas.get(entrada['id'])
+            if atual and atual['ultima_comunicacao'] and entrada['ultima_comunicacao'] < atual['ultima_comunicacao']:
+                return False
+            self._entradas[entrada['id']] = entrada
+            if self.write_behind:
+                self._pendentes.add(entrada['id'])
+
+        self._publicar(entrada)
+        return True
+
+    def atualizar_status(self, dispositivo_id, status):
+        """Atualiza apenas o status de um dispositivo já presente no cache"""
+        with self._lock:
+            entrada = self._entradas.get(dispositivo_id)
+            if not entrada:
+                return
+            entrada['status'] = status.value if hasattr(status, 'value') else status
+        self._publicar(entrada)
+
+    def registrar_comunicacao(self, dispositivo, ultima_comunicacao, dados=None):
+        """
+        Registra um contato do dispositivo fora da ingestão (ex.: mudança de status).
+
+        Sem dados, mantém o último valor já conhecido. Com write-behind, a
+        entrada fica pendente e é persistida em lote como as leituras.
+        """
+        if dados is None:
+            with self._lock:
+                atual = self._entradas.get(dispositivo.id)
+            dados = atual['ultimo_valor_recebido'] if atual else dispositivo.ultimo_valor_recebido
+        if self.atualizar(self.montar_entrada(dispositivo, dados, ultima_comunicacao)):
+            return True
+        # Já há leitura mais recente no cache: só o status muda
+        self.atualizar_status(dispositivo.id, dispositivo.status)
+        return False
+
+    def limpar(self):
+        """Descarta todas as entradas (inclusive as pendentes de persistência)"""
+        with self._lock:
+            self._entradas.clear()
+            self._pendentes.clear()
+            self._carregado = False
+
+    def remover(self, dispositivo_id):
+        with self._lock:
+            self._entradas.pop(dispositivo_id, None)
+            self._pendentes.discard(dispositivo_id)
+        if self._redis:
+            self._redis.hdel(self.CHAVE_REDIS, dispositivo_id)
+
+    def _publicar(self, entrada):
+        if self._redis:
+            try:
+                self._redis.hset(self.CHAVE_REDIS, entrada['id'], json.dumps(_serializar(entrada)))
+            except Exception as e:
+                print(f"Erro ao publicar leitura no Redis: {e}")
+
+    def carregar_do_banco(self):
+        """Preenche o cache a partir dos dispositivos visíveis (sem exclusão agendada; requer app context)"""
+        from model.dispositivos import Dispositivo
+
+        with self._lock:
+            for dispositivo in Dispositivo.visiveis().all():
+                if dispositivo.id not in self._entradas:
+                    self._entradas[dispositivo.id] = self.montar_entrada(
+                        dispositivo, dispositivo.ultimo_valor_recebido, dispositivo.ultima_comunicacao
+                    )
+            self._carregado = True
+
+    def todos(self):
+        """Entradas de todos os dispositivos, prontas para JSON"""
+        if self._redis:
+            try:
+                return [json.loads(valor) for valor in self._redis.hgetall(self.CHAVE_REDIS).values()]
+            except Exception as e:
+                print(f"Erro ao ler leituras do Redis: {e}")
+
+        if not self._carregado:
+            self.carregar_do_banco()
+        with self._lock:
+            return [_serializar(entrada) for entrada in self._entradas.values()]
+
+    def obter(self, ids):
+        """Entradas (prontas para JSON) só dos dispositivos pedidos, por id"""
+        ids = list(ids)
+        if self._redis:
+            try:
+                valores = self._redis.hmget(self.CHAVE_REDIS, ids)
+                return {i: json.loads(valor) for i, valor in zip(ids, valores) if valor}
+            except Exception as e:
+                print(f"Erro ao ler leituras do Redis: {e}")
+
+        with self._lock:
+            return {i: _serializar(self._entradas[i]) for i in ids if i in self._entradas}
+
+    def aplicar(self, dispositivo_dict):
+        """Sobrepõe os valores do cache a um Dispositivo.to_dict() (útil com write-behind)"""
+        with self._lock:
+            entrada = self._entradas.get(dispositivo_dict['id'])
+        if entrada and entrada['ultima_comunicacao']:
+            dispositivo_dict['ultimo_valor_recebido'] = entrada['ultimo_valor_recebido']
+            dispositivo_dict['ultima_comunicacao'] = entrada['ultima_comunicacao'].isoformat()
+        return dispositivo_dict
+
+    def persistir_pendentes(self):
+        """Grava em lote os valores pendentes (write-behind); requer app context"""
+        from sqlalchemy import update, bindparam
+        from model.dispositivos import Dispositivo
+        from db.database import db
+
+        with self._lock:
+            pendentes = [self._entradas[i] for i in self._pendentes if i in self._entradas]
+            self._pendentes.clear()
+        if not pendentes:
+            return 0
+
+        stmt = update(Dispositivo.__table__)\
+            .where(Dispositivo.__table__.c.id == bindparam('b_id'))\
+            .values(
+                ultimo_valor_recebido=bindparam('b_valor'),
+                ultima_comunicacao=bindparam('b_comunicacao')
+            )
+        try:
+            db.session.execute(stmt, [
+                {'b_id': e['id'], 'b_valor': e['ultimo_valor_recebido'], 'b_comunicacao': e['ultima_comunicacao']}
+                for e in pendentes
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao persistir últimas leituras: {e}")
+            with self._lock:
+                self._pendentes.update(entrada['id'] for entrada in pendentes)
+            return 0
+        return len(pendentes)
+
+    def iniciar_write_behind(self, app):
+        """Inicia a thread que persiste os valores pendentes a cada intervalo"""
+        if not self.write_behind or (self._thread and self._thread.is_alive()):
+            return
+
+        def loop():
+            while not self._parar.wait(self.intervalo_persistencia):
+                with app.app_context():
+                    self.persistir_pendentes()
+
+        def ao_encerrar():
+            self._parar.set()
+            with app.app_context():
+                self.persistir_pendentes()
+
+        self._parar.clear()
+        self._thread = threading.Thread(target=loop, name='cache-leituras-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(ao_encerrar)
+
+
+# Instância única por processo
+cache_leituras = CacheLeituras()
+
+
+def configurar_cache_leituras(app):
+    """Lê as configurações do cache e inicia o write-behind, se habilitado"""
+    from model.config import Configuracao
+
+    with app.app_context():
+        cache_leituras.configurar(
+            Configuracao.get_config('CACHE_LEITURAS_INTERVALO_PERSISTENCIA', 0),
+            Configuracao.get_config('CACHE_LEITURAS_REDIS_URL')
+        )
+    cache_leituras.iniciar_write_behind(app)
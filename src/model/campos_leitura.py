@@ -0,0 +1,213 @@
+# model/campos_leitura.py
+import math
+import threading
+import time
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, insert, func
+from db.database import db
+
+# Colunas tipadas de HistoricoDispositivo que o mapeamento pode preencher
+COLUNAS_TIPADAS = ('temperatura', 'gravidade', 'pressao', 'qualidade_sinal', 'bateria')
+
+# Chaves conhecidas de `dados` por tipo de dispositivo -> campo de destino.
+# Destinos em COLUNAS_TIPADAS vão para a coluna de HistoricoDispositivo;
+# os demais vão para a tabela historico_campos.
+MAPEAMENTO_CAMPOS_PADRAO = {
+    'ispindel': {
+        'angle': 'angulo',
+        'tilt': 'angulo',
+        'temperature': 'temperatura',
+        'gravity': 'gravidade',
+        'battery': 'bateria',
+        'RSSI': 'qualidade_sinal',
+        'rssi': 'qualidade_sinal',
+        'interval': 'intervalo',
+    },
+    'controlador_temperatura': {
+        'temperature': 'temperatura',
+        'temp': 'temperatura',
+        'setpoint': 'setpoint',
+        'target': 'setpoint',
+        'heater_duty': 'ciclo_aquecedor',
+        'cooler_duty': 'ciclo_resfriador',
+        'rssi': 'qualidade_sinal',
+    },
+    'controlador_brasagem': {
+        'temperature': 'temperatura',
+        'temp': 'temperatura',
+        'setpoint': 'setpoint',
+        'heater_duty': 'ciclo_aquecedor',
+        'pump_duty': 'ciclo_bomba',
+        'rssi': 'qualidade_sinal',
+    },
+    'sensor_temperatura': {
+        'temperature': 'temperatura',
+        'temp': 'temperatura',
+        'battery': 'bateria',
+        'rssi': 'qualidade_sinal',
+    },
+    'aquecedor': {
+        'power': 'potencia',
+        'duty': 'ciclo_aquecedor',
+    },
+    'bomba': {
+        'duty': 'ciclo_bomba',
+        'flow': 'vazao',
+    },
+}
+
+# Modos de gravação de `dados` depois do mapeamento
+DADOS_COMPLETO = 'completo'    # Mantém o payload inteiro
+DADOS_RESTANTE = 'restante'    # Mantém só as chaves não mapeadas
+MODOS_DADOS = (DADOS_COMPLETO, DADOS_RESTANTE)
+
+
+class HistoricoCampo(db.Model):
+    """Valores numéricos extraídos de `dados` que não têm coluna própria no histórico"""
+    __tablename__ = 'historico_campos'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id'), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    campo = Column(String(50), nullable=False)
+    valor = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('idx_historico_campo_dispositivo', 'dispositivo_id', 'campo', 'timestamp'),
+    )
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'dispositivo_id': self.dispositivo_id,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'campo': self.campo,
+            'valor': self.valor
+        }
+
+    @classmethod
+    def _filtrar(cls, query, dispositivo_id, campo, inicio=None, fim=None):
+        query = query.filter(cls.dispositivo_id == dispositivo_id, cls.campo == campo)
+        if inicio:
+            query = query.filter(cls.timestamp >= inicio)
+        if fim:
+            query = query.filter(cls.timestamp <= fim)
+        return query
+
+    @classmethod
+    def get_serie(cls, dispositivo_id, campo, inicio=None, fim=None, limite=None):
+        """Valores de um campo no período, em ordem cronológica"""
+        query = cls._filtrar(cls.query, dispositivo_id, campo, inicio, fim).order_by(cls.timestamp.asc())
+        if limite:
+            query = query.limit(limite)
+        return query.all()
+
+    @classmethod
+    def get_estatisticas(cls, dispositivo_id, campo, inicio=None, fim=None):
+        """Mínimo, máximo, média e contagem de um campo, calculados no banco"""
+        query = db.session.query(
+            func.min(cls.valor), func.max(cls.valor), func.avg(cls.valor), func.count(cls.id)
+        )
+        minimo, maximo, media, contagem = cls._filtrar(query, dispositivo_id, campo, inicio, fim).one()
+        return {'min': minimo, 'max': maximo, 'media': media, 'contagem': contagem}
+
+    @classmethod
+    def get_campos(cls, dispositivo_id):
+        """Nomes dos campos extraídos que existem para um dispositivo"""
+        linhas = db.session.query(cls.campo).filter(cls.dispositivo_id == dispositivo_id).distinct().all()
+        return sorted(campo for campo, in linhas)
+
+
+class RegistroCampos:
+    """
+    Registro do mapeamento de campos por tipo de dispositivo.
+
+    Combina MAPEAMENTO_CAMPOS_PADRAO com a configuração
+    MAPEAMENTO_CAMPOS_DISPOSITIVOS ({tipo: {chave: campo}}), relida do banco
+    no máximo a cada intervalo_recarga segundos.
+    """
+
+    def __init__(self, intervalo_recarga=60):
+        self.intervalo_recarga = intervalo_recarga
+        self._lock = threading.Lock()
+        self._mapeamento = None
+        self._modo_dados = DADOS_COMPLETO
+        self._carregado_em = 0
+
+    def recarregar(self):
+        """Lê as configurações do banco (requer app context)"""
+        from model.config import Configuracao
+
+        mapeamento = {tipo: dict(mapa) for tipo, mapa in MAPEAMENTO_CAMPOS_PADRAO.items()}
+        personalizado = Configuracao.get_config('MAPEAMENTO_CAMPOS_DISPOSITIVOS') or {}
+        if isinstance(personalizado, dict):
+            for tipo, mapa in personalizado.items():
+                if isinstance(mapa, dict):
+                    mapeamento.setdefault(tipo, {}).update(mapa)
+
+        modo = Configuracao.get_config('INGESTAO_DADOS_MODO', DADOS_COMPLETO)
+        with self._lock:
+            self._mapeamento = mapeamento
+            self._modo_dados = modo if modo in MODOS_DADOS else DADOS_COMPLETO
+            self._carregado_em = time.monotonic()
+
+    def _garantir_carregado(self):
+        if self._mapeamento is None or time.monotonic() - self._carregado_em > self.intervalo_recarga:
+            self.recarregar()
+
+    def mapeamento(self, tipo):
+        """Mapa chave -> campo de um tipo de dispositivo (TipoDispositivo ou valor)"""
+        self._garantir_carregado()
+        return self._mapeamento.get(getattr(tipo, 'value', tipo), {})
+
+    def aplicar(self, dispositivo, registros):
+        """
+        Extrai as chaves conhecidas de `dados` de cada registro.
+
+        Colunas tipadas só são preenchidas quando a leitura não trouxe o
+        valor explicitamente. Retorna as linhas para historico_campos.
+        """
+        mapa = self.mapeamento(dispositivo.tipo)
+        if not mapa:
+            return []
+
+        campos = []
+        for registro in registros:
+            mapeadas = []
+            for chave, valor in registro['dados'].items():
+                destino = mapa.get(chave)
+                if destino is None or isinstance(valor, bool):
+                    continue
+                try:
+                    valor = float(valor)
+                except (TypeError, ValueError):
+                    continue
+                if not math.isfinite(valor):
+                    continue
+                mapeadas.append(chave)
+
+                if destino in COLUNAS_TIPADAS:
+                    if registro.get(destino) is None:
+                        registro[destino] = valor
+                else:
+                    campos.append({
+                        'dispositivo_id': dispositivo.id,
+                        'timestamp': registro['timestamp'],
+                        'campo': destino,
+                        'valor': valor
+                    })
+
+            if mapeadas and self._modo_dados == DADOS_RESTANTE:
+                registro['dados'] = {k: v for k, v in registro['dados'].items() if k not in mapeadas}
+
+        return campos
+
+    def gravar(self, dispositivo, registros):
+        """Aplica o mapeamento e insere os campos extraídos em um único INSERT multi-linha"""
+        campos = self.aplicar(dispositivo, registros)
+        if campos:
+            db.session.execute(insert(HistoricoCampo), campos)
+        return len(campos)
+
+
+# Instância única por processo
+registro_campos = RegistroCampos()
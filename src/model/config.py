@@ -174,6 +174,38 @@ class Configuracao(db.Model):
                 'descricao': 'Intervalo de sincronização com BrewFather em segundos',
                 'is_sensitive': False
             },
+            {
+                'chave': 'BREWFATHER_REQUISICOES_POR_HORA',
+                'valor': '500',
+                'tipo': 'number',
+                'categoria': 'brewfather',
+                'descricao': 'Limite de requisições por hora à API do BrewFather (limitador de taxa)',
+                'is_sensitive': False
+            },
+            {
+                'chave': 'BREWFATHER_WORKERS',
+                'valor': '4',
+                'tipo': 'number',
+                'categoria': 'brewfather',
+                'descricao': 'Buscas simultâneas de detalhes de receitas na sincronização',
+                'is_sensitive': False
+            },
+            {
+                'chave': 'BREWFATHER_CACHE_TTL',
+                'valor': '300',
+                'tipo': 'number',
+                'categoria': 'brewfather',
+                'descricao': 'Segundos em que uma resposta da API do BrewFather é usada do cache sem revalidar',
+                'is_sensitive': False
+            },
+            {
+                'chave': 'BREWFATHER_CACHE_MAX_MB',
+                'valor': '50',
+                'tipo': 'number',
+                'categoria': 'brewfather',
+                'descricao': 'Tamanho máximo do cache em disco das respostas do BrewFather (0 desativa)',
+                'is_sensitive': False
+            },
             
             # Configurações de Email
             {
@@ -274,6 +306,10 @@ class Configuracao(db.Model):
             }
         ]
         
+        # Configurações de dispositivos
+        from model.dispositivos import DISPOSITIVO_DEFAULT_CONFIGS
+        default_configs.extend(DISPOSITIVO_DEFAULT_CONFIGS)
+        
         for config_data in default_configs:
             existing_config = cls.query.filter_by(chave=config_data['chave']).first()
             if not existing_config:
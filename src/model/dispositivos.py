@@ -1,9 +1,11 @@
 import json
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Float, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Float, JSON, ForeignKey, Enum, Index, and_, or_
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 from db.database import db
+from model.cache_leituras import cache_leituras
+from model.hub_eventos import hub_eventos, EVENTO_STATUS
 
 # Mover os Enums para um arquivo separado ou definir aqui
 # Mas garantir que não causem import circular
@@ -126,14 +128,33 @@ class Dispositivo(db.Model):
         return data
     
     def atualizar_status(self, novo_status, dados_recebidos=None):
-        """Atualiza o status do dispositivo e registra comunicação"""
+        """
+        Atualiza o status do dispositivo e registra comunicação.
+
+        O horário e o último valor passam pelo cache de leituras: com o
+        write-behind ativo, só a mudança de status é gravada na hora, e o
+        restante é persistido em lote junto com as leituras.
+        """
+        from datetime import datetime
+
+        agora = datetime.now()
+        status_anterior = self.status
         self.status = novo_status
-        self.ultima_comunicacao = func.now()
-        
-        if dados_recebidos:
-            self.ultimo_valor_recebido = dados_recebidos
-        
-        db.session.commit()
+
+        if not cache_leituras.write_behind:
+            self.ultima_comunicacao = agora
+            if dados_recebidos:
+                self.ultimo_valor_recebido = dados_recebidos
+        if status_anterior != novo_status or not cache_leituras.write_behind:
+            db.session.commit()
+
+        cache_leituras.registrar_comunicacao(self, agora, dados_recebidos or None)
+        if status_anterior != novo_status:
+            hub_eventos.publicar(EVENTO_STATUS, {
+                'dispositivo_id': self.id,
+                'status_anterior': status_anterior.value if status_anterior else None,
+                'status': novo_status.value
+            }, self.id, self.sessao_brasagem_id)
     
     def get_config_value(self, chave, default=None):
         """Obtém um valor específico da configuração"""
@@ -152,27 +173,45 @@ class Dispositivo(db.Model):
         self.status = StatusDispositivo.CALIBRACAO
         db.session.commit()
     
+    @classmethod
+    def nao_excluido(cls):
+        """Filtro que oculta dispositivos com exclusão agendada (ExclusaoDispositivo)"""
+        return cls.id.notin_(
+            db.session.query(ExclusaoDispositivo.dispositivo_id)
+            .filter(ExclusaoDispositivo.status.in_(ExclusaoDispositivo.STATUS_ABERTOS))
+        )
+    
+    @classmethod
+    def visiveis(cls):
+        """Query de dispositivos sem exclusão agendada"""
+        return cls.query.filter(cls.nao_excluido())
+    
+    @classmethod
+    def get_visivel(cls, dispositivo_id):
+        """Obtém um dispositivo pelo id, ignorando os que estão sendo excluídos"""
+        return cls.visiveis().filter(cls.id == dispositivo_id).first()
+    
     @classmethod
     def get_por_tipo(cls, tipo):
         """Obtém dispositivos por tipo"""
-        return cls.query.filter_by(tipo=tipo).all()
+        return cls.visiveis().filter_by(tipo=tipo).all()
     
     @classmethod
     def get_ativos(cls):
         """Obtém todos os dispositivos ativos"""
-        return cls.query.filter(
+        return cls.visiveis().filter(
             cls.status.in_([StatusDispositivo.ATIVO, StatusDispositivo.CONECTADO])
         ).all()
     
     @classmethod
     def get_por_protocolo(cls, protocolo):
         """Obtém dispositivos por protocolo de comunicação"""
-        return cls.query.filter_by(protocolo=protocolo).all()
+        return cls.visiveis().filter_by(protocolo=protocolo).all()
     
     @classmethod
     def get_por_sessao(cls, sessao_id):
         """Obtém dispositivos associados a uma sessão de brassagem"""
-        return cls.query.filter_by(sessao_brasagem_id=sessao_id).all()
+        return cls.visiveis().filter_by(sessao_brasagem_id=sessao_id).all()
     
     def __repr__(self):
         return f'<Dispositivo {self.nome} ({self.tipo.value})>'
@@ -183,7 +222,7 @@ class HistoricoDispositivo(db.Model):
     __tablename__ = 'historico_dispositivos'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id'), nullable=False, index=True)
+    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id'), nullable=False)
     
     # Dados recebidos
     dados = Column(JSON, nullable=False)
@@ -200,6 +239,11 @@ class HistoricoDispositivo(db.Model):
     # Relacionamentos
     dispositivo = relationship("Dispositivo", backref="historico")
     
+    __table_args__ = (
+        # Atende filtro por dispositivo + ordenação/intervalo por timestamp e a paginação por cursor
+        Index('idx_historico_dispositivo_timestamp', 'dispositivo_id', 'timestamp', 'id'),
+    )
+    
     def to_dict(self):
         """Converte para dicionário"""
         return {
@@ -225,12 +269,203 @@ class HistoricoDispositivo(db.Model):
     
     @classmethod
     def get_leituras_por_periodo(cls, dispositivo_id, inicio, fim):
-        """Obtém leituras de um dispositivo em um período específico"""
-        return cls.query.filter(
+        """Obtém leituras de um dispositivo em um período específico (inclui o arquivo frio)"""
+        from model.arquivo_historico import registros_periodo
+        
+        return registros_periodo(dispositivo_id, inicio, fim) + cls.query.filter(
             cls.dispositivo_id == dispositivo_id,
             cls.timestamp >= inicio,
             cls.timestamp <= fim
         ).order_by(cls.timestamp.asc()).all()
+    
+    @classmethod
+    def get_series(cls, dispositivo_id, colunas, inicio=None, fim=None):
+        """
+        Obtém colunas numéricas do histórico como arrays NumPy, sem criar objetos ORM.
+        
+        Retorna (timestamps datetime64[ms], {coluna: array float com NaN nos ausentes}).
+        Leituras já movidas para o arquivo frio vêm antes das do banco.
+        """
+        import numpy as np
+        from model.arquivo_historico import ler_periodo
+        
+        arquivo = ler_periodo(dispositivo_id, inicio, fim)
+        
+        query = db.session.query(cls.timestamp, *[getattr(cls, coluna) for coluna in colunas])\
+            .filter(cls.dispositivo_id == dispositivo_id)
+        if inicio:
+            query = query.filter(cls.timestamp >= inicio)
+        if fim:
+            query = query.filter(cls.timestamp <= fim)
+        
+        linhas = query.order_by(cls.timestamp.asc(), cls.id.asc()).all()
+        if not linhas:
+            return arquivo['timestamp'], {coluna: arquivo[coluna] for coluna in colunas}
+        
+        valores = list(zip(*linhas))
+        timestamps = np.concatenate([arquivo['timestamp'], np.array(valores[0], dtype='datetime64[ms]')])
+        series = {
+            coluna: np.concatenate([arquivo[coluna], np.array(valores[i + 1], dtype=float)])
+            for i, coluna in enumerate(colunas)
+        }
+        return timestamps, series
+    
+    @classmethod
+    def iterar_linhas(cls, dispositivo_ids, colunas, inicio=None, fim=None, tamanho_bloco=1000):
+        """
+        Itera tuplas do histórico de um ou mais dispositivos em ordem cronológica.
+        
+        Usa yield_per (cursor do lado do servidor no PostgreSQL), então a
+        memória fica constante independentemente do número de linhas.
+        Leituras do arquivo frio são emitidas primeiro, dispositivo a dispositivo.
+        """
+        from model.arquivo_historico import linhas_periodo
+        
+        for dispositivo_id in dispositivo_ids:
+            yield from linhas_periodo(dispositivo_id, colunas, inicio, fim)
+        
+        query = db.session.query(*[getattr(cls, coluna) for coluna in colunas])\
+            .filter(cls.dispositivo_id.in_(dispositivo_ids))
+        if inicio:
+            query = query.filter(cls.timestamp >= inicio)
+        if fim:
+            query = query.filter(cls.timestamp <= fim)
+        
+        query = query.order_by(cls.timestamp.asc(), cls.id.asc())\
+            .execution_options(yield_per=tamanho_bloco)
+        for linha in query:
+            yield tuple(linha)
+    
+    @staticmethod
+    def codificar_cursor(registro):
+        """Gera o cursor 'timestamp,id' que aponta para depois de um registro"""
+        return f"{registro.timestamp.isoformat()},{registro.id}"
+    
+    @staticmethod
+    def decodificar_cursor(cursor):
+        """Converte um cursor 'timestamp,id' em (datetime, id)"""
+        from datetime import datetime
+        timestamp, _, registro_id = cursor.rpartition(',')
+        return datetime.fromisoformat(timestamp), int(registro_id)
+    
+    @classmethod
+    def get_pagina(cls, dispositivo_id, limite=100, after=None, inicio=None, fim=None, ordem='asc'):
+        """
+        Obtém uma página de leituras usando paginação por cursor (keyset).
+        
+        O cursor é o par (timestamp, id) do último registro da página anterior,
+        então cada página é uma busca direta no índice composto, com o mesmo
+        custo independentemente da profundidade. Leituras do arquivo frio
+        entram na mesma ordem (timestamp, id). Retorna (registros, proximo_cursor).
+        """
+        from model.arquivo_historico import registros_pagina
+        
+        query = cls.query.filter(cls.dispositivo_id == dispositivo_id)
+        
+        if inicio:
+            query = query.filter(cls.timestamp >= inicio)
+        if fim:
+            query = query.filter(cls.timestamp <= fim)
+        
+        if after:
+            after = cls.decodificar_cursor(after) if isinstance(after, str) else after
+            after_ts, after_id = after
+            if ordem == 'desc':
+                query = query.filter(or_(
+                    cls.timestamp < after_ts,
+                    and_(cls.timestamp == after_ts, cls.id < after_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    cls.timestamp > after_ts,
+                    and_(cls.timestamp == after_ts, cls.id > after_id)
+                ))
+        
+        if ordem == 'desc':
+            query = query.order_by(cls.timestamp.desc(), cls.id.desc())
+        else:
+            query = query.order_by(cls.timestamp.asc(), cls.id.asc())
+        
+        # Busca um registro a mais para saber se existe próxima página
+        registros = query.limit(limite + 1).all()
+        
+        # Com a página do banco cheia, só interessa o arquivo até o último registro dela
+        inicio_arquivo, fim_arquivo = inicio, fim
+        if len(registros) > limite:
+            if ordem == 'desc':
+                inicio_arquivo = registros[-1].timestamp
+            else:
+                fim_arquivo = registros[-1].timestamp
+        no_banco = {registro.id for registro in registros}
+        arquivados = [
+            registro for registro in registros_pagina(
+                dispositivo_id, limite + 1, after, inicio_arquivo, fim_arquivo, ordem
+            )
+            if registro.id not in no_banco
+        ]
+        if arquivados:
+            registros = sorted(
+                arquivados + registros, key=lambda r: (r.timestamp, r.id), reverse=ordem == 'desc'
+            )[:limite + 1]
+        
+        proximo_cursor = None
+        if len(registros) > limite:
+            registros = registros[:limite]
+            proximo_cursor = cls.codificar_cursor(registros[-1])
+        
+        return registros, proximo_cursor
+
+
+class ExclusaoDispositivo(db.Model):
+    """
+    Exclusão de dispositivo em andamento (tombstone).
+
+    Enquanto aberta, o dispositivo fica oculto da API e não recebe leituras;
+    o histórico é removido em blocos por model.exclusao_dispositivos e o
+    dispositivo só é apagado no final.
+    """
+    __tablename__ = 'exclusoes_dispositivos'
+    
+    PENDENTE = 'pendente'
+    EM_ANDAMENTO = 'em_andamento'
+    CONCLUIDA = 'concluida'
+    ERRO = 'erro'
+    STATUS_ABERTOS = (PENDENTE, EM_ANDAMENTO, ERRO)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Sem FK: o registro sobrevive à exclusão do dispositivo
+    dispositivo_id = Column(Integer, nullable=False, index=True)
+    nome = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False, default=PENDENTE, index=True)
+    total_estimado = Column(Integer, nullable=True)
+    removidas = Column(Integer, nullable=False, default=0)
+    erro = Column(Text, nullable=True)
+    solicitado_por = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+    
+    def to_dict(self):
+        """Converte para dicionário"""
+        progresso = None
+        if self.status == self.CONCLUIDA:
+            progresso = 100.0
+        elif self.total_estimado:
+            progresso = round(min(self.removidas / self.total_estimado, 1.0) * 100, 1)
+        return {
+            'id': self.id,
+            'dispositivo_id': self.dispositivo_id,
+            'nome': self.nome,
+            'status': self.status,
+            'total_estimado': self.total_estimado,
+            'removidas': self.removidas,
+            'progresso': progresso,
+            'erro': self.erro,
+            'solicitado_por': self.solicitado_por,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None
+        }
 
 
 # Configurações padrão para dispositivos (adicionar ao Configuracao.initialize_default_configs)
@@ -282,5 +517,141 @@ DISPOSITIVO_DEFAULT_CONFIGS = [
         'categoria': 'dispositivos',
         'descricao': 'Número máximo de tentativas de comunicação',
         'is_sensitive': False
+    },
+    {
+        'chave': 'POLLER_CONCORRENCIA',
+        'valor': '50',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Máximo de consultas simultâneas no worker de polling de dispositivos HTTP/TCP',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'SOCKET_INGESTAO_HOST',
+        'valor': '0.0.0.0',
+        'tipo': 'string',
+        'categoria': 'dispositivos',
+        'descricao': 'Endereço em que o worker de ingestão por socket escuta',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'SOCKET_INGESTAO_PORTA_UDP',
+        'valor': '5514',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Porta UDP do worker de ingestão por socket (0 desabilita)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'SOCKET_INGESTAO_PORTA_TCP',
+        'valor': '5515',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Porta TCP do worker de ingestão por socket (0 desabilita)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'RETENCAO_HISTORICO_DIAS',
+        'valor': '{"padrao": 0}',
+        'tipo': 'json',
+        'categoria': 'dispositivos',
+        'descricao': 'Dias de histórico mantidos no banco por tipo de dispositivo (ex.: {"ispindel": 180, "padrao": 365}); 0 mantém tudo',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'ARQUIVO_HISTORICO_DIR',
+        'valor': 'instance/arquivo_historico',
+        'tipo': 'string',
+        'categoria': 'dispositivos',
+        'descricao': 'Diretório dos arquivos compactados (.npz por dispositivo e mês) do histórico antigo',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'INGESTAO_TAMANHO_FILA',
+        'valor': '10000',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Capacidade da fila em memória dos workers de ingestão (leituras)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'INGESTAO_TAMANHO_LOTE',
+        'valor': '500',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Número máximo de leituras gravadas por lote nos workers de ingestão',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'INGESTAO_INTERVALO_FLUSH',
+        'valor': '1',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Intervalo máximo entre gravações de lotes nos workers de ingestão (segundos)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'CACHE_LEITURAS_INTERVALO_PERSISTENCIA',
+        'valor': '0',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Intervalo de persistência em lote do último valor dos dispositivos (segundos, 0 = a cada leitura)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'CACHE_LEITURAS_REDIS_URL',
+        'valor': '',
+        'tipo': 'string',
+        'categoria': 'dispositivos',
+        'descricao': 'URL do Redis para compartilhar o cache de últimas leituras entre processos (opcional)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'MAPEAMENTO_CAMPOS_DISPOSITIVOS',
+        'valor': '{}',
+        'tipo': 'json',
+        'categoria': 'dispositivos',
+        'descricao': 'Chaves extras de dados extraídas na ingestão, por tipo: {"ispindel": {"angle": "angulo"}}',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'INGESTAO_DADOS_MODO',
+        'valor': 'completo',
+        'tipo': 'string',
+        'categoria': 'dispositivos',
+        'descricao': 'Gravação de dados após o mapeamento: completo ou restante (só chaves não mapeadas)',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'HEARTBEAT_HABILITADO',
+        'valor': 'true',
+        'tipo': 'boolean',
+        'categoria': 'dispositivos',
+        'descricao': 'Marca como desconectados os dispositivos que param de enviar leituras',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'HEARTBEAT_FATOR',
+        'valor': '3',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Intervalos de atualização sem leitura até o dispositivo ser dado como desconectado',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'HEARTBEAT_MARGEM',
+        'valor': '10',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Tolerância extra (segundos) somada ao prazo de heartbeat',
+        'is_sensitive': False
+    },
+    {
+        'chave': 'HEARTBEAT_INTERVALO_PERSISTENCIA',
+        'valor': '5',
+        'tipo': 'number',
+        'categoria': 'dispositivos',
+        'descricao': 'Intervalo de gravação em lote das mudanças de status por heartbeat (segundos)',
+        'is_sensitive': False
     }
 ]
\ No newline at end of file
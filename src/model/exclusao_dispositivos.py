@@ -0,0 +1,179 @@
+# model/exclusao_dispositivos.py
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete, select, update, func
+from db.database import db
+from model.dispositivos import Dispositivo, HistoricoDispositivo, ExclusaoDispositivo
+
+# Linhas removidas por transação
+TAMANHO_BLOCO = 5000
+
+# Pausa entre blocos para a ingestão dos outros dispositivos obter o lock de escrita
+PAUSA_ENTRE_BLOCOS = 0.05
+
+
+def _tabelas_historico():
+    """Tabelas com linhas por dispositivo, na ordem de remoção"""
+    from model.agregados import HistoricoAgregado
+    from model.campos_leitura import HistoricoCampo
+    return (HistoricoCampo, HistoricoAgregado, HistoricoDispositivo)
+
+
+class ExpurgoDispositivos:
+    """
+    Exclusão de dispositivos em segundo plano.
+
+    agendar() marca o dispositivo (tombstone) e retorna na hora; a thread
+    remove o histórico em blocos de tamanho_bloco linhas, com commit e
+    atualização do progresso a cada bloco, e apaga o dispositivo no final.
+    Exclusões interrompidas podem ser retomadas (workers/expurgo.py).
+    """
+
+    def __init__(self, tamanho_bloco=TAMANHO_BLOCO, pausa=PAUSA_ENTRE_BLOCOS):
+        self.tamanho_bloco = tamanho_bloco
+        self.pausa = pausa
+        self._lock = threading.Lock()
+        self._thread = None
+        self._solicitado = False
+
+    def agendar(self, dispositivo, solicitado_por=None):
+        """Marca o dispositivo para exclusão (requer app context)"""
+        from model.cache_leituras import cache_leituras
+        from model.heartbeat import monitor_heartbeat
+
+        exclusao = ExclusaoDispositivo(
+            dispositivo_id=dispositivo.id,
+            nome=dispositivo.nome,
+            solicitado_por=solicitado_por
+        )
+        db.session.add(exclusao)
+        db.session.commit()
+
+        cache_leituras.remover(dispositivo.id)
+        monitor_heartbeat.remover(dispositivo.id)
+        return exclusao
+
+    def _reservar(self, exclusao_id, retomar=False):
+        """Passa a exclusão para em_andamento; False se outro processo já a pegou"""
+        status = [ExclusaoDispositivo.PENDENTE]
+        if retomar:
+            status += [ExclusaoDispositivo.EM_ANDAMENTO, ExclusaoDispositivo.ERRO]
+        resultado = db.session.execute(
+            update(ExclusaoDispositivo)
+            .where(ExclusaoDispositivo.id == exclusao_id, ExclusaoDispositivo.status.in_(status))
+            .values(status=ExclusaoDispositivo.EM_ANDAMENTO, iniciado_em=datetime.now(), erro=None)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    def _estimar(self, dispositivo_id):
+        return sum(
+            db.session.query(func.count()).select_from(tabela)
+            .filter(tabela.dispositivo_id == dispositivo_id).scalar() or 0
+            for tabela in _tabelas_historico()
+        )
+
+    def _remover_bloco(self, tabela, dispositivo_id):
+        ids = select(tabela.id).where(tabela.dispositivo_id == dispositivo_id).limit(self.tamanho_bloco)
+        return db.session.execute(
+            delete(tabela).where(tabela.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def processar(self, exclusao_id, retomar=False):
+        """Remove o histórico e o dispositivo de uma exclusão (requer app context)"""
+        from model.arquivo_historico import remover_arquivo_dispositivo
+        from model.regras_alerta import RegraAlerta, DisparoRegra
+
+        if not self._reservar(exclusao_id, retomar):
+            return None
+
+        exclusao = db.session.get(ExclusaoDispositivo, exclusao_id)
+        dispositivo_id = exclusao.dispositivo_id
+        try:
+            restantes = self._estimar(dispositivo_id)
+            exclusao.total_estimado = exclusao.removidas + restantes
+            db.session.commit()
+
+            for tabela in _tabelas_historico():
+                while True:
+                    removidas = self._remover_bloco(tabela, dispositivo_id)
+                    if removidas:
+                        exclusao.removidas += removidas
+                    db.session.commit()
+                    if removidas < self.tamanho_bloco:
+                        break
+                    time.sleep(self.pausa)
+
+            regras = select(RegraAlerta.id).where(RegraAlerta.dispositivo_id == dispositivo_id)
+            DisparoRegra.query.filter(
+                (DisparoRegra.dispositivo_id == dispositivo_id) | DisparoRegra.regra_id.in_(regras)
+            ).delete(synchronize_session=False)
+            RegraAlerta.query.filter_by(dispositivo_id=dispositivo_id).delete(synchronize_session=False)
+            Dispositivo.query.filter_by(id=dispositivo_id).delete(synchronize_session=False)
+            exclusao.status = ExclusaoDispositivo.CONCLUIDA
+            exclusao.concluido_em = datetime.now()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erro ao excluir dispositivo {dispositivo_id}: {e}")
+            exclusao = db.session.get(ExclusaoDispositivo, exclusao_id)
+            exclusao.status = ExclusaoDispositivo.ERRO
+            exclusao.erro = str(e)
+            db.session.commit()
+            return exclusao
+
+        remover_arquivo_dispositivo(dispositivo_id)
+        print(f"🗑️  Dispositivo {dispositivo_id} excluído: {exclusao.removidas} linhas de histórico removidas")
+        return exclusao
+
+    def executar_pendentes(self, retomar=False):
+        """Processa as exclusões abertas; retorna quantas foram concluídas"""
+        status = [ExclusaoDispositivo.PENDENTE]
+        if retomar:
+            status = list(ExclusaoDispositivo.STATUS_ABERTOS)
+        ids = [
+            exclusao_id for (exclusao_id,) in db.session.query(ExclusaoDispositivo.id)
+            .filter(ExclusaoDispositivo.status.in_(status))
+            .order_by(ExclusaoDispositivo.id).all()
+        ]
+        concluidas = 0
+        for exclusao_id in ids:
+            exclusao = self.processar(exclusao_id, retomar)
+            if exclusao is not None and exclusao.status == ExclusaoDispositivo.CONCLUIDA:
+                concluidas += 1
+        return concluidas
+
+    def iniciar(self, app):
+        """Processa as exclusões pendentes em uma thread, se ainda não houver uma rodando"""
+        def loop():
+            while True:
+                # Pedidos feitos durante uma passada geram outra passada
+                with self._lock:
+                    if not self._solicitado:
+                        self._thread = None
+                        return
+                    self._solicitado = False
+                with app.app_context():
+                    try:
+                        self.executar_pendentes()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Erro no expurgo de dispositivos: {e}")
+
+        with self._lock:
+            self._solicitado = True
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=loop, name='expurgo-dispositivos', daemon=True)
+            self._thread.start()
+
+    def aguardar(self, timeout=None):
+        """Espera a thread atual terminar (usado nos testes e no encerramento)"""
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+
+# Instância única por processo
+expurgo_dispositivos = ExpurgoDispositivos()
@@ -0,0 +1,326 @@
+# model/heartbeat.py
+import math
+import threading
+import time
+from datetime import datetime
+
+
+class RodaTempo:
+    """
+    Timing wheel: prazos por chave com armar/cancelar O(1).
+
+    Cada slot é um dict chave -> tick do prazo; prazos além de uma volta
+    da roda ficam no slot e só vencem quando o tick for alcançado.
+    """
+
+    def __init__(self, slots=512, tick=1.0):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._prazos = {}   # chave -> tick
+        self._tick_atual = None
+
+    def __len__(self):
+        return len(self._prazos)
+
+    def __contains__(self, chave):
+        return chave in self._prazos
+
+    def _para_tick(self, instante):
+        return math.ceil(instante / self.tick)
+
+    def armar(self, chave, prazo):
+        """(Re)arma o prazo (epoch em segundos) de uma chave"""
+        self.cancelar(chave)
+        tick = self._para_tick(prazo)
+        if self._tick_atual is not None:
+            # Prazo já passado vence no próximo avanço
+            tick = max(tick, self._tick_atual + 1)
+        self._slots[tick % len(self._slots)][chave] = tick
+        self._prazos[chave] = tick
+
+    def cancelar(self, chave):
+        tick = self._prazos.pop(chave, None)
+        if tick is not None:
+            self._slots[tick % len(self._slots)].pop(chave, None)
+
+    def avancar(self, agora):
+        """Avança até agora e retorna as chaves cujo prazo venceu"""
+        tick_agora = self._para_tick(agora)
+        if self._tick_atual is None:
+            # Primeiro avanço: prazos armados no passado (ex.: do banco) também vencem
+            self._tick_atual = tick_agora - len(self._slots)
+        if tick_agora <= self._tick_atual:
+            return []
+
+        # Atraso maior que uma volta: basta visitar cada slot uma vez
+        inicio = max(self._tick_atual + 1, tick_agora - len(self._slots) + 1)
+        vencidas = []
+        for tick in range(inicio, tick_agora + 1):
+            slot = self._slots[tick % len(self._slots)]
+            for chave, prazo in list(slot.items()):
+                if prazo <= tick_agora:
+                    del slot[chave]
+                    del self._prazos[chave]
+                    vencidas.append(chave)
+        self._tick_atual = tick_agora
+        return vencidas
+
+
+class MonitorHeartbeat:
+    """
+    Detecta dispositivos que pararam de comunicar.
+
+    Cada leitura rearma o prazo do dispositivo (intervalo_atualizacao * fator
+    + margem) na roda de tempo, em O(1). Quando um prazo vence, a última
+    comunicação é conferida no banco e no cache (leituras podem ter chegado
+    por outro processo); se continuar vencido, o dispositivo passa para
+    DESCONECTADO. Uma nova leitura o devolve para CONECTADO. Dispositivos
+    desconectados continuam na roda, reconferidos a cada intervalo de
+    atualização: leituras ingeridas pelos workers só aparecem aqui pela
+    última comunicação no banco ou no cache. As mudanças de status são
+    gravadas em lote a cada intervalo_persistencia segundos, com uma
+    notificação por desconexão.
+    """
+
+    # Status monitorados: só estes caem para DESCONECTADO
+    STATUS_ONLINE = ('conectado', 'ativo')
+
+    def __init__(self, fator=3.0, margem=10.0, intervalo_persistencia=5.0):
+        self.fator = fator
+        self.margem = margem
+        self.intervalo_persistencia = intervalo_persistencia
+        self.roda = RodaTempo()
+        self._lock = threading.Lock()
+        self._pendentes = {}   # dispositivo_id -> StatusDispositivo
+        self._thread = None
+        self._parar = threading.Event()
+
+    def configurar(self, fator=3.0, margem=10.0, intervalo_persistencia=5.0):
+        self.fator = float(fator)
+        self.margem = float(margem)
+        self.intervalo_persistencia = float(intervalo_persistencia)
+
+    def limite(self, intervalo_atualizacao):
+        """Segundos sem comunicação até o dispositivo ser dado como desconectado"""
+        return (intervalo_atualizacao or 30) * self.fator + self.margem
+
+    @staticmethod
+    def reconferencia(intervalo_atualizacao):
+        """Segundos entre as conferências de um dispositivo desconectado"""
+        return intervalo_atualizacao or 30
+
+    def limpar(self):
+        with self._lock:
+            self.roda = RodaTempo()
+            self._pendentes.clear()
+
+    def remover(self, dispositivo_id):
+        """Deixa de monitorar um dispositivo (exclusão)"""
+        with self._lock:
+            self.roda.cancelar(dispositivo_id)
+            self._pendentes.pop(dispositivo_id, None)
+
+    def registrar_leitura(self, dispositivo_id, intervalo_atualizacao, status, agora=None):
+        """Rearma o prazo do dispositivo; chamado a cada leitura confirmada"""
+        from model.dispositivos import StatusDispositivo
+
+        agora = agora if agora is not None else time.time()
+        with self._lock:
+            self.roda.armar(dispositivo_id, agora + self.limite(intervalo_atualizacao))
+            if self._pendentes.get(dispositivo_id) == StatusDispositivo.DESCONECTADO:
+                del self._pendentes[dispositivo_id]
+            elif status == StatusDispositivo.DESCONECTADO.value:
+                self._pendentes[dispositivo_id] = StatusDispositivo.CONECTADO
+
+    def armar_do_banco(self, agora=None):
+        """
+        Arma os dispositivos online a partir da última comunicação gravada e
+        os desconectados para reconferência (requer app context)
+        """
+        from model.dispositivos import Dispositivo, StatusDispositivo
+
+        agora = agora if agora is not None else time.time()
+        monitorados = [StatusDispositivo(s) for s in self.STATUS_ONLINE] + [StatusDispositivo.DESCONECTADO]
+        linhas = Dispositivo.query.with_entities(
+            Dispositivo.id, Dispositivo.status, Dispositivo.ultima_comunicacao, Dispositivo.intervalo_atualizacao
+        ).filter(Dispositivo.status.in_(monitorados), Dispositivo.nao_excluido()).all()
+        with self._lock:
+            for dispositivo_id, status, ultima, intervalo in linhas:
+                if status == StatusDispositivo.DESCONECTADO:
+                    self.roda.armar(dispositivo_id, agora + self.reconferencia(intervalo))
+                    continue
+                base = ultima.timestamp() if ultima else agora
+                self.roda.armar(dispositivo_id, base + self.limite(intervalo))
+        return len(linhas)
+
+    def verificar(self, agora=None):
+        """
+        Processa os prazos vencidos; retorna os ids marcados como desconectados.
+
+        Um dispositivo desconectado cuja última comunicação voltou a ficar
+        dentro do limite (leitura gravada por outro processo) volta para CONECTADO.
+        """
+        from model.cache_leituras import cache_leituras
+        from model.dispositivos import Dispositivo, StatusDispositivo
+
+        agora = agora if agora is not None else time.time()
+        with self._lock:
+            vencidos = self.roda.avancar(agora)
+        if not vencidos:
+            return []
+
+        cache = {
+            dispositivo_id: datetime.fromisoformat(entrada['ultima_comunicacao']).timestamp()
+            for dispositivo_id, entrada in cache_leituras.obter(vencidos).items()
+            if entrada.get('ultima_comunicacao')
+        }
+        linhas = Dispositivo.query.with_entities(
+            Dispositivo.id, Dispositivo.status, Dispositivo.ultima_comunicacao, Dispositivo.intervalo_atualizacao
+        ).filter(Dispositivo.id.in_(vencidos)).all()
+
+        desconectados = []
+        with self._lock:
+            for dispositivo_id, status, ultima, intervalo in linhas:
+                pendente = self._pendentes.get(dispositivo_id)
+                if pendente is not None:
+                    status = pendente
+                if status != StatusDispositivo.DESCONECTADO and status.value not in self.STATUS_ONLINE:
+                    continue
+                ultima = max(filter(None, [ultima.timestamp() if ultima else None, cache.get(dispositivo_id)]), default=None)
+                prazo = (ultima or 0) + self.limite(intervalo)
+
+                if status == StatusDispositivo.DESCONECTADO:
+                    if prazo > agora:
+                        # Voltou a comunicar por outro processo (worker)
+                        if pendente == StatusDispositivo.DESCONECTADO:
+                            del self._pendentes[dispositivo_id]
+                        else:
+                            self._pendentes[dispositivo_id] = StatusDispositivo.CONECTADO
+                        self.roda.armar(dispositivo_id, prazo)
+                    else:
+                        self.roda.armar(dispositivo_id, agora + self.reconferencia(intervalo))
+                    continue
+
+                if prazo > agora:
+                    # Houve comunicação registrada por outro processo
+                    self.roda.armar(dispositivo_id, prazo)
+                    continue
+                self._pendentes[dispositivo_id] = StatusDispositivo.DESCONECTADO
+                self.roda.armar(dispositivo_id, agora + self.reconferencia(intervalo))
+                desconectados.append(dispositivo_id)
+        return desconectados
+
+    def persistir(self):
+        """Grava as mudanças de status pendentes em um único UPDATE e notifica (requer app context)"""
+        from sqlalchemy import update, bindparam
+        from db.database import db
+        from model.cache_leituras import cache_leituras
+        from model.dispositivos import Dispositivo, StatusDispositivo
+        from model.hub_eventos import hub_eventos, EVENTO_STATUS
+
+        with self._lock:
+            pendentes = dict(self._pendentes)
+            self._pendentes.clear()
+        if not pendentes:
+            return 0
+
+        dispositivos = {d.id: d for d in Dispositivo.query.filter(Dispositivo.id.in_(list(pendentes))).all()}
+        mudancas = [
+            (dispositivos[i], status) for i, status in pendentes.items()
+            if i in dispositivos and dispositivos[i].status != status
+        ]
+        if not mudancas:
+            return 0
+
+        tabela = Dispositivo.__table__
+        stmt = update(tabela).where(tabela.c.id == bindparam('b_id')).values(status=bindparam('b_status'))
+        try:
+            db.session.execute(stmt, [{'b_id': d.id, 'b_status': status.name} for d, status in mudancas])
+            for dispositivo, status in mudancas:
+                if status == StatusDispositivo.DESCONECTADO:
+                    self._notificar_desconexao(dispositivo)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao persistir status de dispositivos: {e}")
+            with self._lock:
+                for dispositivo, status in mudancas:
+                    self._pendentes.setdefault(dispositivo.id, status)
+            return 0
+
+        for dispositivo, status in mudancas:
+            anterior = dispositivo.status
+            cache_leituras.atualizar_status(dispositivo.id, status)
+            hub_eventos.publicar(EVENTO_STATUS, {
+                'dispositivo_id': dispositivo.id,
+                'status_anterior': anterior.value if anterior else None,
+                'status': status.value
+            }, dispositivo.id, dispositivo.sessao_brasagem_id)
+        return len(mudancas)
+
+    @staticmethod
+    def _notificar_desconexao(dispositivo):
+        from db.database import db
+        from model.notification import Notification
+        from model.user import User
+
+        destinatarios = User.query.filter_by(username=dispositivo.created_by).all() if dispositivo.created_by else []
+        if not destinatarios:
+            destinatarios = User.query.filter_by(is_admin=True).all()
+        for usuario in destinatarios:
+            db.session.add(Notification(
+                user_id=usuario.id,
+                title='Dispositivo desconectado',
+                message=f'{dispositivo.nome} não envia dados há mais de '
+                        f'{(dispositivo.intervalo_atualizacao or 30) // 60 or 1} minuto(s) além do esperado',
+                notification_type='warning',
+                action_url='/dispositivos',
+                action_params={'dispositivo_id': dispositivo.id},
+                icon='bi-wifi-off',
+                priority=1
+            ))
+
+    def iniciar(self, app):
+        """Thread que avança a roda a cada tick e persiste as mudanças em lote"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            with app.app_context():
+                self.armar_do_banco()
+            ultima_persistencia = time.monotonic()
+            while not self._parar.wait(self.roda.tick):
+                with app.app_context():
+                    try:
+                        self.verificar()
+                        if time.monotonic() - ultima_persistencia >= self.intervalo_persistencia:
+                            self.persistir()
+                            ultima_persistencia = time.monotonic()
+                    except Exception as e:
+                        print(f"Erro no monitor de heartbeat: {e}")
+
+        self._parar.clear()
+        self._thread = threading.Thread(target=loop, name='heartbeat-dispositivos', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+
+# Instância única por processo
+monitor_heartbeat = MonitorHeartbeat()
+
+
+def configurar_heartbeat(app):
+    """Lê as configurações do heartbeat e inicia a thread, se habilitado"""
+    from model.config import Configuracao
+
+    with app.app_context():
+        habilitado = Configuracao.get_config('HEARTBEAT_HABILITADO', True)
+        monitor_heartbeat.configurar(
+            Configuracao.get_config('HEARTBEAT_FATOR', 3),
+            Configuracao.get_config('HEARTBEAT_MARGEM', 10),
+            Configuracao.get_config('HEARTBEAT_INTERVALO_PERSISTENCIA', 5)
+        )
+    if habilitado:
+        monitor_heartbeat.iniciar(app)
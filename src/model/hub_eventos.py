@@ -0,0 +1,135 @@
+# model/hub_eventos.py
+import itertools
+import threading
+import time
+from collections import deque
+
+# Políticas quando o buffer de um assinante enche
+POLITICA_DESCARTAR_ANTIGOS = 'descartar_antigos'  # Mantém os eventos mais recentes
+POLITICA_DESCARTAR_NOVOS = 'descartar_novos'      # Mantém os eventos mais antigos
+POLITICA_DESCONECTAR = 'desconectar'              # Encerra a assinatura
+POLITICAS_BUFFER = (POLITICA_DESCARTAR_ANTIGOS, POLITICA_DESCARTAR_NOVOS, POLITICA_DESCONECTAR)
+
+# Tipos de evento publicados
+EVENTO_LEITURA = 'leitura'
+EVENTO_STATUS = 'status'
+
+
+class Assinatura:
+    """Assinante do hub: filtro por dispositivo/sessão e buffer limitado próprio"""
+
+    def __init__(self, dispositivo_ids=None, sessao_id=None, tamanho_buffer=256,
+                 politica=POLITICA_DESCARTAR_ANTIGOS):
+        if politica not in POLITICAS_BUFFER:
+            raise ValueError(f'Política de buffer inválida: {politica}')
+        self.dispositivo_ids = set(dispositivo_ids) if dispositivo_ids else None
+        self.sessao_id = sessao_id
+        self.tamanho_buffer = max(int(tamanho_buffer), 1)
+        self.politica = politica
+        self.descartados = 0
+        self.encerrada = False
+        self._buffer = deque()
+        self._condicao = threading.Condition()
+
+    def aceita(self, dispositivo_id, sessao_id):
+        if self.dispositivo_ids is not None and dispositivo_id not in self.dispositivo_ids:
+            return False
+        if self.sessao_id is not None and sessao_id != self.sessao_id:
+            return False
+        return True
+
+    def entregar(self, evento):
+        """Coloca um evento no buffer sem bloquear; aplica a política se estiver cheio"""
+        with self._condicao:
+            if self.encerrada:
+                return False
+            if len(self._buffer) >= self.tamanho_buffer:
+                self.descartados += 1
+                if self.politica == POLITICA_DESCARTAR_NOVOS:
+                    return False
+                if self.politica == POLITICA_DESCONECTAR:
+                    self.encerrada = True
+                    self._condicao.notify_all()
+                    return False
+                self._buffer.popleft()
+            self._buffer.append(evento)
+            self._condicao.notify_all()
+            return True
+
+    def aguardar(self, timeout=15):
+        """Retorna os eventos pendentes, esperando até timeout segundos se não houver nenhum"""
+        with self._condicao:
+            if not self._buffer and not self.encerrada:
+                self._condicao.wait(timeout)
+            eventos = list(self._buffer)
+            self._buffer.clear()
+            return eventos
+
+    def encerrar(self):
+        with self._condicao:
+            self.encerrada = True
+            self._condicao.notify_all()
+
+
+class HubEventos:
+    """
+    Distribui eventos de dispositivos (novas leituras e mudanças de status)
+    para os assinantes do processo.
+
+    Publicar nunca bloqueia: cada assinante tem seu próprio buffer limitado,
+    então um cliente lento só perde os próprios eventos, sem atrasar a
+    ingestão nem os demais clientes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinaturas = []
+        self._ids = itertools.count(1)
+        self.publicados = 0
+
+    def assinar(self, dispositivo_ids=None, sessao_id=None, tamanho_buffer=256,
+                politica=POLITICA_DESCARTAR_ANTIGOS):
+        assinatura = Assinatura(dispositivo_ids, sessao_id, tamanho_buffer, politica)
+        with self._lock:
+            self._assinaturas.append(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        assinatura.encerrar()
+        with self._lock:
+            if assinatura in self._assinaturas:
+                self._assinaturas.remove(assinatura)
+
+    def publicar(self, tipo, dados, dispositivo_id, sessao_id=None):
+        """Entrega um evento aos assinantes cujo filtro aceita o dispositivo/sessão"""
+        with self._lock:
+            if not self._assinaturas:
+                return 0
+            assinaturas = list(self._assinaturas)
+
+        evento = {
+            'id': next(self._ids),
+            'tipo': tipo,
+            'dispositivo_id': dispositivo_id,
+            'sessao_brasagem_id': sessao_id,
+            'publicado_em': time.time(),
+            'dados': dados
+        }
+        entregues = 0
+        for assinatura in assinaturas:
+            if assinatura.aceita(dispositivo_id, sessao_id) and assinatura.entregar(evento):
+                entregues += 1
+        self.publicados += 1
+        return entregues
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'assinantes': len(self._assinaturas),
+                'publicados': self.publicados,
+                'descartados': sum(a.descartados for a in self._assinaturas)
+            }
+
+
+# Instância única por processo
+hub_eventos = HubEventos()
@@ -0,0 +1,243 @@
+# model/ingestao.py
+import math
+from datetime import datetime
+from sqlalchemy import insert
+from db.database import db
+from model.dispositivos import Dispositivo, HistoricoDispositivo
+from model.agregados import atualizar_agregados
+from model.campos_leitura import registro_campos
+from model.cache_leituras import cache_leituras
+from model.heartbeat import monitor_heartbeat
+from model.hub_eventos import hub_eventos, EVENTO_LEITURA
+from model.regras_alerta import motor_regras
+
+# Campos numéricos comuns aceitos em cada leitura
+CAMPOS_NUMERICOS = ('temperatura', 'gravidade', 'pressao', 'qualidade_sinal', 'bateria')
+
+# Limite de leituras aceitas em uma única requisição de lote
+MAX_LEITURAS_POR_LOTE = 10000
+
+# Nomes alternativos usados pelos firmwares para os campos comuns
+ALIASES_CAMPOS = {
+    'temperatura': ('temperatura', 'temperature', 'temp'),
+    'gravidade': ('gravidade', 'gravity', 'sg'),
+    'pressao': ('pressao', 'pressure'),
+    'bateria': ('bateria', 'battery'),
+    'qualidade_sinal': ('qualidade_sinal', 'rssi', 'RSSI'),
+    'timestamp': ('timestamp', 'ts', 'time'),
+}
+
+
+def parse_timestamp(valor):
+    """Converte timestamp ISO 8601 ou epoch (s/ms) em datetime local sem timezone"""
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime):
+        dt = valor
+    elif isinstance(valor, (int, float)):
+        # Epoch em milissegundos é comum em firmwares
+        segundos = valor / 1000 if valor > 1e11 else valor
+        return datetime.fromtimestamp(segundos)
+    else:
+        dt = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def extrair_leitura(dados, dispositivo_id=None):
+    """Monta uma leitura no formato do lote a partir de um payload bruto de dispositivo"""
+    leitura = {'dados': dados}
+    if dispositivo_id is not None:
+        leitura['dispositivo_id'] = dispositivo_id
+
+    for campo, aliases in ALIASES_CAMPOS.items():
+        for alias in aliases:
+            if alias in dados and dados[alias] is not None:
+                leitura[campo] = dados[alias]
+                break
+
+    return leitura
+
+
+def leitura_para_evento(registro):
+    """Leitura validada (dict do lote) no formato enviado aos assinantes do hub"""
+    evento = {campo: registro.get(campo) for campo in CAMPOS_NUMERICOS}
+    evento.update({
+        'dispositivo_id': registro['dispositivo_id'],
+        'timestamp': registro['timestamp'].isoformat(),
+        'unidade': registro.get('unidade'),
+        'dados': registro.get('dados')
+    })
+    return evento
+
+
+class IngestaoService:
+    """Serviço de ingestão em lote de leituras de dispositivos"""
+
+    @staticmethod
+    def validar_leitura(leitura, dispositivo_id_padrao=None):
+        """Valida uma leitura e retorna (registro, erro)"""
+        if not isinstance(leitura, dict):
+            return None, 'Leitura deve ser um objeto'
+
+        dispositivo_id = leitura.get('dispositivo_id', dispositivo_id_padrao)
+        try:
+            dispositivo_id = int(dispositivo_id)
+        except (TypeError, ValueError):
+            return None, 'Campo dispositivo_id inválido ou faltando'
+
+        dados = leitura.get('dados')
+        if not isinstance(dados, dict):
+            return None, 'Campo dados é obrigatório'
+
+        registro = {
+            'dispositivo_id': dispositivo_id,
+            'dados': dados,
+            'unidade': leitura.get('unidade')
+        }
+
+        for campo in CAMPOS_NUMERICOS:
+            valor = leitura.get(campo)
+            if valor is None:
+                registro[campo] = None
+                continue
+            try:
+                registro[campo] = float(valor)
+            except (TypeError, ValueError):
+                return None, f'Valor inválido para {campo}: {valor}'
+            # float() aceita 'nan' e 'inf'; NaN abortaria o INSERT do lote inteiro
+            if not math.isfinite(registro[campo]):
+                return None, f'Valor inválido para {campo}: {valor}'
+
+        try:
+            registro['timestamp'] = parse_timestamp(leitura.get('timestamp')) or datetime.now()
+        except (TypeError, ValueError, OverflowError, OSError):
+            return None, f"Timestamp inválido: {leitura.get('timestamp')}"
+
+        return registro, None
+
+    @staticmethod
+    def registrar_pos_ingestao(dispositivo, registros):
+        """
+        Atualiza o que depende das leituras recém-inseridas de um dispositivo,
+        dentro da mesma transação: último valor recebido e agregados.
+
+        Com o write-behind do cache de leituras ativo, o último valor não é
+        gravado aqui; o cache o persiste em lote. Retorna o que deve ser
+        publicado (cache e hub de eventos) com publicar_pos_commit depois do commit.
+        """
+        mais_recente = max(registros, key=lambda r: r['timestamp'])
+        if not cache_leituras.write_behind and (
+            not dispositivo.ultima_comunicacao or mais_recente['timestamp'] >= dispositivo.ultima_comunicacao
+        ):
+            dispositivo.ultimo_valor_recebido = mais_recente['dados']
+            dispositivo.ultima_comunicacao = mais_recente['timestamp']
+
+        atualizar_agregados(dispositivo.id, registros)
+
+        return {
+            'dispositivo_id': dispositivo.id,
+            'sessao_brasagem_id': dispositivo.sessao_brasagem_id,
+            'intervalo_atualizacao': dispositivo.intervalo_atualizacao,
+            'entrada': cache_leituras.montar_entrada(dispositivo, mais_recente['dados'], mais_recente['timestamp']),
+            'registros': registros
+        }
+
+    @staticmethod
+    def publicar_pos_commit(publicacoes):
+        """
+        Publica as leituras já confirmadas no banco: cache de leituras, hub
+        de eventos, heartbeat e regras de alerta.
+        """
+        for publicacao in publicacoes:
+            cache_leituras.atualizar(publicacao['entrada'])
+            monitor_heartbeat.registrar_leitura(
+                publicacao['dispositivo_id'],
+                publicacao['intervalo_atualizacao'],
+                publicacao['entrada']['status']
+            )
+            registros = sorted(publicacao['registros'], key=lambda r: r['timestamp'])
+            for registro in registros:
+                hub_eventos.publicar(
+                    EVENTO_LEITURA,
+                    leitura_para_evento(registro),
+                    publicacao['dispositivo_id'],
+                    publicacao['sessao_brasagem_id']
+                )
+            try:
+                motor_regras.avaliar(publicacao['dispositivo_id'], publicacao['sessao_brasagem_id'], registros)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erro ao avaliar regras de alerta do dispositivo {publicacao['dispositivo_id']}: {e}")
+
+    @staticmethod
+    def ingerir_lote(leituras, dispositivo_id_padrao=None):
+        """
+        Grava um lote de leituras (de um ou vários dispositivos).
+
+        Cada dispositivo recebe um único INSERT multi-linha e tem
+        ultimo_valor_recebido/ultima_comunicacao atualizados uma única vez,
+        a partir da leitura mais recente. Tudo é confirmado em uma transação.
+        """
+        resultados = [None] * len(leituras)
+        por_dispositivo = {}
+
+        for indice, leitura in enumerate(leituras):
+            registro, erro = IngestaoService.validar_leitura(leitura, dispositivo_id_padrao)
+            if erro:
+                resultados[indice] = {'indice': indice, 'status': 'rejeitado', 'erro': erro}
+                continue
+            por_dispositivo.setdefault(registro['dispositivo_id'], []).append((indice, registro))
+
+        dispositivos = {}
+        if por_dispositivo:
+            dispositivos = {
+                d.id: d for d in Dispositivo.visiveis().filter(
+                    Dispositivo.id.in_(list(por_dispositivo.keys()))
+                ).all()
+            }
+
+        aceitos = []
+        publicacoes = []
+        try:
+            for dispositivo_id, itens in por_dispositivo.items():
+                dispositivo = dispositivos.get(dispositivo_id)
+                if not dispositivo:
+                    for indice, _ in itens:
+                        resultados[indice] = {
+                            'indice': indice, 'status': 'rejeitado',
+                            'erro': f'Dispositivo {dispositivo_id} não encontrado'
+                        }
+                    continue
+
+                registros = [registro for _, registro in itens]
+                registro_campos.gravar(dispositivo, registros)
+                db.session.execute(insert(HistoricoDispositivo), registros)
+                publicacoes.append(IngestaoService.registrar_pos_ingestao(dispositivo, registros))
+
+                aceitos.extend(indice for indice, _ in itens)
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao gravar lote de leituras: {e}")
+            aceitos = []
+            publicacoes = []
+
+        IngestaoService.publicar_pos_commit(publicacoes)
+
+        for indice in aceitos:
+            resultados[indice] = {'indice': indice, 'status': 'aceito'}
+
+        # Leituras válidas que não chegaram a ser confirmadas
+        for indice, resultado in enumerate(resultados):
+            if resultado is None:
+                resultados[indice] = {'indice': indice, 'status': 'rejeitado', 'erro': 'Erro ao gravar no banco'}
+
+        return {
+            'aceitos': len(aceitos),
+            'rejeitados': len(leituras) - len(aceitos),
+            'resultados': resultados
+        }
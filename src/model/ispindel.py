@@ -0,0 +1,185 @@
+# model/ispindel.py
+import hmac
+import json
+import math
+import numpy as np
+from sqlalchemy import update, bindparam
+from db.database import db
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo
+from model.campos_leitura import HistoricoCampo
+from utils.calibracao import possui_polinomio, calcular_gravidade, temperatura_celsius
+
+# Chaves do payload nativo do iSpindel que carregam o ângulo ('angulo' é o
+# campo extraído, guardado em dados quando a leitura vai para o arquivo frio)
+CHAVES_ANGULO = ('angle', 'tilt', 'angulo')
+
+# Linhas lidas/atualizadas por bloco ao recalibrar o histórico
+TAMANHO_BLOCO = 5000
+
+
+def localizar_dispositivo(token, nome):
+    """
+    Encontra o iSpindel pelo token de acesso.
+
+    Retorna (dispositivo, erro). O token é comparado com hmac.compare_digest
+    contra o token_acesso de cada iSpindel; dispositivos sem token cadastrado
+    nunca são aceitos. O nome do payload só confirma o dispositivo do token,
+    nunca o identifica.
+    """
+    if not token:
+        return None, 'Token obrigatório'
+
+    token = str(token).encode('utf-8')
+    dispositivo = None
+    candidatos = Dispositivo.visiveis()\
+        .filter(Dispositivo.tipo == TipoDispositivo.ISPINDEL, Dispositivo.token_acesso.isnot(None))
+    # Sem interromper no primeiro acerto: o tempo não depende de qual token confere
+    for candidato in candidatos.all():
+        if candidato.token_acesso and hmac.compare_digest(token, candidato.token_acesso.encode('utf-8')):
+            dispositivo = candidato
+
+    if dispositivo is None:
+        return None, 'Token inválido'
+    if nome and nome != dispositivo.nome:
+        return None, 'Nome não corresponde ao dispositivo do token'
+    return dispositivo, None
+
+
+def angulo_do_payload(dados):
+    for chave in CHAVES_ANGULO:
+        valor = dados.get(chave)
+        if valor is not None and not isinstance(valor, bool):
+            try:
+                return float(valor)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def leitura_ispindel(dispositivo, payload):
+    """
+    Converte o payload nativo do iSpindel em uma leitura do lote.
+
+    Com polinômio de calibração cadastrado, a gravidade é calculada a partir
+    do ângulo; sem ele, vale a gravidade enviada pelo firmware. Retorna
+    (leitura, erro); os demais campos são validados pela ingestão.
+    """
+    dados = {k: v for k, v in payload.items() if k != 'token'}
+    leitura = {'dados': dados, 'dispositivo_id': dispositivo.id}
+
+    angulo = angulo_do_payload(dados)
+    if angulo is not None and possui_polinomio(dispositivo.parametros_calibracao):
+        leitura['gravidade'] = calcular_gravidade(dispositivo.parametros_calibracao, angulo)
+    elif dados.get('gravity') is not None:
+        leitura['gravidade'] = dados['gravity']
+
+    if dados.get('temperature') is not None:
+        # A conversão de unidade precisa do número antes da validação da ingestão
+        try:
+            temperatura = float(dados['temperature'])
+        except (TypeError, ValueError):
+            temperatura = math.nan
+        if not math.isfinite(temperatura):
+            return None, f"Valor inválido para temperature: {dados['temperature']}"
+        leitura['temperatura'] = temperatura_celsius(temperatura, dados.get('temp_units'))
+    if dados.get('battery') is not None:
+        leitura['bateria'] = dados['battery']
+    if dados.get('RSSI') is not None:
+        leitura['qualidade_sinal'] = dados['RSSI']
+    return leitura, None
+
+
+def _angulos_campos(dispositivo_id, inicio, fim):
+    """Ângulos extraídos na ingestão (historico_campos) no período, por timestamp"""
+    linhas = db.session.query(HistoricoCampo.timestamp, HistoricoCampo.valor)\
+        .filter(
+            HistoricoCampo.dispositivo_id == dispositivo_id,
+            HistoricoCampo.campo == 'angulo',
+            HistoricoCampo.timestamp >= inicio,
+            HistoricoCampo.timestamp <= fim
+        )
+    return dict(linhas)
+
+
+def _recalibrar_bloco(dispositivo, bloco):
+    """Avalia o polinômio sobre um bloco (id, timestamp, dados) e grava as gravidades com um UPDATE em lote"""
+    angulos = np.array([
+        np.nan if angulo is None else angulo
+        for angulo in (angulo_do_payload(dados or {}) for _, _, dados in bloco)
+    ])
+
+    # Com INGESTAO_DADOS_MODO=restante o ângulo só existe em historico_campos
+    sem_angulo = np.flatnonzero(np.isnan(angulos))
+    if len(sem_angulo):
+        timestamps = [bloco[i][1] for i in sem_angulo]
+        campos = _angulos_campos(dispositivo.id, min(timestamps), max(timestamps))
+        for i, timestamp in zip(sem_angulo, timestamps):
+            angulos[i] = campos.get(timestamp, np.nan)
+
+    gravidades = calcular_gravidade(dispositivo.parametros_calibracao, angulos)
+    linhas = [
+        {'b_id': bloco[i][0], 'b_gravidade': float(gravidades[i])}
+        for i in np.flatnonzero(~np.isnan(gravidades))
+    ]
+    if linhas:
+        tabela = HistoricoDispositivo.__table__
+        stmt = update(tabela).where(tabela.c.id == bindparam('b_id')).values(gravidade=bindparam('b_gravidade'))
+        db.session.execute(stmt, linhas)
+    return len(linhas)
+
+
+def _recalibrar_arquivo(dispositivo):
+    """Recalcula a gravidade das leituras já movidas para o arquivo frio, um arquivo por vez"""
+    from model.arquivo_historico import reescrever_blocos
+
+    def transformar(colunas):
+        angulos = np.array([
+            np.nan if angulo is None else angulo
+            for angulo in (angulo_do_payload(json.loads(str(dados))) for dados in colunas['dados'])
+        ])
+        gravidades = calcular_gravidade(dispositivo.parametros_calibracao, angulos)
+        validos = ~np.isnan(gravidades)
+        colunas['gravidade'] = np.where(validos, gravidades, colunas['gravidade'])
+        return int(validos.sum())
+
+    return reescrever_blocos(dispositivo.id, transformar)
+
+
+def recalibrar_historico(dispositivo):
+    """
+    Recalcula a gravidade de todo o histórico com o polinômio atual.
+
+    O banco é percorrido em blocos de TAMANHO_BLOCO (por id): cada bloco é
+    avaliado de uma vez e gravado com um UPDATE em lote antes do próximo ser
+    lido. O arquivo frio é regravado arquivo a arquivo. Em seguida os
+    agregados e os resumos de sessões finalizadas que usaram o dispositivo
+    são recalculados. Retorna a quantidade de leituras atualizadas.
+    """
+    from model.agregados import reconstruir_agregados
+    from model.analise_fermentacao import analise_fermentacao
+    from model.resumo_sessao import ResumoSessaoService
+
+    if not possui_polinomio(dispositivo.parametros_calibracao):
+        raise ValueError('Dispositivo sem polinômio de calibração')
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        bloco = db.session.query(HistoricoDispositivo.id, HistoricoDispositivo.timestamp, HistoricoDispositivo.dados)\
+            .filter(HistoricoDispositivo.dispositivo_id == dispositivo.id, HistoricoDispositivo.id > ultimo_id)\
+            .order_by(HistoricoDispositivo.id.asc())\
+            .limit(TAMANHO_BLOCO).all()
+        if not bloco:
+            break
+        ultimo_id = bloco[-1][0]
+        total += _recalibrar_bloco(dispositivo, bloco)
+
+    total += _recalibrar_arquivo(dispositivo)
+    if not total:
+        return 0
+
+    ResumoSessaoService.recalcular_do_dispositivo(dispositivo.id)
+    reconstruir_agregados(dispositivo.id)
+    # As somas das previsões foram acumuladas com as gravidades antigas
+    analise_fermentacao.limpar()
+    return total
@@ -0,0 +1,344 @@
+# model/regras_alerta.py
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from db.database import db
+from model.agregados import _insert_upsert
+
+# Tipos de regra
+REGRA_LIMITE = 'limite'                  # Valor fora de [minimo, maximo] por duracao_segundos
+REGRA_TAXA_VARIACAO = 'taxa_variacao'    # |variação por hora| acima de variacao_maxima_hora
+REGRA_ESTABILIDADE = 'estabilidade'      # Valor dentro de variacao_maxima por janela_segundos
+REGRA_AUSENCIA_DADOS = 'ausencia_dados'  # Nenhuma leitura por timeout_segundos
+TIPOS_REGRA = (REGRA_LIMITE, REGRA_TAXA_VARIACAO, REGRA_ESTABILIDADE, REGRA_AUSENCIA_DADOS)
+
+# Parâmetros obrigatórios por tipo
+PARAMETROS_OBRIGATORIOS = {
+    REGRA_LIMITE: (),
+    REGRA_TAXA_VARIACAO: ('variacao_maxima_hora',),
+    REGRA_ESTABILIDADE: ('variacao_maxima', 'janela_segundos'),
+    REGRA_AUSENCIA_DADOS: ('timeout_segundos',),
+}
+
+
+class RegraAlerta(db.Model):
+    """Regra de alerta sobre as leituras de um dispositivo, de uma sessão ou de todos"""
+    __tablename__ = 'regras_alerta'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nome = Column(String(100), nullable=False)
+    tipo = Column(String(30), nullable=False)
+    campo = Column(String(50), nullable=True)  # temperatura, gravidade... ou chave de dados
+    parametros = Column(JSON, nullable=False, default=dict)
+    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id'), nullable=True)
+    sessao_brasagem_id = Column(Integer, ForeignKey('sessoes_brasagem.id'), nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    cooldown_segundos = Column(Integer, default=3600)
+    ativo = Column(Boolean, default=True)
+    ultimo_disparo = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'campo': self.campo,
+            'parametros': self.parametros or {},
+            'dispositivo_id': self.dispositivo_id,
+            'sessao_brasagem_id': self.sessao_brasagem_id,
+            'user_id': self.user_id,
+            'cooldown_segundos': self.cooldown_segundos,
+            'ativo': self.ativo,
+            'ultimo_disparo': self.ultimo_disparo.isoformat() if self.ultimo_disparo else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    @staticmethod
+    def validar(tipo, campo, parametros):
+        """Retorna uma mensagem de erro ou None se a definição da regra é válida"""
+        if tipo not in TIPOS_REGRA:
+            return f'Tipo inválido. Use: {", ".join(TIPOS_REGRA)}'
+        if not isinstance(parametros, dict):
+            return 'Campo parametros deve ser um objeto'
+        if tipo != REGRA_AUSENCIA_DADOS and not campo:
+            return 'Campo campo é obrigatório para este tipo de regra'
+        for nome in PARAMETROS_OBRIGATORIOS[tipo]:
+            if parametros.get(nome) is None:
+                return f'Parâmetro {nome} é obrigatório'
+        if tipo == REGRA_LIMITE and parametros.get('minimo') is None and parametros.get('maximo') is None:
+            return 'Informe minimo e/ou maximo'
+        for nome, valor in parametros.items():
+            if valor is not None and not isinstance(valor, (int, float)):
+                return f'Parâmetro {nome} deve ser numérico'
+        return None
+
+    def __repr__(self):
+        return f'<RegraAlerta {self.nome} ({self.tipo})>'
+
+
+class DisparoRegra(db.Model):
+    """Último alerta de uma regra para um dispositivo (cooldown compartilhado entre processos)"""
+    __tablename__ = 'disparos_regras'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    regra_id = Column(Integer, ForeignKey('regras_alerta.id', ondelete='CASCADE'), nullable=False)
+    dispositivo_id = Column(Integer, ForeignKey('dispositivos.id', ondelete='CASCADE'), nullable=False)
+    ultimo_disparo = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('regra_id', 'dispositivo_id', name='uq_disparo_regra_dispositivo'),
+    )
+
+
+def reservar_disparo(regra_id, dispositivo_id, agora, cooldown_segundos):
+    """
+    Registra o disparo se o cooldown já passou; retorna False se outro
+    disparo (deste ou de outro processo) ainda está dentro dele.
+
+    Um único INSERT ... ON CONFLICT DO UPDATE ... WHERE: a verificação e a
+    gravação são atômicas no banco. Não faz commit.
+    """
+    tabela = DisparoRegra.__table__
+    stmt = _insert_upsert()(tabela).values(regra_id=regra_id, dispositivo_id=dispositivo_id, ultimo_disparo=agora)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['regra_id', 'dispositivo_id'],
+        set_={'ultimo_disparo': stmt.excluded.ultimo_disparo},
+        where=tabela.c.ultimo_disparo <= agora - timedelta(seconds=cooldown_segundos or 0)
+    )
+    return db.session.execute(stmt).rowcount == 1
+
+
+# ========== AVALIAÇÃO (estado de tamanho constante por regra e dispositivo) ==========
+
+def _avaliar_limite(parametros, estado, timestamp, valor):
+    minimo, maximo = parametros.get('minimo'), parametros.get('maximo')
+    fora = (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo)
+    if not fora:
+        estado['desde'] = None
+        return False
+    estado['desde'] = estado.get('desde') or timestamp
+    return (timestamp - estado['desde']).total_seconds() >= parametros.get('duracao_segundos', 0)
+
+
+def _avaliar_taxa_variacao(parametros, estado, timestamp, valor):
+    anterior = estado.get('anterior')
+    if anterior is None or timestamp <= anterior[0]:
+        if anterior is None:
+            estado['anterior'] = (timestamp, valor)
+        return estado.get('excedida', False)
+
+    segundos = (timestamp - anterior[0]).total_seconds()
+    taxa = (valor - anterior[1]) / (segundos / 3600.0)
+    # Média móvel exponencial com constante de tempo janela_segundos
+    alfa = 1.0 - math.exp(-segundos / max(parametros.get('janela_segundos', 3600), 1))
+    estado['taxa'] = taxa if 'taxa' not in estado else estado['taxa'] + alfa * (taxa - estado['taxa'])
+    estado['anterior'] = (timestamp, valor)
+    estado['excedida'] = abs(estado['taxa']) > parametros['variacao_maxima_hora']
+    return estado['excedida']
+
+
+def _avaliar_estabilidade(parametros, estado, timestamp, valor):
+    inicio = estado.get('inicio')
+    if inicio is None or timestamp < inicio:
+        estado.update(inicio=timestamp, minimo=valor, maximo=valor)
+        return False
+    minimo, maximo = min(estado['minimo'], valor), max(estado['maximo'], valor)
+    if maximo - minimo > parametros['variacao_maxima']:
+        # Saiu da faixa: recomeça a janela de estabilidade a partir desta leitura
+        estado.update(inicio=timestamp, minimo=valor, maximo=valor)
+        return False
+    estado.update(minimo=minimo, maximo=maximo)
+    return (timestamp - inicio).total_seconds() >= parametros['janela_segundos']
+
+
+AVALIADORES = {
+    REGRA_LIMITE: _avaliar_limite,
+    REGRA_TAXA_VARIACAO: _avaliar_taxa_variacao,
+    REGRA_ESTABILIDADE: _avaliar_estabilidade,
+}
+
+
+def _valor_campo(registro, campo):
+    valor = registro.get(campo)
+    if valor is None and isinstance(registro.get('dados'), dict):
+        valor = registro['dados'].get(campo)
+    if valor is None or isinstance(valor, bool):
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mensagem(regra, dispositivo_id, valor=None, estado=None):
+    campo = regra['campo']
+    parametros = regra['parametros']
+    if regra['tipo'] == REGRA_LIMITE:
+        faixa = f"[{parametros.get('minimo', '-∞')}, {parametros.get('maximo', '∞')}]"
+        return f"{campo} = {valor} fora da faixa {faixa} no dispositivo {dispositivo_id}"
+    if regra['tipo'] == REGRA_TAXA_VARIACAO:
+        return f"{campo} variando {estado['taxa']:.3f}/h no dispositivo {dispositivo_id} (máximo {parametros['variacao_maxima_hora']}/h)"
+    if regra['tipo'] == REGRA_ESTABILIDADE:
+        horas = parametros['janela_segundos'] / 3600
+        return f"{campo} estável ({estado['minimo']}–{estado['maximo']}) há {horas:g}h no dispositivo {dispositivo_id}"
+    return f"Dispositivo {dispositivo_id} sem leituras há mais de {parametros['timeout_segundos'] / 60:g} minutos"
+
+
+class MotorRegras:
+    """
+    Avalia as regras de alerta a cada leitura ingerida.
+
+    As regras ativas ficam em memória, indexadas por dispositivo e sessão, e
+    são relidas do banco no máximo a cada intervalo_recarga segundos. Cada
+    par (regra, dispositivo) guarda um estado de tamanho fixo, então cada
+    leitura custa O(1) por regra aplicável. Um alerta dispara uma vez por
+    ocorrência da condição e respeita o cooldown da regra, verificado no
+    banco (DisparoRegra) para valer entre o processo web e os workers.
+    """
+
+    def __init__(self, intervalo_recarga=60):
+        self.intervalo_recarga = intervalo_recarga
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        self._regras = None
+        self._por_dispositivo = {}
+        self._por_sessao = {}
+        self._globais = []
+        self._estados = {}    # (regra_id, dispositivo_id) -> estado
+        self._carregado_em = 0
+
+    def recarregar(self):
+        """Relê as regras ativas do banco (requer app context)"""
+        regras = [regra.to_dict() for regra in RegraAlerta.query.filter_by(ativo=True).all()]
+        por_dispositivo, por_sessao, globais = {}, {}, []
+        for regra in regras:
+            if regra['dispositivo_id']:
+                por_dispositivo.setdefault(regra['dispositivo_id'], []).append(regra)
+            elif regra['sessao_brasagem_id']:
+                por_sessao.setdefault(regra['sessao_brasagem_id'], []).append(regra)
+            else:
+                globais.append(regra)
+
+        with self._lock:
+            ids = {regra['id'] for regra in regras}
+            self._estados = {chave: estado for chave, estado in self._estados.items() if chave[0] in ids}
+            self._regras = regras
+            self._por_dispositivo, self._por_sessao, self._globais = por_dispositivo, por_sessao, globais
+            self._carregado_em = time.monotonic()
+
+    def _garantir_carregado(self):
+        if self._regras is None or time.monotonic() - self._carregado_em > self.intervalo_recarga:
+            self.recarregar()
+
+    def regras_aplicaveis(self, dispositivo_id, sessao_id):
+        self._garantir_carregado()
+        return self._por_dispositivo.get(dispositivo_id, []) + self._por_sessao.get(sessao_id, []) + self._globais
+
+    def avaliar(self, dispositivo_id, sessao_id, registros):
+        """Avalia as leituras (em ordem cronológica) de um dispositivo e emite os alertas"""
+        regras = self.regras_aplicaveis(dispositivo_id, sessao_id)
+        if not regras:
+            return []
+
+        alertas = []
+        with self._lock:
+            for regra in regras:
+                estado = self._estados.setdefault((regra['id'], dispositivo_id), {})
+                if regra['tipo'] == REGRA_AUSENCIA_DADOS:
+                    estado['ativo'] = False
+                    continue
+                avaliador = AVALIADORES[regra['tipo']]
+                for registro in registros:
+                    valor = _valor_campo(registro, regra['campo'])
+                    if valor is None:
+                        continue
+                    condicao = avaliador(regra['parametros'], estado, registro['timestamp'], valor)
+                    if condicao and not estado.get('ativo'):
+                        alertas.append((regra, dispositivo_id, _mensagem(regra, dispositivo_id, valor, estado)))
+                    estado['ativo'] = condicao
+
+        return self._emitir(alertas)
+
+    def verificar_ausencias(self, agora=None):
+        """Dispara as regras de ausência de dados dos dispositivos sem leituras recentes"""
+        from model.cache_leituras import cache_leituras
+        from model.dispositivos import Dispositivo
+
+        self._garantir_carregado()
+        regras = [regra for regra in self._regras if regra['tipo'] == REGRA_AUSENCIA_DADOS]
+        if not regras:
+            return []
+
+        agora = agora or datetime.now()
+        ultimas = {
+            entrada['id']: entrada['ultima_comunicacao'] for entrada in cache_leituras.todos()
+            if entrada.get('ultima_comunicacao')
+        }
+        alertas = []
+        for dispositivo in Dispositivo.visiveis().all():
+            ultima = dispositivo.ultima_comunicacao
+            cache = ultimas.get(dispositivo.id)
+            if cache:
+                cache = datetime.fromisoformat(cache)
+                ultima = max(ultima, cache) if ultima else cache
+            if not ultima:
+                continue
+
+            for regra in regras:
+                if regra['dispositivo_id'] not in (None, dispositivo.id):
+                    continue
+                if regra['sessao_brasagem_id'] not in (None, dispositivo.sessao_brasagem_id):
+                    continue
+                with self._lock:
+                    estado = self._estados.setdefault((regra['id'], dispositivo.id), {})
+                    condicao = (agora - ultima).total_seconds() >= regra['parametros']['timeout_segundos']
+                    if condicao and not estado.get('ativo'):
+                        alertas.append((regra, dispositivo.id, _mensagem(regra, dispositivo.id)))
+                    estado['ativo'] = condicao
+
+        return self._emitir(alertas, agora)
+
+    def _emitir(self, alertas, agora=None):
+        """Cria, em um único commit, as notificações dos alertas que passaram pelo cooldown"""
+        from model.notification import Notification
+
+        if not alertas:
+            return []
+
+        agora = agora or datetime.now()
+        emitidos, notificacoes = [], []
+        for regra, dispositivo_id, mensagem in alertas:
+            if not reservar_disparo(regra['id'], dispositivo_id, agora, regra['cooldown_segundos']):
+                continue
+            notificacoes.append(Notification(
+                user_id=regra['user_id'],
+                title=f"Alerta: {regra['nome']}",
+                message=mensagem,
+                notification_type='warning',
+                action_url='/dispositivos',
+                action_params={'dispositivo_id': dispositivo_id, 'regra_id': regra['id']},
+                icon='bi-exclamation-triangle',
+                priority=1
+            ))
+            emitidos.append({'regra_id': regra['id'], 'dispositivo_id': dispositivo_id, 'mensagem': mensagem})
+
+        if emitidos:
+            RegraAlerta.query.filter(RegraAlerta.id.in_({alerta['regra_id'] for alerta in emitidos}))\
+                .update({'ultimo_disparo': agora}, synchronize_session=False)
+            db.session.add_all(notificacoes)
+        db.session.commit()
+        return emitidos
+
+
+# Instância única por processo
+motor_regras = MotorRegras()
@@ -0,0 +1,264 @@
+# model/resumo_sessao.py
+from datetime import datetime
+import numpy as np
+from sqlalchemy import Column, Integer, DateTime, Float, JSON, ForeignKey
+from sqlalchemy.sql import func
+from db.database import db
+
+STATUS_FINALIZADA = 'finalizada'
+
+# Faixa padrão em torno de temperatura_alvo para o tempo na faixa (°C)
+TOLERANCIA_TEMPERATURA = 1.0
+
+# Intervalos sem leitura maiores que isto (x intervalo_atualizacao) não contam como tempo medido
+FATOR_LACUNA = 3
+
+# Leituras de gravidade usadas (mediana) para a gravidade inicial e final
+LEITURAS_EXTREMOS = 5
+
+# Largura das faixas do perfil de temperatura
+PERIODO_PERFIL_SEGUNDOS = 3600
+
+
+class ResumoSessao(db.Model):
+    """Resumo de telemetria de uma sessão, gravado quando ela é finalizada"""
+    __tablename__ = 'resumos_sessoes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sessao_brasagem_id = Column(Integer, ForeignKey('sessoes_brasagem.id'), nullable=False, unique=True)
+    inicio = Column(DateTime, nullable=True)
+    fim = Column(DateTime, nullable=True)
+    duracao_horas = Column(Float, nullable=True)
+    leituras = Column(Integer, nullable=False, default=0)
+
+    temperatura_min = Column(Float, nullable=True)
+    temperatura_max = Column(Float, nullable=True)
+    temperatura_media = Column(Float, nullable=True)
+    temperatura_alvo = Column(Float, nullable=True)
+    tolerancia = Column(Float, nullable=True)         # Faixa usada no tempo_na_faixa_pct
+    tempo_na_faixa_pct = Column(Float, nullable=True)
+    horas_medidas = Column(Float, nullable=True)
+
+    gravidade_inicial = Column(Float, nullable=True)
+    gravidade_final = Column(Float, nullable=True)
+    queda_gravidade_pontos = Column(Float, nullable=True)
+    atenuacao_aparente = Column(Float, nullable=True)
+
+    perfil_temperatura = Column(JSON, nullable=True)  # [{'hora': n, 'media': x, 'min': y, 'max': z}]
+    dispositivos = Column(JSON, nullable=True)        # [{'id', 'nome', 'leituras'}]
+    calculado_em = Column(DateTime, default=func.now())
+
+    CAMPOS = (
+        'inicio', 'fim', 'duracao_horas', 'leituras', 'temperatura_min', 'temperatura_max',
+        'temperatura_media', 'temperatura_alvo', 'tolerancia', 'tempo_na_faixa_pct', 'horas_medidas',
+        'gravidade_inicial', 'gravidade_final', 'queda_gravidade_pontos', 'atenuacao_aparente',
+        'perfil_temperatura', 'dispositivos'
+    )
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        data = {'sessao_brasagem_id': self.sessao_brasagem_id, 'materializado': True}
+        for campo in self.CAMPOS:
+            valor = getattr(self, campo)
+            data[campo] = valor.isoformat() if isinstance(valor, datetime) else valor
+        data['calculado_em'] = self.calculado_em.isoformat() if self.calculado_em else None
+        return data
+
+
+def _arredondar(valor, casas):
+    return None if valor is None or np.isnan(valor) else round(float(valor), casas)
+
+
+def _pesos(timestamps, intervalo):
+    """Segundos representados por cada leitura (até a próxima), com lacunas longas descartadas"""
+    if len(timestamps) == 0:
+        return np.zeros(0)
+    segundos = np.diff(timestamps).astype('timedelta64[ms]').astype(float) / 1000.0
+    limite = FATOR_LACUNA * max(intervalo or 30, 1)
+    pesos = np.where(segundos > limite, 0.0, segundos)
+    # A última leitura vale um intervalo nominal
+    return np.append(pesos, min(intervalo or 30, limite))
+
+
+def _mediana_extremos(valores, inicio=True):
+    validos = valores[~np.isnan(valores)]
+    if not len(validos):
+        return None
+    trecho = validos[:LEITURAS_EXTREMOS] if inicio else validos[-LEITURAS_EXTREMOS:]
+    return float(np.median(trecho))
+
+
+class ResumoSessaoService:
+    """Cálculo do resumo de telemetria de uma sessão sobre a janela da sessão"""
+
+    @staticmethod
+    def janela(sessao, agora=None):
+        fim = sessao.data_fim or agora or datetime.now()
+        return sessao.data_inicio, fim
+
+    @staticmethod
+    def calcular(sessao, tolerancia=TOLERANCIA_TEMPERATURA, agora=None, dispositivos=None):
+        """
+        Calcula o resumo (dict) a partir do histórico dos dispositivos da sessão.
+
+        Cada dispositivo é lido uma vez como arrays NumPy (banco + arquivo
+        frio); estatísticas, tempo na faixa e o perfil por hora saem de
+        operações vetorizadas sobre as séries concatenadas.
+        """
+        from model.dispositivos import Dispositivo, HistoricoDispositivo
+
+        inicio, fim = ResumoSessaoService.janela(sessao, agora)
+        if dispositivos is None:
+            dispositivos = Dispositivo.get_por_sessao(sessao.id)
+
+        timestamps, temperaturas, gravidades, pesos = [], [], [], []
+        resumo_dispositivos = []
+        for dispositivo in dispositivos:
+            ts, series = HistoricoDispositivo.get_series(dispositivo.id, ('temperatura', 'gravidade'), inicio, fim)
+            resumo_dispositivos.append({'id': dispositivo.id, 'nome': dispositivo.nome, 'leituras': int(len(ts))})
+            if not len(ts):
+                continue
+            timestamps.append(ts)
+            temperaturas.append(series['temperatura'])
+            gravidades.append(series['gravidade'])
+            pesos.append(_pesos(ts, dispositivo.intervalo_atualizacao))
+
+        resumo = {campo: None for campo in ResumoSessao.CAMPOS}
+        resumo.update({
+            'sessao_brasagem_id': sessao.id,
+            'materializado': False,
+            'inicio': inicio.isoformat() if inicio else None,
+            'fim': fim.isoformat() if fim else None,
+            'duracao_horas': _arredondar((fim - inicio).total_seconds() / 3600.0, 2) if inicio and fim else None,
+            'leituras': 0,
+            'temperatura_alvo': sessao.temperatura_alvo,
+            'tolerancia': tolerancia,
+            'perfil_temperatura': [],
+            'dispositivos': resumo_dispositivos
+        })
+        if not timestamps:
+            return resumo
+
+        ts = np.concatenate(timestamps)
+        temperatura = np.concatenate(temperaturas)
+        gravidade = np.concatenate(gravidades)
+        peso = np.concatenate(pesos)
+        resumo['leituras'] = int(len(ts))
+
+        com_temperatura = ~np.isnan(temperatura)
+        if com_temperatura.any():
+            t = temperatura[com_temperatura]
+            p = peso[com_temperatura]
+            resumo.update({
+                'temperatura_min': _arredondar(t.min(), 2),
+                'temperatura_max': _arredondar(t.max(), 2),
+                'temperatura_media': _arredondar(t.mean(), 2),
+                'horas_medidas': _arredondar(p.sum() / 3600.0, 2)
+            })
+            if sessao.temperatura_alvo is not None and p.sum() > 0:
+                na_faixa = np.abs(t - sessao.temperatura_alvo) <= tolerancia
+                resumo['tempo_na_faixa_pct'] = _arredondar(p[na_faixa].sum() / p.sum() * 100, 1)
+            resumo['perfil_temperatura'] = ResumoSessaoService._perfil(ts[com_temperatura], t, inicio)
+
+        # Gravidade em ordem cronológica (dispositivos misturados)
+        ordem = np.argsort(ts, kind='stable')
+        serie_gravidade = gravidade[ordem]
+        inicial = sessao.gravidade_original or _mediana_extremos(serie_gravidade, inicio=True)
+        final = _mediana_extremos(serie_gravidade, inicio=False)
+        if inicial is not None and final is not None:
+            resumo.update({
+                'gravidade_inicial': _arredondar(inicial, 4),
+                'gravidade_final': _arredondar(final, 4),
+                'queda_gravidade_pontos': _arredondar((inicial - final) * 1000.0, 1)
+            })
+            if inicial > 1.0:
+                resumo['atenuacao_aparente'] = _arredondar((inicial - final) / (inicial - 1.0) * 100, 1)
+        return resumo
+
+    @staticmethod
+    def _perfil(timestamps, temperaturas, inicio):
+        """Média, mínima e máxima de temperatura por hora desde o início da sessão"""
+        origem = np.datetime64(inicio, 'ms') if inicio else timestamps.min()
+        segundos = (timestamps - origem).astype('timedelta64[ms]').astype(float) / 1000.0
+        faixas = np.maximum(segundos // PERIODO_PERFIL_SEGUNDOS, 0).astype(np.int64)
+        contagem = np.bincount(faixas)
+        soma = np.bincount(faixas, weights=temperaturas)
+        minimos = np.full(len(contagem), np.inf)
+        maximos = np.full(len(contagem), -np.inf)
+        np.minimum.at(minimos, faixas, temperaturas)
+        np.maximum.at(maximos, faixas, temperaturas)
+        return [
+            {
+                'hora': int(hora),
+                'media': round(float(soma[hora] / contagem[hora]), 2),
+                'min': round(float(minimos[hora]), 2),
+                'max': round(float(maximos[hora]), 2),
+                'leituras': int(contagem[hora])
+            }
+            for hora in np.nonzero(contagem)[0]
+        ]
+
+    @staticmethod
+    def materializar(sessao, tolerancia=TOLERANCIA_TEMPERATURA, dispositivos=None):
+        """Calcula e grava (ou substitui) o resumo da sessão; não faz commit"""
+        dados = ResumoSessaoService.calcular(sessao, tolerancia, dispositivos=dispositivos)
+        resumo = ResumoSessao.query.filter_by(sessao_brasagem_id=sessao.id).first()
+        if resumo is None:
+            resumo = ResumoSessao(sessao_brasagem_id=sessao.id)
+            db.session.add(resumo)
+        for campo in ResumoSessao.CAMPOS:
+            valor = dados[campo]
+            if campo in ('inicio', 'fim') and valor:
+                valor = datetime.fromisoformat(valor)
+            setattr(resumo, campo, valor)
+        resumo.calculado_em = datetime.now()
+        return resumo
+
+    @staticmethod
+    def recalcular_do_dispositivo(dispositivo_id):
+        """
+        Regrava os resumos materializados que usaram leituras do dispositivo
+        (ex.: depois de recalibrar o histórico), com a mesma tolerância e os
+        mesmos dispositivos da materialização. Não faz commit.
+        """
+        from model.dispositivos import Dispositivo
+        from model.sessao_brasagem import SessaoBrasagem
+
+        recalculados = 0
+        for resumo in ResumoSessao.query.all():
+            ids = [item['id'] for item in resumo.dispositivos or []]
+            if dispositivo_id not in ids:
+                continue
+            sessao = db.session.get(SessaoBrasagem, resumo.sessao_brasagem_id)
+            dispositivos = Dispositivo.query.filter(Dispositivo.id.in_(ids)).all()
+            ResumoSessaoService.materializar(
+                sessao, resumo.tolerancia if resumo.tolerancia is not None else TOLERANCIA_TEMPERATURA, dispositivos
+            )
+            recalculados += 1
+        return recalculados
+
+    @staticmethod
+    def finalizar(sessao, data_fim=None, tolerancia=TOLERANCIA_TEMPERATURA):
+        """Finaliza a sessão e materializa o resumo em uma transação"""
+        sessao.status = STATUS_FINALIZADA
+        sessao.data_fim = data_fim or sessao.data_fim or datetime.now()
+        resumo = ResumoSessaoService.materializar(sessao, tolerancia)
+        if sessao.gravidade_final is None and resumo.gravidade_final is not None:
+            sessao.gravidade_final = resumo.gravidade_final
+        db.session.commit()
+        return resumo
+
+    @staticmethod
+    def obter(sessao, tolerancia=TOLERANCIA_TEMPERATURA):
+        """
+        Resumo materializado de sessões finalizadas; calculado na hora nas demais.
+
+        Uma tolerância diferente da usada na materialização recalcula o
+        resumo (sem gravar), para a mesma consulta responder igual antes e
+        depois de finalizar.
+        """
+        if sessao.status == STATUS_FINALIZADA:
+            resumo = ResumoSessao.query.filter_by(sessao_brasagem_id=sessao.id).first()
+            if resumo is not None and resumo.tolerancia == tolerancia:
+                return resumo.to_dict()
+        return ResumoSessaoService.calcular(sessao, tolerancia)
@@ -0,0 +1,50 @@
+"""
+Aplicação Flask mínima com SQLite em memória para os testes
+"""
+
+import sys
+import os
+
+# Adicionar o diretório src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask_login import LoginManager
+from db.database import db
+
+
+def criar_app_teste(blueprints=(), uri='sqlite://'):
+    """Cria uma aplicação com banco em memória (ou uri) e login desabilitado"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['LOGIN_DISABLED'] = True
+    app.config['TESTING'] = True
+
+    db.init_app(app)
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def carregar_usuario(user_id):
+        from model.user import User
+        return db.session.get(User, int(user_id))
+
+    for bp in blueprints:
+        app.register_blueprint(bp, url_prefix='/api')
+
+    with app.app_context():
+        import model.user
+        import model.config
+        import model.ingredientes
+        import model.sessao_brasagem
+        import model.dispositivos
+        import model.agregados
+        import model.campos_leitura
+        import model.regras_alerta
+        import model.resumo_sessao
+        import model.notification
+        import model.brewfather
+        db.create_all()
+
+    return app
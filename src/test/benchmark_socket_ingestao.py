@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão: ingestão por socket (UDP binário) x HTTP
+
+Sobe a aplicação de teste (SQLite em memória) e mede leituras gravadas por
+segundo em três caminhos:
+
+    http        POST /api/dispositivos/<id>/historico, uma leitura por requisição
+    http_lote   POST /api/dispositivos/<id>/historico/lote, LOTE leituras por requisição
+    udp         quadros binários (workers.socket_ingestao) com GravadorLotes
+
+Uso (a partir de src/):
+    python test/benchmark_socket_ingestao.py [leituras]
+"""
+
+import asyncio
+import http.client
+import json
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from werkzeug.serving import make_server
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from workers.gravador_lotes import GravadorLotes
+from workers.socket_ingestao import IngestorSocket, codificar_binario
+
+LOTE = 200
+REGISTROS_POR_DATAGRAMA = 100
+
+
+def contar(app, dispositivo_id):
+    with app.app_context():
+        return HistoricoDispositivo.query.filter_by(dispositivo_id=dispositivo_id).count()
+
+
+def medir_http(app, dispositivo_id, total, porta, lote=None):
+    def enviar(caminho, corpo):
+        conexao = http.client.HTTPConnection('127.0.0.1', porta)
+        conexao.request('POST', caminho, corpo, {'Content-Type': 'application/json'})
+        conexao.getresponse().read()
+        conexao.close()
+
+    inicio = time.perf_counter()
+    if lote:
+        caminho = f'/api/dispositivos/{dispositivo_id}/historico/lote'
+        for i in range(0, total, lote):
+            corpo = {'leituras': [{'temperatura': 20.0, 'gravidade': 1.048, 'dados': {}}] * min(lote, total - i)}
+            enviar(caminho, json.dumps(corpo))
+    else:
+        caminho = f'/api/dispositivos/{dispositivo_id}/historico'
+        corpo = json.dumps({'temperatura': 20.0, 'gravidade': 1.048, 'dados': {}})
+        for _ in range(total):
+            enviar(caminho, corpo)
+    duracao = time.perf_counter() - inicio
+    return contar(app, dispositivo_id), duracao
+
+
+def medir_udp(app, dispositivo_id, total):
+    gravador = GravadorLotes(app, tamanho_fila=total, tamanho_lote=1000, intervalo_flush=0.2)
+    ingestor = IngestorSocket(gravador)
+    ingestor.mapa.carregar([(dispositivo_id, '127.0.0.1')])
+    quadro = codificar_binario([{'temperatura': 20.0, 'gravidade': 1.048}] * REGISTROS_POR_DATAGRAMA)
+
+    async def principal():
+        transporte, _ = await ingestor.iniciar('127.0.0.1', porta_udp=0)
+        porta = transporte.get_extra_info('sockname')[1]
+        cliente, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=('127.0.0.1', porta))
+        for i in range(0, total, REGISTROS_POR_DATAGRAMA):
+            cliente.sendto(quadro)
+            # Cede o loop para o servidor consumir (cliente e servidor no mesmo processo)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        cliente.close()
+        transporte.close()
+
+    gravador.iniciar()
+    inicio = time.perf_counter()
+    asyncio.run(principal())
+    gravador.parar()
+    return contar(app, dispositivo_id), time.perf_counter() - inicio
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = criar_app_teste([dispositivos_bp])
+    with app.app_context():
+        ids = {}
+        for caminho in ('http', 'http_lote', 'udp'):
+            dispositivo = Dispositivo(
+                nome=f'bench-{caminho}', tipo=TipoDispositivo.SENSOR_TEMPERATURA,
+                protocolo=ProtocoloComunicacao.UDP, endereco='127.0.0.1'
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            ids[caminho] = dispositivo.id
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=False)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    total_http = max(total // 20, 100)
+    resultados = {
+        'http': medir_http(app, ids['http'], total_http, servidor.server_port),
+        'http_lote': medir_http(app, ids['http_lote'], total, servidor.server_port, lote=LOTE),
+        'udp': medir_udp(app, ids['udp'], total),
+    }
+    servidor.shutdown()
+
+    print(f"{'caminho':<10} {'gravadas':>9} {'segundos':>9} {'leituras/s':>11}")
+    for caminho, (gravadas, duracao) in resultados.items():
+        print(f"{caminho:<10} {gravadas:>9} {duracao:>9.2f} {gravadas / duracao:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga da ingestão com dispositivos simulados
+
+Cria N dispositivos virtuais de cada TipoDispositivo (utils.simulador),
+com curvas de fermentação e brassagem determinísticas pela semente, e
+envia as leituras por cada caminho de ingestão a uma taxa fixa:
+
+    http    POST /api/dispositivos/<id>/historico, uma leitura por requisição
+    lote    POST /api/dispositivos/historico/lote, LOTE leituras de vários dispositivos
+    mqtt    IngestorMQTT.processar_mensagem + GravadorLotes (sem broker)
+    udp     um datagrama binário por leitura para IngestorSocket + GravadorLotes
+            (cada dispositivo envia de um endereço 127.0.1.x; requer Linux)
+
+Para cada caminho relata a latência de ingestão p50/p99 (do horário
+agendado do envio até o commit; atrasos do próprio gerador contam como
+latência), linhas gravadas por segundo e o crescimento do banco em linhas
+e bytes. A mesma semente gera as mesmas leituras em todas as execuções.
+
+Uso (a partir de src/):
+    python test/carga_ingestao.py [--caminhos http,lote,mqtt,udp] [--por-tipo 2]
+                                  [--taxa 500] [--duracao 10] [--semente 0]
+                                  [--banco sqlite:///carga.db]
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import socket
+import sys
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from werkzeug.serving import make_server
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.agregados import HistoricoAgregado
+from model.campos_leitura import HistoricoCampo
+from model.dispositivos import Dispositivo, HistoricoDispositivo, ProtocoloComunicacao
+from model.ingestao import IngestaoService
+from utils.simulador import criar_frota
+from workers.gravador_lotes import GravadorLotes
+from workers.mqtt_ingestao import IngestorMQTT
+from workers.socket_ingestao import IngestorSocket, codificar_binario
+
+CAMINHOS = ('http', 'lote', 'mqtt', 'udp')
+LOTE = 200
+
+PROTOCOLOS = {
+    'http': ProtocoloComunicacao.HTTP,
+    'lote': ProtocoloComunicacao.HTTP,
+    'mqtt': ProtocoloComunicacao.MQTT,
+    'udp': ProtocoloComunicacao.UDP,
+}
+
+
+class Latencias:
+    """
+    Latências (ms) do horário agendado de cada envio até o commit.
+
+    Nos caminhos com fila (mqtt, udp) os envios pendentes ficam em ordem e
+    cada lote gravado conclui os mais antigos, na ordem da fila do gravador.
+    """
+
+    def __init__(self):
+        self.valores = []
+        self._pendentes = deque()
+        self._lock = threading.Lock()
+
+    def registrar(self, agendado, quantidade=1):
+        self.valores.extend([(time.perf_counter() - agendado) * 1000] * quantidade)
+
+    def agendar(self, agendado):
+        with self._lock:
+            self._pendentes.append(agendado)
+
+    def concluir(self, quantidade):
+        agora = time.perf_counter()
+        with self._lock:
+            for _ in range(min(quantidade, len(self._pendentes))):
+                self.valores.append((agora - self._pendentes.popleft()) * 1000)
+
+    def percentil(self, p):
+        return float(np.percentile(self.valores, p)) if self.valores else float('nan')
+
+
+def ritmo(total, taxa):
+    """Gera o horário agendado de cada envio, dormindo até ele (taxa envios/s)"""
+    inicio = time.perf_counter()
+    for i in range(total):
+        agendado = inicio + i / taxa
+        espera = agendado - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        yield agendado
+
+
+def tamanho_banco():
+    """Bytes ocupados pelo banco (SQLite: páginas; PostgreSQL: pg_database_size)"""
+    if db.engine.dialect.name == 'sqlite':
+        paginas = db.session.execute(text('PRAGMA page_count')).scalar()
+        return paginas * db.session.execute(text('PRAGMA page_size')).scalar()
+    if db.engine.dialect.name == 'postgresql':
+        return db.session.execute(text('SELECT pg_database_size(current_database())')).scalar()
+    return None
+
+
+def medir_banco(app, ids):
+    with app.app_context():
+        linhas = {
+            modelo.__tablename__: db.session.query(modelo).filter(modelo.dispositivo_id.in_(ids)).count()
+            for modelo in (HistoricoDispositivo, HistoricoCampo, HistoricoAgregado)
+        }
+        return linhas, tamanho_banco()
+
+
+def criar_dispositivos(app, caminho, frota):
+    """Cadastra a frota simulada para um caminho e liga cada dispositivo virtual ao seu id"""
+    with app.app_context():
+        for i, simulado in enumerate(frota):
+            dispositivo = Dispositivo(
+                nome=f'sim-{caminho}-{simulado.tipo.value}-{i}',
+                tipo=simulado.tipo,
+                protocolo=PROTOCOLOS[caminho],
+                endereco=f'127.0.1.{i + 1}',
+                topico_mqtt=f'simulador/{caminho}/{i}',
+                intervalo_atualizacao=simulado.intervalo
+            )
+            db.session.add(dispositivo)
+            db.session.flush()
+            simulado.dispositivo_id = dispositivo.id
+        db.session.commit()
+
+
+def serializar(leitura):
+    return dict(leitura, timestamp=leitura['timestamp'].isoformat())
+
+
+def enviar_http(porta, caminho, corpo):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta)
+    conexao.request('POST', caminho, json.dumps(corpo), {'Content-Type': 'application/json'})
+    resposta = conexao.getresponse()
+    resposta.read()
+    conexao.close()
+    return resposta.status
+
+
+def executar_http(app, frota, total, taxa, porta, latencias):
+    for i, agendado in enumerate(ritmo(total, taxa)):
+        simulado = frota[i % len(frota)]
+        enviar_http(porta, f'/api/dispositivos/{simulado.dispositivo_id}/historico', serializar(simulado.proxima()))
+        latencias.registrar(agendado)
+
+
+def executar_lote(app, frota, total, taxa, porta, latencias):
+    # Cada envio leva LOTE leituras: a taxa de requisições é taxa / LOTE
+    for i, agendado in enumerate(ritmo(-(-total // LOTE), taxa / LOTE)):
+        quantidade = min(LOTE, total - i * LOTE)
+        leituras = [serializar(frota[(i * LOTE + j) % len(frota)].proxima()) for j in range(quantidade)]
+        enviar_http(porta, '/api/dispositivos/historico/lote', {'leituras': leituras})
+        latencias.registrar(agendado, quantidade)
+
+
+def criar_gravador(app, latencias, total):
+    def gravar(lote):
+        with app.app_context():
+            resultado = IngestaoService.ingerir_lote(lote)
+        latencias.concluir(len(lote))
+        return resultado
+
+    return GravadorLotes(app, tamanho_fila=max(total, 1), tamanho_lote=500, intervalo_flush=0.2, gravar=gravar)
+
+
+def executar_mqtt(app, frota, total, taxa, porta, latencias):
+    gravador = criar_gravador(app, latencias, total)
+    ingestor = IngestorMQTT(gravador)
+    ingestor.mapa.carregar([(s.dispositivo_id, f'simulador/mqtt/{i}') for i, s in enumerate(frota)])
+
+    gravador.iniciar()
+    for i, agendado in enumerate(ritmo(total, taxa)):
+        indice = i % len(frota)
+        latencias.agendar(agendado)
+        ingestor.processar_mensagem(f'simulador/mqtt/{indice}', json.dumps(serializar(frota[indice].proxima())))
+    gravador.parar()
+
+
+def executar_udp(app, frota, total, taxa, porta, latencias):
+    gravador = criar_gravador(app, latencias, total)
+    ingestor = IngestorSocket(gravador)
+    ingestor.mapa.carregar([(s.dispositivo_id, f'127.0.1.{i + 1}') for i, s in enumerate(frota)])
+
+    loop = asyncio.new_event_loop()
+    transporte, _ = loop.run_until_complete(ingestor.iniciar('127.0.0.1', porta_udp=0))
+    destino = transporte.get_extra_info('sockname')
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    clientes = []
+    for i in range(len(frota)):
+        cliente = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        cliente.bind((f'127.0.1.{i + 1}', 0))
+        clientes.append(cliente)
+
+    gravador.iniciar()
+    for i, agendado in enumerate(ritmo(total, taxa)):
+        indice = i % len(frota)
+        leitura = frota[indice].proxima()
+        latencias.agendar(agendado)
+        clientes[indice].sendto(codificar_binario([dict(leitura, timestamp=leitura['timestamp'].timestamp())]), destino)
+
+    # Espera o servidor consumir os datagramas antes de drenar o gravador
+    prazo = time.monotonic() + 5
+    while ingestor.pacotes < total and time.monotonic() < prazo:
+        time.sleep(0.01)
+    loop.call_soon_threadsafe(transporte.close)
+    loop.call_soon_threadsafe(loop.stop)
+    gravador.parar()
+    for cliente in clientes:
+        cliente.close()
+
+
+EXECUTORES = {
+    'http': executar_http,
+    'lote': executar_lote,
+    'mqtt': executar_mqtt,
+    'udp': executar_udp,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerador de carga da ingestão com dispositivos simulados')
+    parser.add_argument('--caminhos', default=','.join(CAMINHOS), help='caminhos separados por vírgula')
+    parser.add_argument('--por-tipo', type=int, default=2, help='dispositivos simulados de cada tipo')
+    parser.add_argument('--taxa', type=float, default=500, help='leituras por segundo (todos os dispositivos)')
+    parser.add_argument('--duracao', type=float, default=10, help='segundos de envio por caminho')
+    parser.add_argument('--intervalo', type=int, default=60, help='segundos de tempo simulado entre leituras')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--banco', default='sqlite://', help='URI do banco (padrão: SQLite em memória)')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app = criar_app_teste([dispositivos_bp], uri=args.banco)
+    servidor = make_server('127.0.0.1', 0, app, threaded=False)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    total = int(args.taxa * args.duracao)
+
+    print(f"{'caminho':<7} {'enviadas':>9} {'gravadas':>9} {'linhas/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'linhas+':>8} {'bytes+':>11} {'bytes/leit':>10}")
+    for caminho in args.caminhos.split(','):
+        frota = criar_frota(args.por_tipo, semente=args.semente, intervalo=args.intervalo)
+        criar_dispositivos(app, caminho, frota)
+        ids = [s.dispositivo_id for s in frota]
+
+        linhas_antes, bytes_antes = medir_banco(app, ids)
+        latencias = Latencias()
+        inicio = time.perf_counter()
+        EXECUTORES[caminho](app, frota, total, args.taxa, servidor.server_port, latencias)
+        duracao = time.perf_counter() - inicio
+        linhas_depois, bytes_depois = medir_banco(app, ids)
+
+        gravadas = linhas_depois['historico_dispositivos'] - linhas_antes['historico_dispositivos']
+        linhas = sum(linhas_depois.values()) - sum(linhas_antes.values())
+        crescimento = bytes_depois - bytes_antes if bytes_antes is not None else None
+        por_leitura = f'{crescimento / gravadas:>10.0f}' if crescimento is not None and gravadas else f"{'-':>10}"
+        print(f"{caminho:<7} {total:>9} {gravadas:>9} {gravadas / duracao:>9.0f} "
+              f"{latencias.percentil(50):>8.1f} {latencias.percentil(99):>8.1f} {linhas:>8} "
+              f"{crescimento if crescimento is not None else '-':>11} {por_leitura}")
+
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Testes da previsão de fermentação
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.fermentacao_routes import fermentacao_bp
+from model.analise_fermentacao import AnaliseFermentacao
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.sessao_brasagem import SessaoBrasagem
+from utils.ajuste_fermentacao import grade_modelos, acumular, ajustar, N_SOMAS
+
+INICIO = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def gravidade_exponencial(horas):
+    return 1.010 + 0.040 * np.exp(-0.02 * np.asarray(horas, dtype=float))
+
+
+class TestAjusteFermentacao(unittest.TestCase):
+    """Testes do ajuste vetorizado"""
+
+    def test_recupera_gravidade_final_de_varias_sessoes(self):
+        """Duas sessões com curvas diferentes são ajustadas na mesma passada"""
+        modelos = grade_modelos()
+        somas = np.zeros((2, len(modelos), N_SOMAS))
+        horas = np.arange(0, 96, 1.0)
+        logistica = 1.012 + 0.048 / (1 + np.exp(0.08 * (horas - 48)))
+
+        acumular(somas, np.zeros(len(horas), dtype=int), horas, (gravidade_exponencial(horas) - 1) * 1000, modelos)
+        acumular(somas, np.ones(len(horas), dtype=int), horas, (logistica - 1) * 1000, modelos)
+        melhor, gf, a, rmse = ajustar(somas)
+
+        self.assertAlmostEqual(1 + gf[0] / 1000, 1.010, places=3)
+        self.assertAlmostEqual(1 + gf[1] / 1000, 1.012, delta=0.0015)
+        self.assertEqual(modelos[melhor[1]][0], 'logistico')
+
+
+class TestAnaliseFermentacao(unittest.TestCase):
+    """Testes do serviço e da API de previsões"""
+
+    def setUp(self):
+        self.app = criar_app_teste([fermentacao_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            sessao = SessaoBrasagem(nome='APA', status='em_andamento', data_inicio=INICIO, gravidade_original=1.050)
+            db.session.add(sessao)
+            db.session.flush()
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10',
+                sessao_brasagem_id=sessao.id
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.sessao_id = sessao.id
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _inserir(self, horas):
+        for h, g in zip(horas, gravidade_exponencial(horas)):
+            db.session.add(HistoricoDispositivo(
+                dispositivo_id=self.dispositivo_id, dados={}, gravidade=float(g),
+                timestamp=INICIO + timedelta(hours=float(h))
+            ))
+        db.session.commit()
+
+    def test_previsao_incremental(self):
+        """Leituras novas entram nas somas sem reler as anteriores"""
+        analise = AnaliseFermentacao()
+        with self.app.app_context():
+            self._inserir(np.arange(0, 24, 1.0))
+            previsao = analise.get_previsao(self.sessao_id, forcar=True)
+            self.assertEqual(previsao['leituras'], 24)
+
+            self._inserir(np.arange(24, 72, 1.0))
+            previsao = analise.get_previsao(self.sessao_id, forcar=True)
+
+        self.assertEqual(previsao['leituras'], 72)
+        self.assertAlmostEqual(previsao['gravidade_final_prevista'], 1.010, places=3)
+        self.assertAlmostEqual(previsao['atenuacao_aparente_prevista'], 80.0, delta=1.0)
+        self.assertEqual(previsao['modelo']['familia'], 'exponencial')
+        # 40 pontos * e^(-0.02 t) < 1 ponto => t ~ 184 h
+        eta = datetime.fromisoformat(previsao['eta'])
+        self.assertAlmostEqual((eta - INICIO).total_seconds() / 3600, 184, delta=15)
+
+    def test_leitura_atrasada_abaixo_da_marca(self):
+        """Commit fora de ordem (id menor que a marca) recalcula a sessão em vez de ser ignorado"""
+        analise = AnaliseFermentacao()
+        with self.app.app_context():
+            self._inserir(np.arange(0, 48, 1.0))
+            atrasada = HistoricoDispositivo.query.order_by(HistoricoDispositivo.id).offset(10).first()
+            id_atrasado, timestamp, gravidade = atrasada.id, atrasada.timestamp, atrasada.gravidade
+            db.session.delete(atrasada)
+            db.session.commit()
+            self.assertEqual(analise.get_previsao(self.sessao_id, forcar=True)['leituras'], 47)
+
+            db.session.add(HistoricoDispositivo(
+                id=id_atrasado, dispositivo_id=self.dispositivo_id, dados={}, gravidade=gravidade, timestamp=timestamp
+            ))
+            db.session.commit()
+            self.assertEqual(analise.get_previsao(self.sessao_id, forcar=True)['leituras'], 48)
+
+            # Remoção também invalida as somas
+            HistoricoDispositivo.query.filter_by(id=id_atrasado).delete()
+            db.session.commit()
+            self.assertEqual(analise.get_previsao(self.sessao_id, forcar=True)['leituras'], 47)
+
+    def test_api_previsoes(self):
+        with self.app.app_context():
+            self._inserir(np.arange(0, 48, 1.0))
+
+        response = self.client.get('/api/fermentacao/previsoes?atualizar=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['sessao_id'] for p in response.get_json()], [self.sessao_id])
+
+        response = self.client.get('/api/fermentacao/sessoes/999/previsao')
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Testes da retenção e do arquivo frio do histórico
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from model.config import Configuracao
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.ingestao import IngestaoService
+from model import arquivo_historico
+from model.arquivo_historico import RetencaoService
+from model.agregados import HistoricoAgregado, reconstruir_agregados
+from model.campos_leitura import HistoricoCampo, registro_campos
+
+
+class TestRetencao(unittest.TestCase):
+    """Testes para o arquivamento em blocos e a leitura transparente"""
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.app = criar_app_teste()
+        self.agora = datetime.now().replace(microsecond=0)
+        with self.app.app_context():
+            Configuracao.set_config('ARQUIVO_HISTORICO_DIR', self.diretorio)
+            Configuracao.set_config('RETENCAO_HISTORICO_DIAS', {'ispindel': 30, 'padrao': 0}, tipo='json')
+            for nome, tipo in (('iSpindel-01', TipoDispositivo.ISPINDEL), ('Bomba-01', TipoDispositivo.BOMBA)):
+                db.session.add(Dispositivo(nome=nome, tipo=tipo, protocolo=ProtocoloComunicacao.HTTP, endereco='x'))
+            db.session.commit()
+            # 90 dias de leituras a cada 6 horas para os dois dispositivos
+            IngestaoService.ingerir_lote([
+                {'dispositivo_id': d, 'dados': {'n': i}, 'gravidade': 1.050 - i * 0.0001,
+                 'timestamp': self.agora - timedelta(hours=6 * i)}
+                for d in (1, 2) for i in range(360)
+            ])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        shutil.rmtree(self.diretorio)
+
+    def test_arquiva_por_tipo_e_le_periodo(self):
+        with self.app.app_context():
+            resultado = RetencaoService.executar(tamanho_bloco=100)
+
+            # Somente o iSpindel tem retenção (30 dias = 120 leituras ficam)
+            self.assertEqual(resultado, {1: 240})
+            self.assertEqual(HistoricoDispositivo.query.filter_by(dispositivo_id=1).count(), 120)
+            self.assertEqual(HistoricoDispositivo.query.filter_by(dispositivo_id=2).count(), 360)
+            self.assertTrue(os.listdir(os.path.join(self.diretorio, 'dispositivo_1')))
+
+            inicio = self.agora - timedelta(days=90)
+            registros = HistoricoDispositivo.get_leituras_por_periodo(1, inicio, self.agora)
+            self.assertEqual(len(registros), 360)
+            self.assertEqual([r.dados['n'] for r in registros], list(reversed(range(360))))
+
+            timestamps, series = HistoricoDispositivo.get_series(1, ['gravidade'], inicio, self.agora)
+            self.assertEqual(len(timestamps), 360)
+            self.assertAlmostEqual(series['gravidade'][0], 1.050 - 359 * 0.0001)
+
+    def test_um_arquivo_por_bloco(self):
+        with self.app.app_context():
+            # Arquivar nunca relê (nem regrava) o que já está no mês
+            with patch('numpy.load', side_effect=AssertionError('bloco relido')):
+                RetencaoService.executar(tamanho_bloco=50)
+
+            pasta = os.path.join(self.diretorio, 'dispositivo_1')
+            blocos = [nome for mes in os.listdir(pasta) for nome in os.listdir(os.path.join(pasta, mes))]
+            # 240 leituras em blocos de 50, cada bloco partido pelos meses que atravessa
+            self.assertGreaterEqual(len(blocos), 5)
+            linhas = list(HistoricoDispositivo.iterar_linhas([1], ['id', 'timestamp']))
+            self.assertEqual(len(linhas), 360)
+            self.assertEqual([t for _, t in linhas], sorted(t for _, t in linhas))
+
+    def test_exportacao_le_um_mes_por_vez(self):
+        with self.app.app_context():
+            RetencaoService.executar()
+            lidas = []
+            ler_particao = arquivo_historico._ler_particao
+
+            def contar(pasta):
+                lidas.append(pasta)
+                return ler_particao(pasta)
+
+            with patch.object(arquivo_historico, '_ler_particao', side_effect=contar):
+                linhas = HistoricoDispositivo.iterar_linhas([1], ['id', 'timestamp'])
+                next(linhas)
+                self.assertEqual(len(lidas), 1)
+                self.assertEqual(sum(1 for _ in linhas), 359)
+            self.assertGreater(len(lidas), 1)
+
+    def test_paginacao_inclui_arquivo(self):
+        with self.app.app_context():
+            RetencaoService.executar()
+            for ordem in ('asc', 'desc'):
+                vistos, cursor = [], None
+                while True:
+                    registros, cursor = HistoricoDispositivo.get_pagina(1, limite=50, after=cursor, ordem=ordem)
+                    vistos += [r.dados['n'] for r in registros]
+                    if cursor is None:
+                        break
+                # n = 359 é a leitura mais antiga (arquivada), n = 0 a mais recente (no banco)
+                esperado = list(reversed(range(360)))
+                self.assertEqual(vistos, esperado if ordem == 'asc' else esperado[::-1])
+
+    def test_reexecucao_sem_duplicar(self):
+        with self.app.app_context():
+            RetencaoService.executar()
+            self.assertEqual(RetencaoService.executar(), {})
+            linhas = list(HistoricoDispositivo.iterar_linhas([1], ['id', 'timestamp']))
+            self.assertEqual(len(linhas), 360)
+            self.assertEqual(len(set(linha[0] for linha in linhas)), 360)
+
+    def test_campos_extraidos_seguem_a_retencao(self):
+        with self.app.app_context():
+            Configuracao.set_config('INGESTAO_DADOS_MODO', 'restante')
+            registro_campos.recarregar()
+            HistoricoDispositivo.query.delete()
+            db.session.commit()
+            try:
+                IngestaoService.ingerir_lote([
+                    {'dispositivo_id': 1, 'dados': {'n': i, 'angle': 30.0 + i}, 'timestamp': self.agora - timedelta(days=i)}
+                    for i in range(60)
+                ])
+            finally:
+                Configuracao.set_config('INGESTAO_DADOS_MODO', 'completo')
+                registro_campos.recarregar()
+            self.assertEqual(HistoricoCampo.query.count(), 60)
+
+            self.assertEqual(RetencaoService.arquivar_dispositivo(1, self.agora - timedelta(days=30), 7), 29)
+            # Só ficam os campos das leituras que continuam no banco
+            self.assertEqual(HistoricoCampo.query.count(), 31)
+            self.assertEqual(
+                db.session.query(db.func.min(HistoricoCampo.timestamp)).scalar(), self.agora - timedelta(days=30)
+            )
+            arquivadas = [linha[0] for linha in arquivo_historico.linhas_periodo(1, ['dados'])]
+            self.assertEqual(len(arquivadas), 29)
+            self.assertTrue(all(dados['angulo'] == 30.0 + dados['n'] for dados in arquivadas))
+            self.assertNotIn('angle', arquivadas[0])
+
+    def test_reconstruir_agregados_inclui_arquivo(self):
+        with self.app.app_context():
+            RetencaoService.executar()
+            antes = HistoricoAgregado.query.filter_by(dispositivo_id=1, resolucao='1d').count()
+
+            self.assertEqual(reconstruir_agregados(1, tamanho_bloco=100), 360)
+            diarios = HistoricoAgregado.query.filter_by(dispositivo_id=1, resolucao='1d').all()
+            self.assertEqual(len(diarios), antes)
+            self.assertEqual(sum(d.contagem for d in diarios), 360)
+
+
+if __name__ == '__main__':
+    unittest.main()
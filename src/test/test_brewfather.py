@@ -0,0 +1,259 @@
+"""
+Testes da sincronização com o BrewFather (API simulada, sem rede)
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from model.brewfather import BrewFatherAPI, BrewFatherService, BrewFatherRecipe, BrewFatherInventory, LimitadorTaxa
+from utils.cache_respostas import CacheRespostas
+
+
+class APIFalsa(BrewFatherAPI):
+    """Responde como a API do BrewFather a partir de listas em memória"""
+
+    def __init__(self, receitas=(), lotes=(), estoque=(), latencia=0.0):
+        super().__init__('usuario', 'chave')
+        self.receitas = {receita['_id']: receita for receita in receitas}
+        self.listas = {
+            'batches': list(lotes),
+            'inventory': list(estoque),
+        }
+        self.latencia = latencia
+        self.falhas = set()
+        self.chamadas = []
+
+    def _pagina(self, itens, params):
+        """Página ordenada por _id a partir de start_after, como na API"""
+        itens = sorted(itens, key=lambda item: item['_id'])
+        inicio = 0
+        if params.get('start_after'):
+            inicio = [item['_id'] for item in itens].index(params['start_after']) + 1
+        return itens[inicio:inicio + params.get('limit', 10)]
+
+    def _make_request(self, endpoint, params=None):
+        params = dict(params or {})
+        self.chamadas.append((endpoint, params))
+        if endpoint == 'recipes' and 'recipes' not in self.falhas:
+            resumos = [{'_id': r['_id'], 'name': r['name'], '_timestamp_ms': r.get('_timestamp_ms')}
+                       for r in self.receitas.values()]
+            return self._pagina(resumos, params)
+        if endpoint in self.listas:
+            return self._pagina(self.listas[endpoint], params)
+        if endpoint.startswith('recipes/'):
+            time.sleep(self.latencia)
+            return self.receitas.get(endpoint.split('/', 1)[1])
+        return None
+
+
+def receita(i):
+    return {'_id': f'r{i:03d}', 'name': f'Receita {i}', 'style': {'name': 'APA'}, 'og': 1.050, 'fg': 1.010,
+            'fermentables': [{'name': 'Pilsen'}], 'hops': [], 'yeasts': [], 'miscs': []}
+
+
+class RespostaFalsa:
+    def __init__(self, status_code, corpo=None, headers=None):
+        self.status_code = status_code
+        self.corpo = corpo
+        self.headers = headers or {}
+
+    def json(self):
+        return self.corpo
+
+    def raise_for_status(self):
+        pass
+
+
+class SessaoFalsa:
+    """Servidor com ETag por endpoint: responde 304 quando If-None-Match confere"""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.requisicoes = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        endpoint = url.rsplit('/v2/', 1)[1]
+        self.requisicoes.append((endpoint, dict(headers or {})))
+        etag = f'"{endpoint}-v1"'
+        if (headers or {}).get('If-None-Match') == etag:
+            return RespostaFalsa(304)
+        return RespostaFalsa(200, self.respostas[endpoint], {'ETag': etag})
+
+
+class TestBrewFather(unittest.TestCase):
+
+    def setUp(self):
+        self.app = criar_app_teste()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _sincronizar(self, api, metodo='sync_recipes'):
+        with self.app.app_context(), patch.object(BrewFatherService, 'get_api_client', return_value=api):
+            return getattr(BrewFatherService, metodo)()
+
+    def test_detalhes_em_paralelo(self):
+        api = APIFalsa([receita(i) for i in range(8)], latencia=0.2)
+        inicio = time.perf_counter()
+        resultado = self._sincronizar(api)
+        # Sequencial levaria 8 x 0,2 s
+        self.assertLess(time.perf_counter() - inicio, 1.0)
+        self.assertEqual(resultado['count'], 8)
+        with self.app.app_context():
+            self.assertEqual(BrewFatherRecipe.query.count(), 8)
+            self.assertEqual(BrewFatherRecipe.query.filter_by(brewfather_id='r003').first().style, 'APA')
+
+    def test_todas_as_paginas(self):
+        api = APIFalsa([receita(i) for i in range(120)])
+        resultado = self._sincronizar(api)
+        self.assertEqual(resultado['count'], 120)
+        self.assertEqual(resultado['progress'], {'pages': 3, 'fetched': 120})
+        paginas = [params for endpoint, params in api.chamadas if endpoint == 'recipes']
+        self.assertEqual([p.get('start_after') for p in paginas], [None, 'r049', 'r099'])
+
+        estoque = [{'_id': f'i{i:03d}', 'name': f'Item {i}', 'type': 'hop'} for i in range(50)]
+        resultado = self._sincronizar(APIFalsa(estoque=estoque), 'sync_inventory')
+        # Página cheia: a segunda, vazia, encerra a paginação
+        self.assertEqual(resultado['progress'], {'pages': 2, 'fetched': 50})
+        with self.app.app_context():
+            self.assertEqual(BrewFatherInventory.query.count(), 50)
+
+    def test_falha_de_pagina(self):
+        api = APIFalsa([receita(i) for i in range(60)])
+        api.falhas.add('recipes')
+        resultado = self._sincronizar(api)
+        self.assertFalse(resultado['success'])
+        self.assertIn('Nenhum dado recebido', resultado['error'])
+
+    def _detalhes_buscados(self, api):
+        return sum(1 for endpoint, _ in api.chamadas if endpoint.startswith('recipes/'))
+
+    def test_sincronizacao_incremental(self):
+        receitas = [receita(i) for i in range(5)]
+        lotes = [{'_id': f'b{i}', 'recipe': {'name': 'APA'}, 'status': 'Completed'} for i in range(3)]
+        api = APIFalsa(receitas, lotes=lotes)
+        self.assertEqual(self._sincronizar(api)['count'], 5)
+        self.assertEqual(self._sincronizar(api, 'sync_batches')['count'], 3)
+
+        # Nada mudou: nenhum detalhe buscado e nada gravado
+        api.chamadas.clear()
+        resultado = self._sincronizar(api)
+        self.assertEqual((resultado['count'], resultado['unchanged']), (0, 5))
+        self.assertEqual(self._detalhes_buscados(api), 0)
+        resultado = self._sincronizar(api, 'sync_batches')
+        self.assertEqual((resultado['count'], resultado['unchanged']), (0, 3))
+
+        # Receita editada (resumo com novo _timestamp_ms) e lote com novo status
+        api.receitas['r002']['_timestamp_ms'] = 1700000000000
+        api.receitas['r002']['og'] = 1.060
+        api.listas['batches'][1]['status'] = 'Fermenting'
+        api.chamadas.clear()
+        resultado = self._sincronizar(api)
+        self.assertEqual((resultado['count'], resultado['unchanged']), (1, 4))
+        self.assertEqual(self._detalhes_buscados(api), 1)
+        resultado = self._sincronizar(api, 'sync_batches')
+        self.assertEqual((resultado['count'], resultado['unchanged']), (1, 2))
+        with self.app.app_context():
+            self.assertEqual(BrewFatherRecipe.query.filter_by(brewfather_id='r002').first().original_gravity, 1.060)
+
+        # force=True regrava tudo
+        with self.app.app_context(), patch.object(BrewFatherService, 'get_api_client', return_value=api):
+            self.assertEqual(BrewFatherService.sync_recipes(force=True)['count'], 5)
+
+    def test_upsert_em_lotes(self):
+        estoque = [{'_id': f'i{i:03d}', 'name': f'Item {i}', 'type': 'hop', 'quantity': i} for i in range(7)]
+        api = APIFalsa(estoque=estoque)
+        self.assertEqual(self._sincronizar(api, 'sync_inventory')['count'], 7)
+
+        for item in estoque:
+            item['quantity'] += 100
+        comandos = []
+        with self.app.app_context():
+            def registrar(conn, cursor, statement, parameters, context, executemany):
+                if 'brewfather_inventory' in statement:
+                    comandos.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', registrar)
+            try:
+                with patch('model.brewfather.TAMANHO_LOTE_UPSERT', 3):
+                    resultado = self._sincronizar(api, 'sync_inventory')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', registrar)
+
+            self.assertEqual(resultado['count'], 7)
+            # Uma consulta dos ids existentes e um upsert por lote de 3 (3 + 3 + 1), sem SELECT por item
+            self.assertEqual(len(comandos), 4)
+            self.assertEqual(BrewFatherInventory.query.count(), 7)
+            self.assertEqual(BrewFatherInventory.query.filter_by(brewfather_id='i005').first().quantity, 105)
+
+    def test_cache_de_respostas(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio)
+        sessao = SessaoFalsa({
+            'recipes/r001': receita(1),
+            'inventory': [{'_id': 'i1', 'type': 'hop'}, {'_id': 'i2', 'type': 'fermentable'},
+                          {'_id': 'i3', 'type': 'hop'}],
+        })
+        cache = CacheRespostas(diretorio, ttl=60)
+        api = BrewFatherAPI('usuario', 'chave', cache=cache)
+        api._get_session = lambda: sessao
+
+        self.assertEqual(api.get_recipe('r001')['name'], 'Receita 1')
+        # Dentro da validade: nem chega à API
+        self.assertEqual(api.get_recipe('r001')['name'], 'Receita 1')
+        self.assertEqual(len(sessao.requisicoes), 1)
+
+        # Vencida: revalida com o ETag e reaproveita o corpo no 304
+        cache.ttl = 0
+        self.assertEqual(api.get_recipe('r001')['name'], 'Receita 1')
+        self.assertEqual(sessao.requisicoes[-1], ('recipes/r001', {'If-None-Match': '"recipes/r001-v1"'}))
+
+        # Os filtros por tipo compartilham uma leitura do estoque
+        cache.ttl = 60
+        self.assertEqual([i['_id'] for i in api.get_hops()], ['i1', 'i3'])
+        self.assertEqual([i['_id'] for i in api.get_fermentables()], ['i2'])
+        self.assertEqual(api.get_yeasts(), [])
+        outro = BrewFatherAPI('usuario', 'chave', cache=cache)
+        outro._get_session = lambda: sessao
+        self.assertEqual(len(outro.get_hops()), 2)
+        self.assertEqual(sum(1 for endpoint, _ in sessao.requisicoes if endpoint == 'inventory'), 1)
+
+    def test_cache_lru(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio)
+        cache = CacheRespostas(diretorio, max_bytes=10000)
+        corpo = ['x' * 2000]
+        for nome in ('a', 'b', 'c', 'd'):
+            cache.gravar(nome, corpo)
+            time.sleep(0.01)
+        cache.obter('a')
+        cache.gravar('e', corpo)
+
+        # 'b' era a menos usada ('a' acabou de ser lida)
+        self.assertIsNone(cache.obter('b'))
+        self.assertIsNotNone(cache.obter('a'))
+        self.assertIsNotNone(cache.obter('e'))
+        self.assertLessEqual(cache.tamanho(), 10000)
+
+    def test_limitador_taxa(self):
+        limitador = LimitadorTaxa(taxa=20, capacidade=1)
+        inicio = time.perf_counter()
+        for _ in range(5):
+            limitador.adquirir()
+        # O primeiro token já está no balde; os outros 4 chegam a cada 50 ms
+        self.assertGreaterEqual(time.perf_counter() - inicio, 0.18)
+
+
+if __name__ == '__main__':
+    unittest.main()
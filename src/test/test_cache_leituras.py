@@ -0,0 +1,122 @@
+"""
+Testes do cache de últimas leituras e do endpoint /dispositivos/live
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.cache_leituras import cache_leituras
+from model.dispositivos import Dispositivo, ExclusaoDispositivo, TipoDispositivo, ProtocoloComunicacao
+
+
+class TestCacheLeituras(unittest.TestCase):
+    """Testes para o cache em memória e o write-behind"""
+
+    def setUp(self):
+        cache_leituras.limpar()
+        cache_leituras.configurar(0)
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10'
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        cache_leituras.limpar()
+        cache_leituras.configurar(0)
+        with self.app.app_context():
+            db.drop_all()
+
+    def _enviar(self, leituras):
+        return self.client.post(
+            f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': leituras}
+        )
+
+    def test_live_retorna_leitura_mais_recente(self):
+        """O endpoint live reflete a leitura mais recente e ignora leituras atrasadas"""
+        self._enviar([
+            {'timestamp': '2024-05-01T10:00:00', 'dados': {'gravity': 1.050}},
+            {'timestamp': '2024-05-01T10:01:00', 'dados': {'gravity': 1.049}},
+        ])
+        self._enviar([{'timestamp': '2024-05-01T09:00:00', 'dados': {'gravity': 1.060}}])
+
+        response = self.client.get('/api/dispositivos/live')
+        self.assertEqual(response.status_code, 200)
+        entradas = response.get_json()
+        self.assertEqual(len(entradas), 1)
+        self.assertEqual(entradas[0]['id'], self.dispositivo_id)
+        self.assertEqual(entradas[0]['ultimo_valor_recebido'], {'gravity': 1.049})
+        self.assertEqual(entradas[0]['ultima_comunicacao'], '2024-05-01T10:01:00')
+
+    def test_carga_ignora_dispositivos_em_exclusao(self):
+        """Depois de reiniciar, o cache não traz de volta dispositivos com exclusão agendada"""
+        with self.app.app_context():
+            db.session.add(ExclusaoDispositivo(dispositivo_id=self.dispositivo_id, nome='iSpindel-01'))
+            db.session.commit()
+
+        cache_leituras.limpar()
+        self.assertEqual(self.client.get('/api/dispositivos/live').get_json(), [])
+
+    def test_write_behind_persiste_em_lote(self):
+        """Com write-behind, o banco só é atualizado ao persistir os pendentes"""
+        cache_leituras.configurar(60)
+        self._enviar([{'timestamp': '2024-05-01T10:00:00', 'dados': {'gravity': 1.050}}])
+
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(Dispositivo, self.dispositivo_id).ultima_comunicacao)
+
+        # A listagem já mostra o valor do cache
+        dispositivos = self.client.get('/api/dispositivos').get_json()
+        self.assertEqual(dispositivos[0]['ultimo_valor_recebido'], {'gravity': 1.050})
+
+        with self.app.app_context():
+            self.assertEqual(cache_leituras.persistir_pendentes(), 1)
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            self.assertEqual(dispositivo.ultimo_valor_recebido, {'gravity': 1.050})
+            self.assertEqual(dispositivo.ultima_comunicacao.isoformat(), '2024-05-01T10:00:00')
+            self.assertEqual(cache_leituras.persistir_pendentes(), 0)
+
+    def test_status_passa_pelo_cache(self):
+        """Mudança de status mostra o valor e o horário novos; com write-behind só o status vai ao banco"""
+        cache_leituras.configurar(60)
+        self._enviar([{'timestamp': '2024-05-01T10:00:00', 'dados': {'gravity': 1.050}}])
+
+        response = self.client.post(f'/api/dispositivos/{self.dispositivo_id}/status',
+                                    json={'status': 'conectado', 'dados_recebidos': {'gravity': 1.048}})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['dispositivo']['ultimo_valor_recebido'], {'gravity': 1.048})
+
+        dispositivo = self.client.get('/api/dispositivos').get_json()[0]
+        self.assertEqual(dispositivo['status'], 'conectado')
+        self.assertEqual(dispositivo['ultimo_valor_recebido'], {'gravity': 1.048})
+        self.assertGreater(dispositivo['ultima_comunicacao'], '2024-05-01T10:00:00')
+
+        with self.app.app_context():
+            registro = db.session.get(Dispositivo, self.dispositivo_id)
+            self.assertEqual(registro.status.value, 'conectado')
+            self.assertIsNone(registro.ultimo_valor_recebido)
+            cache_leituras.persistir_pendentes()
+            db.session.expire_all()
+            self.assertEqual(db.session.get(Dispositivo, self.dispositivo_id).ultimo_valor_recebido, {'gravity': 1.048})
+
+        # Sem novos dados, o último valor conhecido continua no cache
+        self.client.post(f'/api/dispositivos/{self.dispositivo_id}/status', json={'status': 'ativo'})
+        dispositivo = self.client.get('/api/dispositivos').get_json()[0]
+        self.assertEqual((dispositivo['status'], dispositivo['ultimo_valor_recebido']), ('ativo', {'gravity': 1.048}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Testes do mapeamento de campos de dados na ingestão
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.campos_leitura import HistoricoCampo, registro_campos
+from model.config import Configuracao
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+
+
+class TestCamposLeitura(unittest.TestCase):
+    """Testes para a extração de campos por tipo de dispositivo"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10'
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.dispositivo_id = dispositivo.id
+            registro_campos.recarregar()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _enviar(self, leituras):
+        return self.client.post(
+            f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': leituras}
+        )
+
+    def test_extrai_colunas_e_campos(self):
+        """Chaves conhecidas viram colunas tipadas ou linhas de historico_campos"""
+        self._enviar([
+            {'timestamp': '2024-05-01T10:00:00', 'dados': {'angle': 50.0, 'gravity': 1.050, 'RSSI': -70}},
+            {'timestamp': '2024-05-01T10:01:00', 'gravidade': 1.048, 'dados': {'angle': 48.0, 'gravity': 1.049}},
+        ])
+
+        with self.app.app_context():
+            registros = HistoricoDispositivo.query.order_by(HistoricoDispositivo.timestamp).all()
+            self.assertEqual(registros[0].gravidade, 1.050)
+            self.assertEqual(registros[0].qualidade_sinal, -70)
+            # Valor explícito da leitura tem precedência sobre dados
+            self.assertEqual(registros[1].gravidade, 1.048)
+            self.assertEqual(registros[0].dados['angle'], 50.0)
+            self.assertEqual(HistoricoCampo.query.count(), 2)
+
+        response = self.client.get(f'/api/dispositivos/{self.dispositivo_id}/campos/angulo')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([r['valor'] for r in data['registros']], [50.0, 48.0])
+        self.assertEqual(data['estatisticas']['media'], 49.0)
+
+        response = self.client.get(f'/api/dispositivos/{self.dispositivo_id}/campos')
+        self.assertEqual(response.get_json()['campos'], ['angulo'])
+
+    def test_mapeamento_personalizado_e_dados_restantes(self):
+        """Configuração acrescenta chaves e pode reduzir dados às chaves não mapeadas"""
+        with self.app.app_context():
+            Configuracao.set_config('MAPEAMENTO_CAMPOS_DISPOSITIVOS', {'ispindel': {'heater': 'ciclo_aquecedor'}}, tipo='json')
+            Configuracao.set_config('INGESTAO_DADOS_MODO', 'restante')
+            registro_campos.recarregar()
+
+        self._enviar([{'timestamp': '2024-05-01T10:00:00', 'dados': {'heater': 30, 'gravity': 1.050, 'name': 'x'}}])
+
+        with self.app.app_context():
+            registro = HistoricoDispositivo.query.one()
+            self.assertEqual(registro.dados, {'name': 'x'})
+            self.assertEqual(registro.gravidade, 1.050)
+            self.assertEqual(HistoricoCampo.query.one().campo, 'ciclo_aquecedor')
+            Configuracao.set_config('INGESTAO_DADOS_MODO', 'completo')
+            registro_campos.recarregar()
+
+
+if __name__ == '__main__':
+    unittest.main()
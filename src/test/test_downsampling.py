@@ -0,0 +1,52 @@
+"""
+Testes da redução de pontos de séries temporais
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.downsampling import lttb, envelope_min_max, reduzir_serie
+
+
+class TestDownsampling(unittest.TestCase):
+    """Testes para LTTB e envelope min/max"""
+
+    def setUp(self):
+        self.x = np.arange(10000, dtype=float)
+        # Queda de gravidade com um pico isolado de temperatura no meio
+        self.y = 1.050 - 0.040 * (1 - np.exp(-self.x / 2000))
+        self.y[5003] = 1.080
+
+    def test_lttb_preserva_extremos(self):
+        indices = lttb(self.x, self.y, 500)
+        self.assertEqual(len(indices), 500)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9999)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(5003, indices)
+
+    def test_envelope_min_max(self):
+        indices = envelope_min_max(self.y, 500)
+        self.assertLessEqual(len(indices), 502)
+        self.assertIn(5003, indices)
+        self.assertIn(9999, indices)
+
+    def test_serie_pequena_sem_reducao(self):
+        y = np.array([1.0, np.nan, 3.0])
+        self.assertEqual(reduzir_serie(np.arange(3.0), y, 100).tolist(), [0, 2])
+
+    def test_ignora_ausentes(self):
+        y = self.y.copy()
+        y[::2] = np.nan
+        indices = reduzir_serie(self.x, y, 200)
+        self.assertEqual(len(indices), 200)
+        self.assertFalse(np.any(np.isnan(y[indices])))
+
+
+if __name__ == '__main__':
+    unittest.main()
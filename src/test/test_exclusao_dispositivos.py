@@ -0,0 +1,106 @@
+"""
+Testes da exclusão de dispositivos em segundo plano
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.cache_leituras import cache_leituras
+from model.campos_leitura import HistoricoCampo
+from model.dispositivos import Dispositivo, HistoricoDispositivo, ExclusaoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.exclusao_dispositivos import ExpurgoDispositivos, expurgo_dispositivos
+
+INICIO = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class TestExclusaoDispositivos(unittest.TestCase):
+
+    def setUp(self):
+        cache_leituras.limpar()
+        # Banco em arquivo: a thread do expurgo usa outra conexão, como em produção
+        # (o SQLite em memória compartilha uma conexão entre as threads)
+        descritor, self.arquivo = tempfile.mkstemp(suffix='.db')
+        os.close(descritor)
+        self.app = criar_app_teste([dispositivos_bp], uri=f'sqlite:///{self.arquivo}')
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            ids = []
+            for nome in ('iSpindel-01', 'iSpindel-02'):
+                dispositivo = Dispositivo(
+                    nome=nome, tipo=TipoDispositivo.ISPINDEL,
+                    protocolo=ProtocoloComunicacao.HTTP, endereco='192.168.0.50'
+                )
+                db.session.add(dispositivo)
+                db.session.commit()
+                ids.append(dispositivo.id)
+        self.alvo, self.outro = ids
+        for dispositivo_id in ids:
+            self._enviar(dispositivo_id, 30)
+
+    def tearDown(self):
+        cache_leituras.limpar()
+        expurgo_dispositivos.aguardar(10)
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        os.remove(self.arquivo)
+
+    def _enviar(self, dispositivo_id, quantidade):
+        leituras = [
+            {'timestamp': (INICIO + timedelta(minutes=i)).isoformat(), 'gravidade': 1.040, 'dados': {'angle': 40}}
+            for i in range(quantidade)
+        ]
+        return self.client.post(f'/api/dispositivos/{dispositivo_id}/historico/lote', json={'leituras': leituras})
+
+    def _contar(self, modelo, dispositivo_id):
+        with self.app.app_context():
+            return modelo.query.filter_by(dispositivo_id=dispositivo_id).count()
+
+    def test_tombstone_oculta_e_bloqueia_ingestao(self):
+        with self.app.app_context():
+            ExpurgoDispositivos().agendar(db.session.get(Dispositivo, self.alvo))
+
+        ids = [d['id'] for d in self.client.get('/api/dispositivos').get_json()]
+        self.assertEqual(ids, [self.outro])
+        self.assertEqual(self.client.get(f'/api/dispositivos/{self.alvo}').status_code, 404)
+        self.assertEqual(self._enviar(self.alvo, 1).get_json()['aceitos'], 0)
+        self.assertEqual(self._enviar(self.outro, 1).get_json()['aceitos'], 1)
+
+    def test_expurgo_em_blocos(self):
+        expurgo = ExpurgoDispositivos(tamanho_bloco=7, pausa=0)
+        with self.app.app_context():
+            exclusao = expurgo.agendar(db.session.get(Dispositivo, self.alvo))
+            total = self._contar(HistoricoDispositivo, self.alvo) + self._contar(HistoricoCampo, self.alvo)
+            exclusao = expurgo.processar(exclusao.id)
+            self.assertEqual(exclusao.status, ExclusaoDispositivo.CONCLUIDA)
+            self.assertGreaterEqual(exclusao.removidas, total)
+            self.assertEqual(exclusao.to_dict()['progresso'], 100.0)
+            self.assertIsNone(db.session.get(Dispositivo, self.alvo))
+            # Já concluída: não é reprocessada
+            self.assertIsNone(expurgo.processar(exclusao.id, retomar=True))
+
+        self.assertEqual(self._contar(HistoricoDispositivo, self.alvo), 0)
+        self.assertEqual(self._contar(HistoricoCampo, self.alvo), 0)
+        self.assertEqual(self._contar(HistoricoDispositivo, self.outro), 30)
+
+    def test_delete_retorna_na_hora(self):
+        response = self.client.delete(f'/api/dispositivos/{self.alvo}')
+        self.assertEqual(response.status_code, 202)
+        exclusao_id = response.get_json()['exclusao']['id']
+
+        expurgo_dispositivos.aguardar(10)
+        exclusao = self.client.get(f'/api/dispositivos/exclusoes/{exclusao_id}').get_json()
+        self.assertEqual(exclusao['status'], ExclusaoDispositivo.CONCLUIDA)
+        self.assertEqual(self._contar(HistoricoDispositivo, self.alvo), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
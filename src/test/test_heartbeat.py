@@ -0,0 +1,135 @@
+"""
+Testes da detecção de dispositivos offline (heartbeat)
+"""
+
+import unittest
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.cache_leituras import cache_leituras
+from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao, StatusDispositivo
+from model.heartbeat import RodaTempo, monitor_heartbeat
+from model.notification import Notification
+from model.user import User
+
+
+class TestRodaTempo(unittest.TestCase):
+
+    def test_rearmar_e_vencer(self):
+        roda = RodaTempo(slots=8, tick=1.0)
+        roda.armar('a', 105)
+        roda.armar('b', 103)
+        self.assertEqual(roda.avancar(100), [])
+        roda.armar('b', 110)  # Rearmado antes de vencer
+        self.assertEqual(roda.avancar(106), ['a'])
+        self.assertNotIn('a', roda)
+        # Prazo além de uma volta da roda e atraso maior que a roda
+        roda.armar('c', 130)
+        self.assertEqual(sorted(roda.avancar(125)), ['b'])
+        self.assertEqual(roda.avancar(200), ['c'])
+        self.assertEqual(len(roda), 0)
+
+
+class TestMonitorHeartbeat(unittest.TestCase):
+
+    def setUp(self):
+        monitor_heartbeat.parar()
+        monitor_heartbeat.limpar()
+        monitor_heartbeat.configurar(fator=3, margem=10, intervalo_persistencia=5)
+        cache_leituras.limpar()
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            usuario = User(username='cervejeiro', email='c@exemplo.com', password_hash='x')
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.30',
+                intervalo_atualizacao=30,
+                status=StatusDispositivo.CONECTADO,
+                created_by='cervejeiro'
+            )
+            db.session.add_all([usuario, dispositivo])
+            db.session.commit()
+            self.user_id = usuario.id
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        monitor_heartbeat.parar()
+        monitor_heartbeat.limpar()
+        cache_leituras.limpar()
+        with self.app.app_context():
+            db.drop_all()
+
+    def _enviar(self):
+        leituras = [{'timestamp': datetime.now().isoformat(), 'gravidade': 1.040, 'dados': {}}]
+        self.client.post(f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': leituras})
+
+    def _status(self):
+        with self.app.app_context():
+            return db.session.get(Dispositivo, self.dispositivo_id).status
+
+    def test_desconecta_e_reconecta(self):
+        self._enviar()
+        agora = time.time()
+        with self.app.app_context(), patch.object(cache_leituras, 'todos', side_effect=AssertionError('varredura do cache')):
+            self.assertEqual(monitor_heartbeat.verificar(agora + 60), [])
+            # Sem leituras além de 3 x 30 s + 10 s; só os vencidos são consultados no cache
+            self.assertEqual(monitor_heartbeat.verificar(agora + 120), [self.dispositivo_id])
+            self.assertEqual(monitor_heartbeat.persistir(), 1)
+        self.assertEqual(self._status(), StatusDispositivo.DESCONECTADO)
+        with self.app.app_context():
+            notificacoes = Notification.query.filter_by(user_id=self.user_id).all()
+        self.assertEqual(len(notificacoes), 1)
+        self.assertEqual(notificacoes[0].title, 'Dispositivo desconectado')
+
+        self._enviar()
+        with self.app.app_context():
+            self.assertEqual(monitor_heartbeat.persistir(), 1)
+        self.assertEqual(self._status(), StatusDispositivo.CONECTADO)
+
+    def test_comunicacao_de_outro_processo_rearma(self):
+        """Prazo vencido na roda, mas o banco tem comunicação recente"""
+        agora = time.time()
+        with self.app.app_context():
+            monitor_heartbeat.roda.armar(self.dispositivo_id, agora)
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            dispositivo.ultima_comunicacao = datetime.fromtimestamp(agora) - timedelta(seconds=20)
+            db.session.commit()
+            self.assertEqual(monitor_heartbeat.verificar(agora + 1), [])
+            self.assertIn(self.dispositivo_id, monitor_heartbeat.roda)
+            self.assertEqual(monitor_heartbeat.persistir(), 0)
+
+    def test_reconecta_por_leitura_de_worker(self):
+        """Leitura gravada por outro processo tira o dispositivo de DESCONECTADO"""
+        agora = time.time()
+        with self.app.app_context():
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            dispositivo.status = StatusDispositivo.DESCONECTADO
+            dispositivo.ultima_comunicacao = datetime.fromtimestamp(agora) - timedelta(hours=1)
+            db.session.commit()
+
+            self.assertEqual(monitor_heartbeat.armar_do_banco(agora), 1)
+            self.assertEqual(monitor_heartbeat.verificar(agora + 31), [])
+            self.assertEqual(monitor_heartbeat.persistir(), 0)
+
+            # O worker grava a leitura (e ultima_comunicacao) na própria transação
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            dispositivo.ultima_comunicacao = datetime.fromtimestamp(agora + 40)
+            db.session.commit()
+            monitor_heartbeat.verificar(agora + 62)
+            self.assertEqual(monitor_heartbeat.persistir(), 1)
+        self.assertEqual(self._status(), StatusDispositivo.CONECTADO)
+
+
+if __name__ == '__main__':
+    unittest.main()
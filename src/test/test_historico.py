@@ -0,0 +1,301 @@
+"""
+Testes das consultas de histórico de dispositivos
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.ingestao import IngestaoService
+
+
+class TestHistoricoPaginado(unittest.TestCase):
+    """Testes para a paginação por cursor do histórico"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        self.inicio = datetime(2025, 1, 1)
+        with self.app.app_context():
+            db.session.add(Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10'
+            ))
+            db.session.commit()
+            # Duas leituras por timestamp para exercitar o desempate pelo id
+            IngestaoService.ingerir_lote([
+                {'dispositivo_id': 1, 'dados': {'i': i}, 'temperatura': 20 + i,
+                 'timestamp': self.inicio + timedelta(minutes=i // 2)}
+                for i in range(25)
+            ])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _paginar(self, url):
+        ids = []
+        cursor = ''
+        while cursor is not None:
+            body = self.client.get(f'{url}&after={cursor}').get_json()
+            ids.extend(r['dados']['i'] for r in body['registros'])
+            cursor = body['proximo_cursor']
+        return ids
+
+    def test_paginas_cobrem_todo_historico(self):
+        ids = self._paginar('/api/dispositivos/1/historico?limite=10')
+        self.assertEqual(ids, list(range(25)))
+
+    def test_paginas_ordem_decrescente(self):
+        ids = self._paginar('/api/dispositivos/1/historico?limite=7&ordem=desc')
+        self.assertEqual(ids, list(reversed(range(25))))
+
+    def test_paginas_com_periodo(self):
+        fim = (self.inicio + timedelta(minutes=4)).isoformat()
+        ids = self._paginar(f'/api/dispositivos/1/historico?limite=3&fim={fim}')
+        self.assertEqual(ids, list(range(10)))
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/dispositivos/1/historico?after=abc')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestHistoricoAgregado(unittest.TestCase):
+    """Testes para os agregados mantidos na ingestão"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.session.add(Dispositivo(
+                nome='Fermentador-01',
+                tipo=TipoDispositivo.SENSOR_TEMPERATURA,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.11'
+            ))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _ingerir(self, inicio, temperaturas, passo=timedelta(seconds=20)):
+        with self.app.app_context():
+            IngestaoService.ingerir_lote([
+                {'dispositivo_id': 1, 'dados': {}, 'temperatura': t, 'timestamp': inicio + passo * i}
+                for i, t in enumerate(temperaturas)
+            ])
+
+    def test_agregados_incrementais(self):
+        """Dois lotes no mesmo intervalo são mesclados"""
+        inicio = datetime(2025, 1, 1, 10, 0)
+        self._ingerir(inicio, [18.0, 20.0])
+        self._ingerir(inicio + timedelta(seconds=40), [16.0])
+        self.client.post('/api/dispositivos/1/historico', json={
+            'dados': {}, 'gravidade': 1.050, 'timestamp': '2025-01-01T10:00:50'
+        })
+
+        body = self.client.get('/api/dispositivos/1/historico?resolucao=1m').get_json()
+        self.assertEqual(body['resolucao'], '1m')
+        self.assertEqual(len(body['registros']), 1)
+
+        agregado = body['registros'][0]
+        self.assertEqual(agregado['contagem'], 4)
+        self.assertEqual(agregado['temperatura']['min'], 16.0)
+        self.assertEqual(agregado['temperatura']['max'], 20.0)
+        self.assertAlmostEqual(agregado['temperatura']['media'], 18.0)
+        self.assertEqual(agregado['temperatura']['ultimo'], 16.0)
+        self.assertEqual(agregado['gravidade']['ultimo'], 1.050)
+
+    def test_resolucao_automatica(self):
+        """Períodos longos usam a tabela agregada"""
+        inicio = datetime(2025, 1, 1)
+        self._ingerir(inicio, [20.0] * 48, passo=timedelta(hours=1))
+
+        fim = (inicio + timedelta(days=14)).isoformat()
+        url = f'/api/dispositivos/1/historico?resolucao=auto&inicio={inicio.isoformat()}&fim={fim}&max_pontos=500'
+        body = self.client.get(url).get_json()
+        self.assertEqual(body['resolucao'], '1h')
+        self.assertEqual(len(body['registros']), 48)
+
+    def test_reconstruir(self):
+        """Reconstrução reproduz os agregados incrementais"""
+        inicio = datetime(2025, 1, 1, 10, 0)
+        self._ingerir(inicio, [18.0, 19.0, 21.0], passo=timedelta(minutes=30))
+        antes = self.client.get('/api/dispositivos/1/historico?resolucao=1h').get_json()
+
+        response = self.client.post('/api/dispositivos/1/historico/agregados/reconstruir')
+        self.assertEqual(response.get_json()['leituras_processadas'], 3)
+
+        depois = self.client.get('/api/dispositivos/1/historico?resolucao=1h').get_json()
+        self.assertEqual(antes, depois)
+
+    def test_exclusao_recalcula_intervalo(self):
+        """Remover uma leitura atualiza os intervalos 1m/1h/1d que a continham"""
+        inicio = datetime(2025, 1, 1, 10, 0)
+        self._ingerir(inicio, [18.0, 19.0, 21.0], passo=timedelta(minutes=30))
+        self._ingerir(inicio + timedelta(days=1), [15.0])
+        with self.app.app_context():
+            ultima_id = HistoricoDispositivo.query.filter_by(temperatura=21.0).one().id
+
+        response = self.client.delete(f'/api/dispositivos/1/historico/{ultima_id}')
+        self.assertEqual(response.status_code, 200)
+
+        diario = self.client.get('/api/dispositivos/1/historico?resolucao=1d').get_json()['registros']
+        self.assertEqual([(d['contagem'], d['temperatura']['max'], d['temperatura']['ultimo']) for d in diario],
+                         [(1, 15.0, 15.0), (2, 19.0, 19.0)])
+        horario = self.client.get('/api/dispositivos/1/historico?resolucao=1h').get_json()['registros']
+        self.assertEqual([h['contagem'] for h in horario], [1, 2])
+        self.assertEqual(len(self.client.get('/api/dispositivos/1/historico?resolucao=1m').get_json()['registros']), 3)
+
+
+class TestHistoricoReduzido(unittest.TestCase):
+    """Testes para o modo max_pontos do histórico"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.session.add(Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10'
+            ))
+            db.session.commit()
+            inicio = datetime(2025, 1, 1)
+            IngestaoService.ingerir_lote([
+                {'dispositivo_id': 1, 'dados': {}, 'gravidade': 1.050 - i * 0.00001,
+                 'temperatura': 30.0 if i == 1234 else 19.0, 'timestamp': inicio + timedelta(seconds=30 * i)}
+                for i in range(3000)
+            ])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_lttb(self):
+        body = self.client.get('/api/dispositivos/1/historico?max_pontos=100&series=temperatura,gravidade').get_json()
+        self.assertEqual(body['total_pontos'], 3000)
+        self.assertEqual(len(body['series']['gravidade']['valor']), 100)
+        self.assertIn(30.0, body['series']['temperatura']['valor'])
+        self.assertEqual(body['series']['gravidade']['timestamp'][0], '2025-01-01T00:00:00')
+
+    def test_serie_invalida(self):
+        response = self.client.get('/api/dispositivos/1/historico?max_pontos=100&series=dados')
+        self.assertEqual(response.status_code, 400)
+
+
+class TestExportacaoHistorico(unittest.TestCase):
+    """Testes para a exportação em streaming"""
+
+    def setUp(self):
+        from model.sessao_brasagem import SessaoBrasagem
+
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            sessao = SessaoBrasagem(nome='APA #12', data_inicio=datetime(2025, 1, 1, 0, 10))
+            db.session.add(sessao)
+            db.session.flush()
+            db.session.add(Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10',
+                sessao_brasagem_id=sessao.id
+            ))
+            db.session.commit()
+            IngestaoService.ingerir_lote([
+                {'dispositivo_id': 1, 'dados': {'angle': i}, 'gravidade': 1.050,
+                 'timestamp': datetime(2025, 1, 1) + timedelta(minutes=i)}
+                for i in range(2500)
+            ])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_ndjson(self):
+        import json
+
+        response = self.client.get('/api/dispositivos/1/historico/exportar?incluir_dados=true')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        linhas = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(linhas), 2500)
+        self.assertEqual(json.loads(linhas[-1])['dados'], {'angle': 2499})
+
+    def test_csv_gzip_sessao(self):
+        import gzip
+
+        response = self.client.get('/api/dispositivos/sessao/1/historico/exportar?formato=csv&gzip=true')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        linhas = gzip.decompress(response.get_data()).decode('utf-8').splitlines()
+        # Cabeçalho + leituras a partir do início da sessão
+        self.assertEqual(len(linhas), 1 + 2500 - 10)
+        self.assertTrue(linhas[0].startswith('id,dispositivo_id,timestamp'))
+
+
+class TestSeriesAlinhadas(unittest.TestCase):
+    """Testes para as séries de vários dispositivos em intervalos comuns"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        inicio = datetime(2025, 1, 1)
+        with self.app.app_context():
+            for nome in ('Fermentador', 'Câmara'):
+                db.session.add(Dispositivo(
+                    nome=nome,
+                    tipo=TipoDispositivo.SENSOR_TEMPERATURA,
+                    protocolo=ProtocoloComunicacao.HTTP,
+                    endereco='192.168.0.10'
+                ))
+            db.session.commit()
+            # Fermentador a cada 30 s; câmara só nos 2 primeiros minutos, em outros instantes
+            IngestaoService.ingerir_lote(
+                [{'dispositivo_id': 1, 'dados': {}, 'temperatura': 18.0 + i % 2,
+                  'timestamp': inicio + timedelta(seconds=30 * i)} for i in range(20)] +
+                [{'dispositivo_id': 2, 'dados': {}, 'temperatura': 10.0 + i,
+                  'timestamp': inicio + timedelta(seconds=45 + 60 * i)} for i in range(2)]
+            )
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def _url(self, extra=''):
+        return ('/api/dispositivos/historico/series?ids=1,2&series=temperatura&intervalo=1m'
+                '&inicio=2025-01-01T00:00:00&fim=2025-01-01T00:09:59' + extra)
+
+    def test_matriz_alinhada(self):
+        body = self.client.get(self._url()).get_json()
+        self.assertEqual(len(body['timestamps']), 10)
+        self.assertEqual(body['timestamps'][1], '2025-01-01T00:01:00')
+        self.assertEqual([c['nome'] for c in body['series']], ['Fermentador', 'Câmara'])
+        self.assertEqual(body['valores'][0], [18.5, 10.0])
+        self.assertEqual(body['valores'][1], [18.5, 11.0])
+        self.assertEqual(body['valores'][2], [18.5, None])
+
+    def test_preenchimento_anterior(self):
+        body = self.client.get(self._url('&preenchimento=anterior&preenchimento_max=3')).get_json()
+        camara = [linha[1] for linha in body['valores']]
+        self.assertEqual(camara, [10.0, 11.0, 11.0, 11.0, 11.0, None, None, None, None, None])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self._url('&preenchimento=linear')).status_code, 400)
+        self.assertEqual(self.client.get(self._url().replace('intervalo=1m', 'intervalo=1s')).status_code, 200)
+        self.assertEqual(self.client.get(self._url().replace('ids=1,2', 'ids=1,99')).status_code, 404)
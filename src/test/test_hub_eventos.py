@@ -0,0 +1,106 @@
+"""
+Testes do hub de eventos de dispositivos e do stream SSE
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.cache_leituras import cache_leituras
+from model.hub_eventos import (
+    HubEventos, hub_eventos, EVENTO_LEITURA,
+    POLITICA_DESCARTAR_NOVOS, POLITICA_DESCONECTAR
+)
+from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao
+
+
+class TestHubEventos(unittest.TestCase):
+    """Testes do fan-out e das políticas de buffer"""
+
+    def test_filtros_por_dispositivo_e_sessao(self):
+        """Cada assinante recebe apenas os eventos do seu filtro"""
+        hub = HubEventos()
+        todos = hub.assinar()
+        por_dispositivo = hub.assinar(dispositivo_ids=[2])
+        por_sessao = hub.assinar(sessao_id=7)
+
+        hub.publicar(EVENTO_LEITURA, {'gravidade': 1.050}, 1, 7)
+        hub.publicar(EVENTO_LEITURA, {'gravidade': 1.040}, 2, None)
+
+        self.assertEqual(len(todos.aguardar(0)), 2)
+        self.assertEqual([e['dispositivo_id'] for e in por_dispositivo.aguardar(0)], [2])
+        self.assertEqual([e['dispositivo_id'] for e in por_sessao.aguardar(0)], [1])
+
+    def test_politicas_de_buffer(self):
+        """Buffer cheio descarta antigos, novos ou desconecta, sem bloquear a publicação"""
+        hub = HubEventos()
+        antigos = hub.assinar(tamanho_buffer=2)
+        novos = hub.assinar(tamanho_buffer=2, politica=POLITICA_DESCARTAR_NOVOS)
+        desconectar = hub.assinar(tamanho_buffer=2, politica=POLITICA_DESCONECTAR)
+
+        for valor in range(4):
+            hub.publicar(EVENTO_LEITURA, {'valor': valor}, 1)
+
+        self.assertEqual([e['dados']['valor'] for e in antigos.aguardar(0)], [2, 3])
+        self.assertEqual([e['dados']['valor'] for e in novos.aguardar(0)], [0, 1])
+        self.assertEqual(antigos.descartados, 2)
+        self.assertTrue(desconectar.encerrada)
+
+        hub.cancelar(antigos)
+        self.assertEqual(hub.metricas()['assinantes'], 2)
+
+
+class TestStreamDispositivos(unittest.TestCase):
+    """Testes do endpoint /dispositivos/stream"""
+
+    def setUp(self):
+        cache_leituras.limpar()
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.10'
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        cache_leituras.limpar()
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_stream_recebe_leituras_ingeridas(self):
+        """Leituras gravadas após a conexão chegam como eventos SSE"""
+        response = self.client.get(f'/api/dispositivos/stream?dispositivo_id={self.dispositivo_id}', buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        self.client.post(f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': [
+            {'timestamp': '2024-05-01T10:00:00', 'gravidade': 1.050, 'dados': {'gravity': 1.050}}
+        ]})
+
+        blocos = response.response
+        self.assertEqual(next(blocos), b'retry: 3000\n\n')
+        evento = next(blocos).decode('utf-8')
+        self.assertIn('event: leitura', evento)
+        self.assertIn('"gravidade": 1.05', evento)
+
+        response.close()
+        self.assertEqual(hub_eventos.metricas()['assinantes'], 0)
+
+    def test_stream_politica_invalida(self):
+        response = self.client.get('/api/dispositivos/stream?politica=bloquear')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
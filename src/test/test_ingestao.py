@@ -0,0 +1,98 @@
+"""
+Testes da ingestão em lote de leituras de dispositivos
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+
+
+class TestIngestaoLote(unittest.TestCase):
+    """Testes para o endpoint de histórico em lote"""
+
+    def setUp(self):
+        self.app = criar_app_teste([dispositivos_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            for nome in ('iSpindel-01', 'Controlador-01'):
+                db.session.add(Dispositivo(
+                    nome=nome,
+                    tipo=TipoDispositivo.ISPINDEL,
+                    protocolo=ProtocoloComunicacao.HTTP,
+                    endereco='192.168.0.10'
+                ))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_lote_varios_dispositivos(self):
+        """Grava leituras de dois dispositivos e rejeita as inválidas"""
+        leituras = [
+            {'dispositivo_id': 1, 'dados': {'angle': 50}, 'gravidade': 1.050, 'timestamp': '2025-01-01T10:00:00'},
+            {'dispositivo_id': 1, 'dados': {'angle': 48}, 'gravidade': 1.048, 'timestamp': '2025-01-01T11:00:00'},
+            {'dispositivo_id': 2, 'dados': {'temp': 18.5}, 'temperatura': 18.5},
+            {'dispositivo_id': 99, 'dados': {}},
+            {'dispositivo_id': 1},
+            {'dispositivo_id': 1, 'dados': {}, 'temperatura': 'quente'},
+        ]
+
+        response = self.client.post('/api/dispositivos/historico/lote', json={'leituras': leituras})
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(body['aceitos'], 3)
+        self.assertEqual(body['rejeitados'], 3)
+        self.assertEqual([r['status'] for r in body['resultados']],
+                         ['aceito', 'aceito', 'aceito', 'rejeitado', 'rejeitado', 'rejeitado'])
+
+        with self.app.app_context():
+            self.assertEqual(HistoricoDispositivo.query.count(), 3)
+            dispositivo = db.session.get(Dispositivo, 1)
+            self.assertEqual(dispositivo.ultimo_valor_recebido, {'angle': 48})
+            self.assertEqual(dispositivo.ultima_comunicacao, datetime(2025, 1, 1, 11, 0))
+
+    def test_lote_por_dispositivo(self):
+        """Usa o dispositivo da URL quando a leitura não informa"""
+        response = self.client.post('/api/dispositivos/2/historico/lote', json=[
+            {'dados': {'temp': 20}, 'temperatura': 20, 'timestamp': 1735725600},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            self.assertEqual(HistoricoDispositivo.query.filter_by(dispositivo_id=2).count(), 1)
+
+    def test_valor_nao_finito_nao_derruba_o_lote(self):
+        """NaN/inf são rejeitados sem perder as demais leituras do lote"""
+        leituras = [
+            {'dispositivo_id': 1, 'dados': {}, 'temperatura': 19.0},
+            {'dispositivo_id': 1, 'dados': {}, 'temperatura': 'nan'},
+            {'dispositivo_id': 1, 'dados': {}, 'gravidade': float('inf')},
+            {'dispositivo_id': 2, 'dados': {}, 'temperatura': 20.0},
+        ]
+
+        response = self.client.post('/api/dispositivos/historico/lote', json={'leituras': leituras})
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in body['resultados']], ['aceito', 'rejeitado', 'rejeitado', 'aceito'])
+        with self.app.app_context():
+            self.assertEqual(sorted(h.temperatura for h in HistoricoDispositivo.query.all()), [19.0, 20.0])
+
+    def test_lote_vazio(self):
+        """Lista vazia é rejeitada"""
+        response = self.client.post('/api/dispositivos/historico/lote', json={'leituras': []})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Testes do receptor nativo do iSpindel e da calibração
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.ispindel_routes import ispindel_bp
+from model.agregados import HistoricoAgregado
+from model.arquivo_historico import RetencaoService, ler_periodo
+from model.cache_leituras import cache_leituras
+from model.config import Configuracao
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.resumo_sessao import ResumoSessao, ResumoSessaoService
+from model.sessao_brasagem import SessaoBrasagem
+from utils.calibracao import calcular_gravidade, plato_para_sg
+
+POLINOMIO = [0.000000887, -0.0000987, 0.00527, 0.8924]
+
+
+def payload(angulo, **extras):
+    dados = {
+        'name': 'iSpindel-01', 'ID': 1234567, 'angle': angulo, 'temperature': 68.0,
+        'temp_units': 'F', 'battery': 4.1, 'gravity': 1.999, 'interval': 900, 'RSSI': -70
+    }
+    dados.update(extras)
+    return dados
+
+
+class TestCalibracao(unittest.TestCase):
+
+    def test_polinomio_vetorizado(self):
+        angulos = np.array([25.0, 40.0, np.nan])
+        gravidades = calcular_gravidade({'polinomio': POLINOMIO}, angulos)
+        self.assertAlmostEqual(gravidades[0], round(float(np.polyval(POLINOMIO, 25.0)), 4))
+        self.assertTrue(np.isnan(gravidades[2]))
+        self.assertAlmostEqual(calcular_gravidade({'polinomio': [12.0], 'unidade': 'plato'}, 30), 1.0484, places=3)
+        self.assertAlmostEqual(float(plato_para_sg(0)), 1.0)
+
+
+class TestReceptorIspindel(unittest.TestCase):
+
+    def setUp(self):
+        cache_leituras.limpar()
+        self.app = criar_app_teste([ispindel_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            dispositivo = Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.40',
+                token_acesso='segredo',
+                parametros_calibracao={'polinomio': POLINOMIO}
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        cache_leituras.limpar()
+        with self.app.app_context():
+            db.drop_all()
+
+    def _historico(self):
+        with self.app.app_context():
+            return HistoricoDispositivo.query.filter_by(dispositivo_id=self.dispositivo_id)\
+                .order_by(HistoricoDispositivo.id).all()
+
+    def test_autenticacao_por_token(self):
+        # Sem token ou com token errado: recusado mesmo com o nome certo
+        self.assertEqual(self.client.post('/api/ispindel', json=payload(30)).status_code, 401)
+        self.assertEqual(self.client.post('/api/ispindel', json=payload(30, token='errado')).status_code, 401)
+        # O nome só confirma o dispositivo do token
+        self.assertEqual(self.client.post('/api/ispindel?token=segredo', json=payload(30, name='Outro')).status_code, 401)
+        self.assertEqual(self._historico(), [])
+
+        response = self.client.post('/api/ispindel?token=segredo', json=payload(30))
+        self.assertEqual(response.status_code, 201, response.get_json())
+        self.assertEqual(response.get_json()['dispositivo_id'], self.dispositivo_id)
+
+    def test_dispositivo_sem_token(self):
+        with self.app.app_context():
+            db.session.add(Dispositivo(
+                nome='iSpindel-02', tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.HTTP, endereco='192.168.0.41'
+            ))
+            db.session.commit()
+
+        self.assertEqual(self.client.post('/api/ispindel', json=payload(30, name='iSpindel-02')).status_code, 401)
+        self.assertEqual(
+            self.client.post('/api/ispindel', json=payload(30, name='iSpindel-02', token='')).status_code, 401
+        )
+        with self.app.app_context():
+            self.assertEqual(HistoricoDispositivo.query.count(), 0)
+
+    def test_gravidade_pelo_angulo(self):
+        response = self.client.post('/api/ispindel', json=payload(30, token='segredo'))
+        self.assertEqual(response.status_code, 201, response.get_json())
+
+        leitura = self._historico()[0]
+        self.assertAlmostEqual(leitura.gravidade, round(float(np.polyval(POLINOMIO, 30)), 4))
+        self.assertAlmostEqual(leitura.temperatura, 20.0)
+        self.assertEqual(leitura.qualidade_sinal, -70)
+        self.assertNotIn('token', leitura.dados)
+
+    def test_temperatura_invalida(self):
+        for temperatura in ('quente', [68], 'nan'):
+            response = self.client.post('/api/ispindel?token=segredo', json=payload(30, temperature=temperatura))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('temperature', response.get_json()['error'])
+        self.assertEqual(self._historico(), [])
+
+    def test_recalibrar_historico(self):
+        for angulo in (55, 45, 35):
+            self.client.post('/api/ispindel', json=payload(angulo), headers={'Authorization': 'Bearer segredo'})
+
+        novo = [0.0, 0.0, 0.001, 1.0]
+        with self.app.app_context():
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            dispositivo.parametros_calibracao = {'polinomio': novo}
+            db.session.commit()
+
+        response = self.client.post(f'/api/ispindel/{self.dispositivo_id}/recalibrar')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['leituras_atualizadas'], 3)
+        self.assertEqual([h.gravidade for h in self._historico()], [1.055, 1.045, 1.035])
+
+    def test_recalibrar_arquivo_e_resumos(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio)
+        for angulo in (55, 45, 35):
+            self.client.post('/api/ispindel', json=payload(angulo), headers={'Authorization': 'Bearer segredo'})
+
+        agora = datetime.now()
+        with self.app.app_context():
+            Configuracao.set_config('ARQUIVO_HISTORICO_DIR', diretorio)
+            # As duas primeiras leituras ficam antigas e vão para o arquivo frio
+            for dias, leitura in zip((40, 39), self._historico()[:2]):
+                HistoricoDispositivo.query.filter_by(id=leitura.id).update({'timestamp': agora - timedelta(days=dias)})
+            sessao = SessaoBrasagem(nome='APA', status='em_andamento', data_inicio=agora - timedelta(days=45))
+            db.session.add(sessao)
+            db.session.flush()
+            db.session.get(Dispositivo, self.dispositivo_id).sessao_brasagem_id = sessao.id
+            db.session.commit()
+            ResumoSessaoService.finalizar(sessao, data_fim=agora + timedelta(minutes=1))
+            self.assertEqual(RetencaoService.arquivar_dispositivo(self.dispositivo_id, agora - timedelta(days=1)), 2)
+
+            dispositivo = db.session.get(Dispositivo, self.dispositivo_id)
+            dispositivo.parametros_calibracao = {'polinomio': [0.0, 0.0, 0.001, 1.0]}
+            db.session.commit()
+
+        response = self.client.post(f'/api/ispindel/{self.dispositivo_id}/recalibrar')
+        self.assertEqual(response.get_json()['leituras_atualizadas'], 3)
+
+        with self.app.app_context():
+            self.assertEqual(ler_periodo(self.dispositivo_id)['gravidade'].tolist(), [1.055, 1.045])
+            diarios = HistoricoAgregado.query.filter_by(dispositivo_id=self.dispositivo_id, resolucao='1d')\
+                .order_by(HistoricoAgregado.inicio).all()
+            self.assertEqual([d.gravidade_ultimo for d in diarios], [1.055, 1.045, 1.035])
+            resumo = ResumoSessao.query.one()
+            self.assertEqual((resumo.gravidade_inicial, resumo.gravidade_final), (1.045, 1.045))
+            self.assertEqual(resumo.leituras, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
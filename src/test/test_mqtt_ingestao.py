@@ -0,0 +1,110 @@
+"""
+Testes do worker de ingestão MQTT (sem broker, com cliente em processo)
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from model.dispositivos import Dispositivo, HistoricoDispositivo, TipoDispositivo, ProtocoloComunicacao
+from workers.gravador_lotes import GravadorLotes
+from workers.mqtt_ingestao import MapaTopicos, IngestorMQTT, topico_corresponde, decodificar_payload
+
+
+class TestMapaTopicos(unittest.TestCase):
+    """Testes para o mapeamento de tópicos"""
+
+    def test_curingas(self):
+        self.assertTrue(topico_corresponde('brew/+/temp', 'brew/fermentador/temp'))
+        self.assertTrue(topico_corresponde('brew/#', 'brew/a/b/c'))
+        self.assertFalse(topico_corresponde('brew/+/temp', 'brew/a/b/temp'))
+        self.assertFalse(topico_corresponde('brew/a', 'brew/a/b'))
+
+    def test_resolver_subtopico(self):
+        mapa = MapaTopicos()
+        mapa.carregar([(1, 'ispindel/iSpindel01'), (2, 'camara/+/estado')])
+
+        self.assertEqual(mapa.resolver('ispindel/iSpindel01'), (1, None))
+        self.assertEqual(mapa.resolver('ispindel/iSpindel01/temperature'), (1, 'temperature'))
+        self.assertEqual(mapa.resolver('camara/01/estado'), (2, None))
+        self.assertEqual(mapa.resolver('outro/topico'), (None, None))
+        self.assertIn('ispindel/iSpindel01/#', mapa.assinaturas())
+
+    def test_decodificar_payload(self):
+        self.assertEqual(decodificar_payload(b'{"temp": 19.5}'), {'temp': 19.5})
+        self.assertEqual(decodificar_payload(b'19.5', 'temperature'), {'temperature': 19.5})
+        self.assertEqual(decodificar_payload(b'ON'), {'valor': 'ON'})
+
+
+class TestGravadorLotes(unittest.TestCase):
+    """Testes para a fila limitada e o flush por tamanho"""
+
+    def test_descarte_com_fila_cheia(self):
+        gravador = GravadorLotes(tamanho_fila=2, timeout_enfileirar=0.01, gravar=lambda lote: {})
+        self.assertTrue(gravador.enfileirar({}))
+        self.assertTrue(gravador.enfileirar({}))
+        self.assertFalse(gravador.enfileirar({}))
+
+        metricas = gravador.metricas()
+        self.assertEqual(metricas['descartadas'], 1)
+        self.assertEqual(metricas['profundidade_maxima'], 2)
+
+    def test_flush_por_tamanho(self):
+        lotes = []
+        gravador = GravadorLotes(tamanho_lote=10, intervalo_flush=60,
+                                 gravar=lambda lote: lotes.append(len(lote)) or {'aceitos': len(lote)})
+        for i in range(25):
+            gravador.enfileirar({'i': i})
+        gravador.iniciar()
+        gravador.parar()
+
+        self.assertEqual(sum(lotes), 25)
+        self.assertTrue(all(tamanho <= 10 for tamanho in lotes))
+        self.assertEqual(gravador.metricas()['gravadas'], 25)
+
+
+class TestIngestorMQTT(unittest.TestCase):
+    """Fluxo completo: mensagem MQTT -> fila -> HistoricoDispositivo"""
+
+    def setUp(self):
+        self.app = criar_app_teste()
+        with self.app.app_context():
+            db.session.add(Dispositivo(
+                nome='iSpindel-01',
+                tipo=TipoDispositivo.ISPINDEL,
+                protocolo=ProtocoloComunicacao.MQTT,
+                endereco='broker',
+                topico_mqtt='ispindel/iSpindel01'
+            ))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_mensagens_gravadas(self):
+        gravador = GravadorLotes(self.app, tamanho_lote=100, intervalo_flush=0.05)
+        ingestor = IngestorMQTT(gravador)
+        with self.app.app_context():
+            ingestor.mapa.carregar_do_banco()
+
+        gravador.iniciar()
+        ingestor.processar_mensagem('ispindel/iSpindel01', b'{"temperature": 19.5, "gravity": 1.042}')
+        ingestor.processar_mensagem('ispindel/iSpindel01/battery', b'3.9')
+        ingestor.processar_mensagem('desconhecido', b'1')
+        gravador.parar()
+
+        with self.app.app_context():
+            registros = HistoricoDispositivo.query.order_by(HistoricoDispositivo.id).all()
+            self.assertEqual(len(registros), 2)
+            self.assertEqual(registros[0].gravidade, 1.042)
+            self.assertEqual(registros[1].bateria, 3.9)
+        self.assertEqual(ingestor.metricas()['sem_dispositivo'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Testes do worker de polling de dispositivos
+"""
+
+import asyncio
+import json
+import unittest
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workers.gravador_lotes import GravadorLotes
+from workers.poller_dispositivos import PollerDispositivos, ErroConsulta, consultar_http, consultar_tcp
+
+
+class GravadorFalso:
+    def __init__(self):
+        self.leituras = []
+
+    def enfileirar_sem_espera(self, leitura):
+        self.leituras.append(leitura)
+        return True
+
+
+def dispositivo(dispositivo_id, intervalo=0.05, protocolo='http', **extra):
+    dados = {
+        'id': dispositivo_id, 'nome': f'D{dispositivo_id}', 'protocolo': protocolo,
+        'endereco': '127.0.0.1', 'porta': None, 'usuario': None, 'senha': None,
+        'token_acesso': None, 'configuracao': {}, 'intervalo': intervalo
+    }
+    dados.update(extra)
+    return dados
+
+
+class TestPollerDispositivos(unittest.TestCase):
+    """Testes de agendamento, concorrência e tentativas"""
+
+    def _rodar(self, poller, duracao):
+        async def principal():
+            parar = asyncio.Event()
+            tarefa = asyncio.ensure_future(poller.executar(parar))
+            await asyncio.sleep(duracao)
+            parar.set()
+            await tarefa
+        asyncio.run(principal())
+
+    def test_agenda_por_intervalo_e_limita_concorrencia(self):
+        simultaneas = {'atual': 0, 'max': 0}
+
+        async def consulta(disp, timeout):
+            simultaneas['atual'] += 1
+            simultaneas['max'] = max(simultaneas['max'], simultaneas['atual'])
+            await asyncio.sleep(0.02)
+            simultaneas['atual'] -= 1
+            return {'temperature': 20.0 + disp['id']}
+
+        gravador = GravadorFalso()
+        poller = PollerDispositivos(gravador, limite_concorrencia=3, jitter=0.0, consultas={'http': consulta})
+        poller.carregar([dispositivo(i) for i in range(10)])
+        self._rodar(poller, 0.5)
+
+        self.assertLessEqual(simultaneas['max'], 3)
+        ids = {leitura['dispositivo_id'] for leitura in gravador.leituras}
+        self.assertEqual(ids, set(range(10)))
+        self.assertEqual(gravador.leituras[0]['temperatura'], 20.0 + gravador.leituras[0]['dispositivo_id'])
+
+    def test_tentativas_ate_falhar(self):
+        chamadas = []
+
+        async def consulta(disp, timeout):
+            chamadas.append(disp['id'])
+            raise ErroConsulta('HTTP 500')
+
+        poller = PollerDispositivos(GravadorFalso(), tentativas=2, consultas={'http': consulta})
+        poller.carregar([dispositivo(1, intervalo=60)], agora=0)
+        self._rodar(poller, 0.8)
+
+        metricas = poller.metricas()
+        self.assertEqual(metricas['falhas'], 1)
+        self.assertEqual(metricas['tentativas_extras'], 1)
+        self.assertEqual(len(chamadas), 2)
+
+    def test_fila_cheia_nao_trava_o_loop(self):
+        async def consulta(disp, timeout):
+            return {'temperature': 20.0}
+
+        # Gravador parado com fila de 1: tudo depois da primeira leitura encontra a fila cheia.
+        # Uma espera bloqueante (5 s por leitura) pararia o agendador
+        gravador = GravadorLotes(tamanho_fila=1, timeout_enfileirar=5, gravar=lambda lote: {})
+        poller = PollerDispositivos(gravador, jitter=0.0, consultas={'http': consulta})
+        poller.carregar([dispositivo(i) for i in range(5)])
+        inicio = time.perf_counter()
+        self._rodar(poller, 0.5)
+
+        self.assertLess(time.perf_counter() - inicio, 1.5)
+        self.assertGreater(poller.metricas()['sucessos'], 20)
+        metricas = gravador.metricas()
+        self.assertEqual(metricas['profundidade_fila'], 1)
+        self.assertEqual(metricas['descartadas'], metricas['recebidas'] - 1)
+        self.assertEqual(metricas['esperas_fila_cheia'], 0)
+
+
+class TestConsultas(unittest.TestCase):
+    """Testes das consultas HTTP e TCP contra servidores locais"""
+
+    def test_http_e_tcp(self):
+        async def servidor_http(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            corpo = json.dumps({'temperature': 19.5}).encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         + f'Content-Length: {len(corpo)}\r\n\r\n'.encode() + corpo)
+            await writer.drain()
+            writer.close()
+
+        async def servidor_tcp(reader, writer):
+            self.assertEqual(await reader.readline(), b'READ\n')
+            writer.write(b'{"temp": 21.0}\n')
+            await writer.drain()
+            writer.close()
+
+        async def principal():
+            http = await asyncio.start_server(servidor_http, '127.0.0.1', 0)
+            tcp = await asyncio.start_server(servidor_tcp, '127.0.0.1', 0)
+            porta_http = http.sockets[0].getsockname()[1]
+            porta_tcp = tcp.sockets[0].getsockname()[1]
+            async with http, tcp:
+                dados_http = await consultar_http(dispositivo(1, porta=porta_http), 2)
+                dados_tcp = await consultar_tcp(dispositivo(2, protocolo='tcp', porta=porta_tcp), 2)
+            return dados_http, dados_tcp
+
+        dados_http, dados_tcp = asyncio.run(principal())
+        self.assertEqual(dados_http, {'temperature': 19.5})
+        self.assertEqual(dados_tcp, {'temp': 21.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
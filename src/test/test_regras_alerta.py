@@ -0,0 +1,139 @@
+"""
+Testes do motor de regras de alerta
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.alertas_routes import alertas_bp
+from api.routes.dispositivos_routes import dispositivos_bp
+from model.cache_leituras import cache_leituras
+from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.notification import Notification
+from model.regras_alerta import RegraAlerta, DisparoRegra, MotorRegras, motor_regras
+from model.user import User
+
+INICIO = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class TestRegrasAlerta(unittest.TestCase):
+    """Testes da avaliação incremental das regras"""
+
+    def setUp(self):
+        motor_regras.limpar()
+        cache_leituras.limpar()
+        self.app = criar_app_teste([dispositivos_bp, alertas_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            usuario = User(username='cervejeiro', email='c@exemplo.com', password_hash='x')
+            dispositivo = Dispositivo(
+                nome='Controlador-01',
+                tipo=TipoDispositivo.CONTROLADOR_TEMPERATURA,
+                protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.20'
+            )
+            db.session.add_all([usuario, dispositivo])
+            db.session.commit()
+            self.user_id = usuario.id
+            self.dispositivo_id = dispositivo.id
+
+    def tearDown(self):
+        motor_regras.limpar()
+        cache_leituras.limpar()
+        with self.app.app_context():
+            db.drop_all()
+
+    def _criar_regra(self, **dados):
+        dados.setdefault('user_id', self.user_id)
+        dados.setdefault('dispositivo_id', self.dispositivo_id)
+        response = self.client.post('/api/alertas/regras', json=dados)
+        self.assertEqual(response.status_code, 201, response.get_json())
+        return response.get_json()['regra']['id']
+
+    def _enviar(self, valores, campo='temperatura', passo=timedelta(minutes=1)):
+        leituras = [
+            {'timestamp': (INICIO + i * passo).isoformat(), campo: valor, 'dados': {}}
+            for i, valor in enumerate(valores)
+        ]
+        self.client.post(f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': leituras})
+
+    def _notificacoes(self):
+        with self.app.app_context():
+            return Notification.query.filter_by(user_id=self.user_id).all()
+
+    def test_limite_com_duracao_e_cooldown(self):
+        """Dispara só após a duração fora da faixa e uma única vez por ocorrência"""
+        self._criar_regra(nome='Temperatura alta', tipo='limite', campo='temperatura',
+                          parametros={'maximo': 22, 'duracao_segundos': 600})
+
+        self._enviar([20, 23, 23, 23, 23, 23])  # Só 5 minutos fora da faixa
+        self.assertEqual(len(self._notificacoes()), 0)
+
+        self._enviar([23] * 15)  # Dentro do lote: 14 minutos fora
+        self._enviar([23] * 15)  # Mesma ocorrência: não repete
+        notificacoes = self._notificacoes()
+        self.assertEqual(len(notificacoes), 1)
+        self.assertIn('fora da faixa', notificacoes[0].message)
+
+        # Voltou à faixa e saiu de novo: nova ocorrência, mas dentro do cooldown
+        self._enviar([20] + [23] * 15)
+        self.assertEqual(len(self._notificacoes()), 1)
+
+    def test_cooldown_compartilhado_entre_processos(self):
+        """Dois motores (web e worker) com a mesma ocorrência geram uma única notificação"""
+        regra_id = self._criar_regra(nome='Temperatura alta', tipo='limite', campo='temperatura',
+                                     parametros={'maximo': 22}, dispositivo_id=None)
+        registros = [{'timestamp': INICIO, 'temperatura': 25.0, 'dados': {}}]
+
+        with self.app.app_context():
+            outro = Dispositivo(nome='Controlador-02', tipo=TipoDispositivo.CONTROLADOR_TEMPERATURA,
+                                protocolo=ProtocoloComunicacao.HTTP, endereco='192.168.0.21')
+            db.session.add(outro)
+            db.session.commit()
+
+            web, worker = MotorRegras(), MotorRegras()
+            self.assertEqual(len(web.avaliar(self.dispositivo_id, None, registros)), 1)
+            self.assertEqual(worker.avaliar(self.dispositivo_id, None, registros), [])
+            # O cooldown é por dispositivo: a mesma regra global ainda alerta o outro
+            self.assertEqual(len(worker.avaliar(outro.id, None, registros)), 1)
+
+            self.assertEqual(DisparoRegra.query.filter_by(regra_id=regra_id).count(), 2)
+            self.assertIsNotNone(db.session.get(RegraAlerta, regra_id).ultimo_disparo)
+        self.assertEqual(len(self._notificacoes()), 2)
+
+    def test_estabilidade(self):
+        """Gravidade dentro da variação por toda a janela dispara o alerta"""
+        self._criar_regra(nome='Gravidade estável', tipo='estabilidade', campo='gravidade',
+                          parametros={'variacao_maxima': 0.001, 'janela_segundos': 48 * 3600})
+
+        self._enviar([1.020, 1.015, 1.012] + [1.011, 1.0105, 1.011] * 9, campo='gravidade', passo=timedelta(hours=2))
+        notificacoes = self._notificacoes()
+        self.assertEqual(len(notificacoes), 1)
+        self.assertIn('estável', notificacoes[0].message)
+
+    def test_ausencia_de_dados(self):
+        self._criar_regra(nome='Sem dados', tipo='ausencia_dados', parametros={'timeout_segundos': 1800})
+        self._enviar([20])
+
+        with self.app.app_context():
+            self.assertEqual(motor_regras.verificar_ausencias(INICIO + timedelta(minutes=10)), [])
+            alertas = motor_regras.verificar_ausencias(INICIO + timedelta(hours=1))
+        self.assertEqual(len(alertas), 1)
+        self.assertEqual(len(self._notificacoes()), 1)
+
+    def test_validacao(self):
+        response = self.client.post('/api/alertas/regras', json={
+            'nome': 'Inválida', 'tipo': 'estabilidade', 'campo': 'gravidade',
+            'parametros': {'variacao_maxima': 0.001}, 'user_id': self.user_id
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Testes do resumo de telemetria das sessões
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app_teste import criar_app_teste
+from db.database import db
+from api.routes.dispositivos_routes import dispositivos_bp
+from api.routes.sessoes_routes import sessoes_bp
+from model.cache_leituras import cache_leituras
+from model.dispositivos import Dispositivo, TipoDispositivo, ProtocoloComunicacao
+from model.resumo_sessao import ResumoSessao
+from model.sessao_brasagem import SessaoBrasagem
+
+INICIO = datetime(2024, 6, 1, 8, 0, 0)
+
+
+class TestResumoSessao(unittest.TestCase):
+
+    def setUp(self):
+        cache_leituras.limpar()
+        self.app = criar_app_teste([dispositivos_bp, sessoes_bp])
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            sessao = SessaoBrasagem(
+                nome='APA', status='em_andamento', data_inicio=INICIO,
+                temperatura_alvo=20.0, gravidade_original=1.050
+            )
+            db.session.add(sessao)
+            db.session.commit()
+            dispositivo = Dispositivo(
+                nome='iSpindel-01', tipo=TipoDispositivo.ISPINDEL, protocolo=ProtocoloComunicacao.HTTP,
+                endereco='192.168.0.60', intervalo_atualizacao=600, sessao_brasagem_id=sessao.id
+            )
+            db.session.add(dispositivo)
+            db.session.commit()
+            self.sessao_id = sessao.id
+            self.dispositivo_id = dispositivo.id
+
+        # 4 horas a cada 10 minutos: primeira hora a 23 °C, depois 20 °C; gravidade caindo 1 ponto por leitura
+        leituras = [
+            {
+                'timestamp': (INICIO + timedelta(minutes=10 * i)).isoformat(),
+                'temperatura': 23.0 if i < 6 else 20.0,
+                'gravidade': round(1.050 - 0.001 * i, 3),
+                'dados': {}
+            }
+            for i in range(24)
+        ]
+        # Leitura antes da sessão: fora da janela
+        leituras.append({'timestamp': (INICIO - timedelta(hours=1)).isoformat(), 'temperatura': 5.0, 'dados': {}})
+        self.client.post(f'/api/dispositivos/{self.dispositivo_id}/historico/lote', json={'leituras': leituras})
+
+    def tearDown(self):
+        cache_leituras.limpar()
+        with self.app.app_context():
+            db.drop_all()
+
+    def test_resumo_ao_vivo(self):
+        resumo = self.client.get(f'/api/sessoes/{self.sessao_id}/resumo').get_json()
+        self.assertFalse(resumo['materializado'])
+        self.assertEqual(resumo['leituras'], 24)
+        self.assertEqual(resumo['temperatura_min'], 20.0)
+        self.assertEqual(resumo['temperatura_max'], 23.0)
+        self.assertEqual(resumo['tempo_na_faixa_pct'], 75.0)
+        self.assertEqual([faixa['media'] for faixa in resumo['perfil_temperatura']], [23.0, 20.0, 20.0, 20.0])
+        self.assertEqual(resumo['gravidade_inicial'], 1.050)
+        self.assertEqual(resumo['gravidade_final'], 1.029)
+        self.assertEqual(resumo['queda_gravidade_pontos'], 21.0)
+        self.assertEqual(resumo['atenuacao_aparente'], 42.0)
+
+    def test_finalizar_materializa(self):
+        fim = INICIO + timedelta(hours=2)
+        response = self.client.post(f'/api/sessoes/{self.sessao_id}/finalizar', json={'data_fim': fim.isoformat()})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['sessao']['status'], 'finalizada')
+
+        with self.app.app_context():
+            self.assertEqual(ResumoSessao.query.count(), 1)
+            self.assertEqual(db.session.get(SessaoBrasagem, self.sessao_id).gravidade_final, 1.040)
+
+        resumo = self.client.get(f'/api/sessoes/{self.sessao_id}/resumo').get_json()
+        self.assertTrue(resumo['materializado'])
+        self.assertEqual(resumo['leituras'], 13)
+
+        # Outra tolerância recalcula sobre a mesma janela em vez de devolver o materializado
+        ao_vivo = self.client.get(f'/api/sessoes/{self.sessao_id}/resumo?tolerancia=5').get_json()
+        self.assertFalse(ao_vivo['materializado'])
+        self.assertEqual((ao_vivo['tolerancia'], ao_vivo['leituras']), (5.0, 13))
+        self.assertEqual(ao_vivo['tempo_na_faixa_pct'], 100.0)
+        self.assertEqual(resumo['tolerancia'], 1.0)
+
+        resumos = self.client.get(f'/api/sessoes/resumos?ids={self.sessao_id}').get_json()
+        self.assertEqual(len(resumos), 1)
+        self.assertEqual(resumos[0]['nome'], 'APA')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Testes dos dispositivos simulados (gerador de carga)
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from model.dispositivos import TipoDispositivo
+from utils.simulador import DispositivoSimulado, criar_frota, temperatura_brasagem
+
+
+class TestSimulador(unittest.TestCase):
+
+    def test_mesma_semente_mesmas_leituras(self):
+        a = [d.leituras(50) for d in criar_frota(2, semente=7)]
+        b = [d.leituras(50) for d in criar_frota(2, semente=7)]
+        c = [d.leituras(50) for d in criar_frota(2, semente=8)]
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertEqual(len(a), 2 * len(TipoDispositivo))
+
+    def test_curva_de_fermentacao(self):
+        ispindel = DispositivoSimulado(TipoDispositivo.ISPINDEL, semente=1, intervalo=3600)
+        leituras = ispindel.leituras(24 * 14)
+        self.assertAlmostEqual(leituras[0]['gravidade'], ispindel.gravidade_original, delta=0.002)
+        self.assertAlmostEqual(leituras[-1]['gravidade'], ispindel.gravidade_final, delta=0.002)
+        self.assertGreater(ispindel.gravidade_original, ispindel.gravidade_final)
+
+    def test_degraus_de_brasagem(self):
+        self.assertEqual(temperatura_brasagem(0), 20.0)
+        self.assertEqual(temperatura_brasagem(10), 43.5)
+        self.assertEqual(temperatura_brasagem(50), 67.0)
+        self.assertEqual(temperatura_brasagem(95), 78.0)
+        self.assertEqual(temperatura_brasagem(500), 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Testes do worker de ingestão por socket (UDP/TCP)
+"""
+
+import asyncio
+import unittest
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workers.gravador_lotes import GravadorLotes
+from workers.socket_ingestao import IngestorSocket, decodificar, codificar_binario, DADOS_UDP
+
+
+class GravadorFalso:
+    def __init__(self):
+        self.leituras = []
+
+    def enfileirar_sem_espera(self, leitura):
+        self.leituras.append(leitura)
+        return True
+
+    def metricas(self):
+        return {}
+
+
+class TestDecodificacao(unittest.TestCase):
+
+    def test_binario_e_texto(self):
+        leituras = []
+        quadro = codificar_binario([
+            {'timestamp': 1717000000.0, 'temperatura': 20.5, 'gravidade': 1.048},
+            {'temperatura': 21.0, 'bateria': 4.0},
+        ])
+        buffer = quadro + b',19.5,,,-67,\n1717000100,20,1.047,,,\nlixo\n'
+        consumidos, invalidas = decodificar(buffer, len(buffer), 7, DADOS_UDP, leituras.append)
+
+        self.assertEqual(consumidos, len(buffer))
+        self.assertEqual(invalidas, 1)
+        self.assertEqual(len(leituras), 4)
+        self.assertEqual(leituras[0]['timestamp'], 1717000000.0)
+        self.assertAlmostEqual(leituras[0]['gravidade'], 1.048, places=5)
+        self.assertNotIn('timestamp', leituras[1])
+        self.assertNotIn('gravidade', leituras[1])
+        self.assertEqual(leituras[2], {'dispositivo_id': 7, 'dados': DADOS_UDP, 'temperatura': 19.5, 'qualidade_sinal': -67.0})
+        self.assertEqual(leituras[3]['timestamp'], 1717000100.0)
+
+    def test_fluxo_incompleto_fica_no_buffer(self):
+        leituras = []
+        quadro = codificar_binario([{'temperatura': 20.0}] * 3)
+        buffer = b',1,,,,\n' + quadro[:-5]
+        consumidos, _ = decodificar(buffer, len(buffer), 1, DADOS_UDP, leituras.append, completo=False)
+        self.assertEqual(consumidos, 7)
+        self.assertEqual(len(leituras), 1)
+
+
+class TestServidorSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.gravador = GravadorFalso()
+        self.ingestor = IngestorSocket(self.gravador)
+        self.ingestor.mapa.carregar([(3, '127.0.0.1:5514'), (4, '10.0.0.9')])
+
+    def test_udp_e_tcp(self):
+        async def principal():
+            transporte, servidor = await self.ingestor.iniciar('127.0.0.1', 0, 0)
+            porta_udp = transporte.get_extra_info('sockname')[1]
+            porta_tcp = servidor.sockets[0].getsockname()[1]
+            loop = asyncio.get_running_loop()
+
+            cliente, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=('127.0.0.1', porta_udp))
+            cliente.sendto(codificar_binario([{'temperatura': 18.0}] * 10))
+            cliente.sendto(b',19,,,,\n')
+
+            _, escritor = await asyncio.open_connection('127.0.0.1', porta_tcp)
+            quadro = codificar_binario([{'gravidade': 1.050}] * 50)
+            # Quadro partido em duas escritas
+            escritor.write(quadro[:100])
+            await escritor.drain()
+            await asyncio.sleep(0.05)
+            escritor.write(quadro[100:] + b',20,,,,\n')
+            await escritor.drain()
+            await asyncio.sleep(0.1)
+
+            escritor.close()
+            cliente.close()
+            transporte.close()
+            servidor.close()
+            await servidor.wait_closed()
+
+        asyncio.run(principal())
+
+        self.assertEqual(len(self.gravador.leituras), 62)
+        self.assertTrue(all(l['dispositivo_id'] == 3 for l in self.gravador.leituras))
+        self.assertEqual(sum(1 for l in self.gravador.leituras if 'gravidade' in l), 50)
+        self.assertEqual(self.ingestor.invalidas, 0)
+
+    def test_fila_cheia_nao_trava_o_loop(self):
+        # Gravador parado com fila de 1 e espera de 5 s: uma espera bloqueante travaria o loop
+        gravador = GravadorLotes(tamanho_fila=1, timeout_enfileirar=5, gravar=lambda lote: {})
+        ingestor = IngestorSocket(gravador)
+        ingestor.mapa.carregar([(3, '127.0.0.1')])
+        batidas = []
+
+        async def relogio():
+            while True:
+                batidas.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def principal():
+            transporte, _ = await ingestor.iniciar('127.0.0.1', porta_udp=0)
+            porta_udp = transporte.get_extra_info('sockname')[1]
+            tarefa = asyncio.ensure_future(relogio())
+            cliente, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=('127.0.0.1', porta_udp))
+            for _ in range(20):
+                cliente.sendto(codificar_binario([{'temperatura': 18.0}] * 5))
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.1)
+            tarefa.cancel()
+            cliente.close()
+            transporte.close()
+
+        inicio = time.perf_counter()
+        asyncio.run(principal())
+
+        self.assertLess(time.perf_counter() - inicio, 1.5)
+        self.assertEqual(ingestor.leituras, 100)
+        self.assertLess(max(b - a for a, b in zip(batidas, batidas[1:])), 0.5)
+        metricas = gravador.metricas()
+        self.assertEqual((metricas['recebidas'], metricas['descartadas']), (100, 99))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Ajuste vetorizado de curvas de fermentação (decaimento exponencial e logístico)
+
+A gravidade é modelada como G(t) = GF + A * phi(t), em que phi é uma curva
+fixa por modelo candidato:
+
+    exponencial: phi(t) = exp(-k t)
+    logístico:   phi(t) = 1 / (1 + exp(k (t - t0)))
+
+Para cada phi o ajuste de (GF, A) é uma regressão linear simples, que só
+depende das somas S = (n, Σx, Σx², Σy, Σxy, Σy²) com x = phi(t). Essas somas
+podem ser acumuladas leitura a leitura, então novas leituras atualizam o
+ajuste sem reprocessar a série. O melhor candidato (menor erro) é escolhido
+para todas as sessões de uma vez com operações de matriz.
+"""
+
+import numpy as np
+
+EXPONENCIAL = 'exponencial'
+LOGISTICO = 'logistico'
+
+# Quantidade de somas acumuladas por sessão e modelo candidato
+N_SOMAS = 6
+
+
+def grade_modelos():
+    """Modelos candidatos: (família, k em 1/h, t0 em horas)"""
+    modelos = [(EXPONENCIAL, float(k), 0.0) for k in np.logspace(-3, -0.5, 24)]
+    for k in np.logspace(-2.3, -0.5, 14):
+        for t0 in np.linspace(6, 240, 40):
+            modelos.append((LOGISTICO, float(k), float(t0)))
+    return modelos
+
+
+def _parametros(modelos):
+    logistico = np.array([familia == LOGISTICO for familia, _, _ in modelos])
+    k = np.array([k for _, k, _ in modelos])
+    t0 = np.array([t0 for _, _, t0 in modelos])
+    return logistico, k, t0
+
+
+def avaliar_phi(modelos, t):
+    """Matriz phi (len(t) x len(modelos)) para tempos t em horas"""
+    logistico, k, t0 = _parametros(modelos)
+    t = np.asarray(t, dtype=float)[:, None]
+    exponencial = np.exp(-k * t)
+    # 1/(1+e^z) escrito com tanh para não estourar com z grande
+    sigmoide = 0.5 * (1.0 - np.tanh(k * (t - t0) / 2.0))
+    return np.where(logistico, sigmoide, exponencial)
+
+
+def acumular(somas, indices, t, y, modelos):
+    """
+    Soma as leituras (t em horas, y em pontos de gravidade) nas somas das
+    sessões indicadas. somas tem forma (n_sessoes, n_modelos, N_SOMAS).
+    """
+    if len(t) == 0:
+        return somas
+    indices = np.asarray(indices)
+    x = avaliar_phi(modelos, t)
+    y = np.asarray(y, dtype=float)[:, None]
+    # Uma soma por vez para não materializar (leituras x modelos x 6)
+    for i, valores in enumerate((1.0, x, x * x, y, x * y, y * y)):
+        np.add.at(somas[..., i], indices, np.broadcast_to(valores, x.shape))
+    return somas
+
+
+def ajustar(somas, minimo_leituras=6):
+    """
+    Resolve a regressão de todos os modelos de todas as sessões e escolhe o melhor.
+
+    Retorna (indice_modelo, gf, a, rmse) por sessão; sessões sem ajuste
+    válido ficam com índice -1 e NaN.
+    """
+    n, sx, sxx, sy, sxy, syy = (somas[..., i] for i in range(N_SOMAS))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = sxx - sx * sx / n
+        cov = sxy - sx * sy / n
+        a = cov / var_x
+        gf = (sy - a * sx) / n
+        sse = syy - sy * sy / n - a * cov
+
+    # Gravidade deve cair (A > 0) e o ajuste precisa de variação em phi
+    validos = (n >= minimo_leituras) & (var_x > 1e-9 * np.maximum(n, 1)) & (a > 0)
+    sse = np.where(validos, np.maximum(sse, 0.0), np.inf)
+
+    melhor = np.argmin(sse, axis=1)
+    linhas = np.arange(len(melhor))
+    melhor_sse = sse[linhas, melhor]
+    ok = np.isfinite(melhor_sse)
+
+    return (
+        np.where(ok, melhor, -1),
+        np.where(ok, gf[linhas, melhor], np.nan),
+        np.where(ok, a[linhas, melhor], np.nan),
+        np.where(ok, np.sqrt(melhor_sse / np.maximum(n[linhas, melhor], 1)), np.nan),
+    )
+
+
+def horas_ate_estabilizar(modelos, indices, a, tolerancia=1.0):
+    """Horas (desde a referência) até A*phi(t) ficar abaixo da tolerância, por sessão"""
+    logistico, k, t0 = _parametros(modelos)
+    horas = np.full(len(indices), np.nan)
+    validos = indices >= 0
+    if not validos.any():
+        return horas
+
+    idx = indices[validos]
+    razao = tolerancia / a[validos]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponencial = np.log(1.0 / razao) / k[idx]
+        sigmoide = t0[idx] + np.log(1.0 / razao - 1.0) / k[idx]
+    resultado = np.where(logistico[idx], sigmoide, exponencial)
+    # Amplitude já menor que a tolerância: estável desde o início
+    horas[validos] = np.where(razao >= 1.0, 0.0, resultado)
+    return horas
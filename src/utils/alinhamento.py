@@ -0,0 +1,64 @@
+"""
+Alinhamento de séries temporais de vários dispositivos em uma grade comum
+"""
+
+import re
+
+import numpy as np
+
+UNIDADES_INTERVALO = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_intervalo(valor: str) -> int:
+    """Converte '90', '30s', '5m', '1h' ou '1d' em segundos"""
+    correspondencia = re.fullmatch(r'\s*(\d+)\s*([smhd]?)\s*', str(valor))
+    if not correspondencia:
+        raise ValueError(f'Intervalo inválido: {valor}')
+    segundos = int(correspondencia.group(1)) * UNIDADES_INTERVALO[correspondencia.group(2) or 's']
+    if segundos <= 0:
+        raise ValueError(f'Intervalo inválido: {valor}')
+    return segundos
+
+
+def grade_temporal(inicio: np.datetime64, fim: np.datetime64, passo_ms: int) -> np.ndarray:
+    """Início de cada intervalo da grade [inicio, fim], em datetime64[ms]"""
+    inicio = np.datetime64(inicio, 'ms')
+    quantidade = int((np.datetime64(fim, 'ms') - inicio).astype(np.int64) // passo_ms) + 1
+    return inicio + np.arange(max(quantidade, 0), dtype=np.int64) * np.timedelta64(passo_ms, 'ms')
+
+
+def media_por_intervalo(timestamps: np.ndarray, valores: np.ndarray,
+                        inicio: np.datetime64, passo_ms: int, n_intervalos: int) -> np.ndarray:
+    """
+    Média dos valores em cada intervalo da grade (NaN onde não há leitura).
+
+    Uma passada com bincount: leituras fora da grade e valores ausentes são
+    descartados antes da contagem.
+    """
+    deslocamento = (timestamps.astype('datetime64[ms]') - np.datetime64(inicio, 'ms')).astype(np.int64)
+    indices = deslocamento // passo_ms
+    validos = (deslocamento >= 0) & (indices < n_intervalos) & ~np.isnan(valores)
+    indices = indices[validos]
+
+    contagem = np.bincount(indices, minlength=n_intervalos)
+    soma = np.bincount(indices, weights=valores[validos], minlength=n_intervalos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(contagem > 0, soma / np.maximum(contagem, 1), np.nan)
+
+
+def preencher_adiante(matriz: np.ndarray, limite: int = None) -> np.ndarray:
+    """
+    Repete o último valor conhecido de cada coluna nas linhas vazias (NaN).
+
+    Com limite, só preenche até `limite` linhas depois do último valor real;
+    lacunas maiores continuam vazias.
+    """
+    if matriz.size == 0:
+        return matriz
+    linhas = np.arange(matriz.shape[0])[:, None]
+    ultimo = np.where(~np.isnan(matriz), linhas, 0)
+    np.maximum.accumulate(ultimo, axis=0, out=ultimo)
+    preenchida = np.take_along_axis(matriz, ultimo, axis=0)
+    if limite is not None:
+        preenchida[(linhas - ultimo) > limite] = np.nan
+    return preenchida
@@ -0,0 +1,153 @@
+"""
+Cache em disco de respostas HTTP (JSON) com validade, revalidação e limite de tamanho
+
+Cada entrada é um arquivo <sha256 da chave>.json com o corpo da resposta e
+os validadores (ETag e Last-Modified) devolvidos pelo servidor. Dentro da
+validade a entrada é usada sem consultar o servidor; depois dela o cliente
+pode revalidar com If-None-Match / If-Modified-Since e, se a resposta for
+304, renovar a entrada. O horário de modificação do arquivo marca o último
+acesso: quando o diretório passa de max_bytes, as entradas menos usadas
+recentemente são removidas primeiro.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Validade padrão de uma resposta (segundos)
+TTL_PADRAO = 300
+
+# Tamanho máximo padrão do diretório do cache
+MAX_BYTES_PADRAO = 50 * 1024 * 1024
+
+
+class CacheRespostas:
+    """Cache LRU em disco de respostas JSON, seguro entre threads"""
+
+    def __init__(self, diretorio=None, ttl=TTL_PADRAO, max_bytes=MAX_BYTES_PADRAO):
+        self._lock = threading.Lock()
+        self.diretorio = None
+        self._tamanho = None
+        self.configurar(diretorio, ttl, max_bytes)
+
+    def configurar(self, diretorio, ttl=TTL_PADRAO, max_bytes=MAX_BYTES_PADRAO):
+        with self._lock:
+            if diretorio != self.diretorio:
+                self._tamanho = None
+            self.diretorio = diretorio
+            self.ttl = ttl
+            self.max_bytes = max_bytes
+
+    @property
+    def ativo(self):
+        return bool(self.diretorio) and self.max_bytes > 0
+
+    @staticmethod
+    def chave(*partes):
+        """Chave estável a partir de valores JSON (parâmetros em qualquer ordem)"""
+        texto = json.dumps(partes, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f'{chave}.json')
+
+    def obter(self, chave):
+        """Entrada gravada para a chave (fresca ou não), ou None"""
+        if not self.ativo:
+            return None
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                entrada = json.load(arquivo)
+            os.utime(caminho)
+        except (OSError, ValueError):
+            return None
+        return entrada
+
+    def fresca(self, entrada):
+        return time.time() - entrada.get('armazenado_em', 0) < self.ttl
+
+    def gravar(self, chave, corpo, etag=None, last_modified=None):
+        """Grava (ou substitui) a entrada e remove as menos usadas se passar do limite"""
+        if not self.ativo:
+            return
+        self._escrever(chave, {
+            'corpo': corpo,
+            'etag': etag,
+            'last_modified': last_modified,
+            'armazenado_em': time.time(),
+        })
+
+    def renovar(self, chave, entrada):
+        """Servidor confirmou a entrada (304): vale por mais um ttl"""
+        if self.ativo:
+            self._escrever(chave, dict(entrada, armazenado_em=time.time()))
+
+    def _escrever(self, chave, entrada):
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(chave)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                json.dump(entrada, arquivo, ensure_ascii=False, separators=(',', ':'))
+            novo = os.path.getsize(temporario)
+            with self._lock:
+                anterior = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+                os.replace(temporario, caminho)
+                if self._tamanho is not None:
+                    self._tamanho += novo - anterior
+                self._evictar()
+        except OSError as e:
+            print(f"⚠️  Erro ao gravar no cache de respostas: {e}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def _entradas(self):
+        """(último acesso, tamanho, caminho) de cada entrada, da mais antiga para a mais nova"""
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith('.json'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                estado = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((estado.st_mtime, estado.st_size, caminho))
+        return sorted(entradas)
+
+    def _evictar(self):
+        # Chamado com o lock; o diretório só é listado quando o limite estoura
+        if self._tamanho is not None and self._tamanho <= self.max_bytes:
+            return
+        entradas = self._entradas()
+        self._tamanho = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in entradas:
+            if self._tamanho <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+                self._tamanho -= tamanho
+            except OSError:
+                continue
+
+    def tamanho(self):
+        with self._lock:
+            if not self.ativo or not os.path.isdir(self.diretorio):
+                return 0
+            self._tamanho = sum(tamanho for _, tamanho, _ in self._entradas())
+            return self._tamanho
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            if self.diretorio and os.path.isdir(self.diretorio):
+                for _, _, caminho in self._entradas():
+                    try:
+                        os.remove(caminho)
+                    except OSError:
+                        pass
+            self._tamanho = 0 if self.diretorio else None
@@ -0,0 +1,73 @@
+"""
+Calibração de densímetros de inclinação (iSpindel)
+
+A gravidade é um polinômio do ângulo de inclinação, com os coeficientes do
+maior para o menor grau (mesma ordem da fórmula exibida pela planilha de
+calibração do iSpindel):
+
+    gravidade = c0 * angulo^n + c1 * angulo^(n-1) + ... + cn
+
+Os parâmetros ficam em Dispositivo.parametros_calibracao:
+
+    {"polinomio": [0.000000887, -0.0000987, 0.00527, 0.8924], "unidade": "sg"}
+
+"unidade" indica a escala do resultado do polinômio ("sg" ou "plato");
+a saída é sempre em gravidade específica.
+"""
+
+import numpy as np
+
+UNIDADE_SG = 'sg'
+UNIDADE_PLATO = 'plato'
+UNIDADES = (UNIDADE_SG, UNIDADE_PLATO)
+
+
+def plato_para_sg(plato):
+    """Graus Plato em gravidade específica (aproximação usual de brewing)"""
+    plato = np.asarray(plato, dtype=float)
+    return 1.0 + plato / (258.6 - (plato / 258.2) * 227.1)
+
+
+def validar_parametros(parametros):
+    """Retorna uma mensagem de erro ou None se os parâmetros forem válidos"""
+    if not isinstance(parametros, dict):
+        return 'Parâmetros de calibração devem ser um objeto'
+    coeficientes = parametros.get('polinomio')
+    if not isinstance(coeficientes, list) or not coeficientes:
+        return 'Campo polinomio deve ser uma lista de coeficientes'
+    if any(isinstance(c, bool) or not isinstance(c, (int, float)) for c in coeficientes):
+        return 'Coeficientes do polinômio devem ser numéricos'
+    if parametros.get('unidade', UNIDADE_SG) not in UNIDADES:
+        return f"Unidade inválida. Use: {', '.join(UNIDADES)}"
+    return None
+
+
+def possui_polinomio(parametros):
+    return isinstance(parametros, dict) and validar_parametros(parametros) is None
+
+
+def calcular_gravidade(parametros, angulos):
+    """
+    Aplica o polinômio a um ou vários ângulos de uma vez.
+
+    Ângulos NaN resultam em NaN. Retorna escalar para entrada escalar.
+    """
+    angulos = np.asarray(angulos, dtype=float)
+    resultado = np.polyval(np.asarray(parametros['polinomio'], dtype=float), angulos)
+    if parametros.get('unidade', UNIDADE_SG) == UNIDADE_PLATO:
+        resultado = plato_para_sg(resultado)
+    resultado = np.round(resultado, 4)
+    return float(resultado) if resultado.ndim == 0 else resultado
+
+
+def temperatura_celsius(valor, unidade):
+    """Converte a temperatura enviada pelo firmware (C, F ou K) para Celsius"""
+    if valor is None:
+        return None
+    valor = float(valor)
+    unidade = (unidade or 'C').upper()
+    if unidade == 'F':
+        return round((valor - 32.0) * 5.0 / 9.0, 2)
+    if unidade == 'K':
+        return round(valor - 273.15, 2)
+    return valor
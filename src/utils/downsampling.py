@@ -0,0 +1,88 @@
+"""
+Redução de pontos de séries temporais para gráficos (LTTB e envelope min/max)
+"""
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_saida: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: retorna os índices dos pontos escolhidos.
+
+    O primeiro e o último ponto são sempre mantidos; em cada intervalo
+    intermediário fica o ponto que forma o maior triângulo com o ponto
+    escolhido antes e com a média do intervalo seguinte, o que preserva
+    picos e quedas. O laço percorre os intervalos (n_saida), e o trabalho
+    dentro de cada intervalo é vetorizado.
+    """
+    n = len(x)
+    if n_saida >= n or n <= 2:
+        return np.arange(n)
+    if n_saida < 3:
+        return np.array([0, n - 1])
+
+    limites = np.linspace(1, n - 1, n_saida - 1).astype(np.int64)
+    indices = np.empty(n_saida, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(n_saida - 2):
+        inicio, fim = limites[i], limites[i + 1]
+
+        if i == n_saida - 3:
+            media_x, media_y = x[-1], y[-1]
+        else:
+            proximo_fim = limites[i + 2]
+            media_x = x[fim:proximo_fim].mean()
+            media_y = y[fim:proximo_fim].mean()
+
+        area = np.abs(
+            (x[a] - media_x) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (media_y - y[a])
+        )
+        a = inicio + int(np.argmax(area))
+        indices[i + 1] = a
+
+    return indices
+
+
+def envelope_min_max(y: np.ndarray, n_saida: int) -> np.ndarray:
+    """
+    Envelope min/max: divide a série em n_saida/2 intervalos e mantém o
+    mínimo e o máximo de cada um. Totalmente vetorizado.
+    """
+    n = len(y)
+    if n_saida >= n or n <= 2:
+        return np.arange(n)
+
+    intervalos = max(n_saida // 2, 1)
+    tamanho = int(np.ceil(n / intervalos))
+    preenchido = np.full(intervalos * tamanho, np.nan)
+    preenchido[:n] = y
+    blocos = preenchido.reshape(intervalos, tamanho)
+
+    # Blocos finais podem ficar totalmente vazios quando n é pequeno
+    validos = ~np.all(np.isnan(blocos), axis=1)
+    blocos = blocos[validos]
+    base = np.nonzero(validos)[0] * tamanho
+
+    minimos = base + np.nanargmin(blocos, axis=1)
+    maximos = base + np.nanargmax(blocos, axis=1)
+    return np.unique(np.concatenate([[0, n - 1], minimos, maximos]))
+
+
+def reduzir_serie(x: np.ndarray, y: np.ndarray, n_saida: int, modo: str = 'lttb') -> np.ndarray:
+    """Índices (sobre x/y originais) da série reduzida, ignorando valores ausentes (NaN)"""
+    validos = np.nonzero(~np.isnan(y))[0]
+    if len(validos) <= n_saida:
+        return validos
+
+    if modo == 'minmax':
+        selecionados = envelope_min_max(y[validos], n_saida)
+    elif modo == 'lttb':
+        selecionados = lttb(x[validos], y[validos], n_saida)
+    else:
+        raise ValueError(f'Modo de redução inválido: {modo}')
+
+    return validos[selecionados]
@@ -0,0 +1,62 @@
+"""
+Geradores para exportação em streaming (NDJSON, CSV e gzip)
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence
+
+
+def _valor_serializavel(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def gerar_ndjson(linhas: Iterable[Sequence], colunas: Sequence[str], linhas_por_bloco: int = 1000) -> Iterator[str]:
+    """Gera blocos de texto NDJSON (um objeto por linha) a partir de tuplas"""
+    bloco = []
+    for linha in linhas:
+        registro = {coluna: _valor_serializavel(valor) for coluna, valor in zip(colunas, linha)}
+        bloco.append(json.dumps(registro, ensure_ascii=False, separators=(',', ':')))
+        if len(bloco) >= linhas_por_bloco:
+            yield '\n'.join(bloco) + '\n'
+            bloco = []
+    if bloco:
+        yield '\n'.join(bloco) + '\n'
+
+
+def gerar_csv(linhas: Iterable[Sequence], colunas: Sequence[str], linhas_por_bloco: int = 1000) -> Iterator[str]:
+    """Gera blocos de texto CSV (com cabeçalho) a partir de tuplas; dicts/listas viram JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(colunas)
+
+    contador = 0
+    for linha in linhas:
+        writer.writerow([
+            json.dumps(valor, ensure_ascii=False) if isinstance(valor, (dict, list)) else _valor_serializavel(valor)
+            for valor in linha
+        ])
+        contador += 1
+        if contador >= linhas_por_bloco:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            contador = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def comprimir_gzip(blocos: Iterable[str], nivel: int = 6) -> Iterator[bytes]:
+    """Comprime em gzip, bloco a bloco, um gerador de texto"""
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloco in blocos:
+        dados = compressor.compress(bloco.encode('utf-8'))
+        if dados:
+            yield dados
+    yield compressor.flush()
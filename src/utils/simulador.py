@@ -0,0 +1,146 @@
+# utils/simulador.py
+"""
+Dispositivos virtuais com curvas determinísticas de fermentação e brassagem
+
+Cada DispositivoSimulado gera leituras no formato do lote de ingestão
+(timestamp, campos numéricos e dados). Os parâmetros da curva e o ruído
+saem de um random.Random(semente): a mesma semente gera sempre a mesma
+sequência, o que torna os testes de carga repetíveis.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+
+from model.dispositivos import TipoDispositivo
+
+# Início do tempo simulado (fixo para as leituras serem reproduzíveis)
+INICIO_SIMULACAO = datetime(2024, 1, 1, 8, 0, 0)
+
+# Degraus da mostura: (temperatura °C, minutos de rampa, minutos de patamar)
+DEGRAUS_BRASAGEM = ((67.0, 20, 60), (78.0, 10, 10), (100.0, 25, 60))
+TEMPERATURA_INICIAL_BRASAGEM = 20.0
+
+# Ciclo liga/desliga dos controladores de temperatura (minutos)
+CICLO_CONTROLADOR_MINUTOS = 40
+
+TIPOS_FERMENTACAO = (TipoDispositivo.ISPINDEL, TipoDispositivo.CONTROLADOR_TEMPERATURA)
+TIPOS_BRASAGEM = (TipoDispositivo.CONTROLADOR_BRASAGEM, TipoDispositivo.SENSOR_TEMPERATURA, TipoDispositivo.AQUECEDOR)
+TIPOS_ATUADORES = (TipoDispositivo.VALVULA, TipoDispositivo.BOMBA)
+
+
+def temperatura_brasagem(minutos):
+    """Temperatura da mostura pelos degraus de DEGRAUS_BRASAGEM (rampas lineares)"""
+    temperatura = TEMPERATURA_INICIAL_BRASAGEM
+    decorrido = 0.0
+    for alvo, rampa, patamar in DEGRAUS_BRASAGEM:
+        if minutos < decorrido + rampa:
+            return temperatura + (alvo - temperatura) * (minutos - decorrido) / rampa
+        decorrido += rampa
+        temperatura = alvo
+        if minutos < decorrido + patamar:
+            return alvo
+        decorrido += patamar
+    return temperatura
+
+
+def gravidade_fermentacao(horas, original, final, inicio_horas, duracao_horas):
+    """Queda logística da gravidade entre original e final"""
+    meio = inicio_horas + duracao_horas / 2
+    largura = max(duracao_horas / 8, 1e-6)
+    return final + (original - final) / (1 + math.exp((horas - meio) / largura))
+
+
+class DispositivoSimulado:
+    """Dispositivo virtual que gera uma leitura a cada intervalo segundos de tempo simulado"""
+
+    def __init__(self, tipo, semente=0, intervalo=60, inicio=INICIO_SIMULACAO, dispositivo_id=None):
+        self.tipo = tipo if isinstance(tipo, TipoDispositivo) else TipoDispositivo(tipo)
+        self.intervalo = intervalo
+        self.inicio = inicio
+        self.dispositivo_id = dispositivo_id
+        self.indice = 0
+        self._rng = random.Random(semente)
+
+        rng = self._rng
+        self.gravidade_original = round(rng.uniform(1.040, 1.070), 3)
+        self.gravidade_final = round(1.0 + (self.gravidade_original - 1.0) * (1 - rng.uniform(0.70, 0.82)), 3)
+        self.temperatura_alvo = rng.choice((12.0, 18.0, 19.0, 20.0))
+        self.atraso_horas = rng.uniform(6, 18)
+        self.duracao_horas = rng.uniform(72, 144)
+        self.bateria = rng.uniform(3.95, 4.20)
+        self.sinal = rng.uniform(-80, -55)
+        self.fase = rng.uniform(0, CICLO_CONTROLADOR_MINUTOS)
+
+    def _ruido(self, desvio):
+        return self._rng.gauss(0, desvio)
+
+    def _fermentacao(self, horas, leitura):
+        gravidade = gravidade_fermentacao(
+            horas, self.gravidade_original, self.gravidade_final, self.atraso_horas, self.duracao_horas
+        )
+        # Calor da fermentação ativa, compensado só em parte pelo controle
+        pico = (self.atraso_horas + self.duracao_horas / 3 - horas) / (self.duracao_horas / 4)
+        temperatura = self.temperatura_alvo + 1.2 * math.exp(-pico * pico) + self._ruido(0.08)
+
+        if self.tipo == TipoDispositivo.ISPINDEL:
+            leitura['gravidade'] = round(gravidade + self._ruido(0.0004), 4)
+            leitura['temperatura'] = round(temperatura, 2)
+            leitura['bateria'] = round(self.bateria - 0.004 * horas / 24, 3)
+            leitura['qualidade_sinal'] = round(self.sinal + self._ruido(2))
+            leitura['dados']['angle'] = round(25 + (gravidade - 1.0) * 800 + self._ruido(0.2), 2)
+        else:
+            minutos = horas * 60 + self.fase
+            ligado = (minutos % CICLO_CONTROLADOR_MINUTOS) < CICLO_CONTROLADOR_MINUTOS / 2
+            # Histerese: oscila ±0,3 °C em torno do alvo
+            leitura['temperatura'] = round(temperatura + (-0.3 if ligado else 0.3), 2)
+            leitura['dados']['setpoint'] = self.temperatura_alvo
+            leitura['dados']['resfriando'] = ligado
+
+    def _brasagem(self, horas, leitura):
+        minutos = horas * 60
+        leitura['temperatura'] = round(temperatura_brasagem(minutos) + self._ruido(0.2), 2)
+        if self.tipo == TipoDispositivo.AQUECEDOR:
+            rampa = temperatura_brasagem(minutos + 1) > temperatura_brasagem(minutos)
+            leitura['dados']['potencia'] = 100 if rampa else round(30 + self._ruido(5))
+        elif self.tipo == TipoDispositivo.CONTROLADOR_BRASAGEM:
+            leitura['pressao'] = round(1.0 + self._ruido(0.01), 3)
+
+    def _atuador(self, horas, leitura):
+        ciclo = int(horas * 60 + self.fase) // CICLO_CONTROLADOR_MINUTOS
+        leitura['dados']['estado'] = 'ligado' if ciclo % 2 == 0 else 'desligado'
+        if self.tipo == TipoDispositivo.BOMBA:
+            leitura['dados']['vazao'] = round(12 + self._ruido(0.5), 2) if ciclo % 2 == 0 else 0.0
+
+    def proxima(self):
+        """Gera a próxima leitura (dict no formato do lote de ingestão)"""
+        timestamp = self.inicio + timedelta(seconds=self.indice * self.intervalo)
+        horas = self.indice * self.intervalo / 3600.0
+        self.indice += 1
+
+        leitura = {'timestamp': timestamp, 'dados': {'simulado': True}}
+        if self.dispositivo_id is not None:
+            leitura['dispositivo_id'] = self.dispositivo_id
+
+        if self.tipo in TIPOS_FERMENTACAO:
+            self._fermentacao(horas, leitura)
+        elif self.tipo in TIPOS_BRASAGEM:
+            self._brasagem(horas, leitura)
+        elif self.tipo in TIPOS_ATUADORES:
+            self._atuador(horas, leitura)
+        else:
+            # Temperatura ambiente com ciclo diário
+            leitura['temperatura'] = round(22 + 3 * math.sin(2 * math.pi * horas / 24) + self._ruido(0.1), 2)
+        return leitura
+
+    def leituras(self, quantidade):
+        return [self.proxima() for _ in range(quantidade)]
+
+
+def criar_frota(por_tipo, semente=0, intervalo=60, tipos=None):
+    """Cria por_tipo dispositivos simulados de cada TipoDispositivo, com sementes derivadas de semente"""
+    frota = []
+    for tipo in tipos or list(TipoDispositivo):
+        for i in range(por_tipo):
+            frota.append(DispositivoSimulado(tipo, semente=f'{semente}:{tipo.value}:{i}', intervalo=intervalo))
+    return frota
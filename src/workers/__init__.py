@@ -0,0 +1,9 @@
+# Worker's
+import os
+
+
+def app_worker():
+    """App Flask de main.py sem as threads de fundo do processo web (write-behind e heartbeat)"""
+    os.environ['BREWSTATION_PROCESSO'] = 'worker'
+    from main import app
+    return app
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Verificação periódica das regras de alerta de ausência de dados
+
+As demais regras (limite, taxa de variação, estabilidade) são avaliadas
+durante a ingestão; a ausência de dados precisa de um relógio, então este
+worker compara a última comunicação de cada dispositivo com o timeout
+das regras.
+
+Uso (a partir de src/):
+    python -m workers.alertas              # verifica a cada 60 segundos
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def executar(intervalo=60):
+    """Executa a verificação até ser interrompido"""
+    from workers import app_worker
+    from model.regras_alerta import motor_regras
+    app = app_worker()
+
+    print(f"🚀 Worker de alertas - verificação a cada {intervalo}s")
+    try:
+        while True:
+            with app.app_context():
+                alertas = motor_regras.verificar_ausencias()
+                if alertas:
+                    print(f"🔔 {len(alertas)} alerta(s) de ausência de dados emitidos")
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("Encerrando worker de alertas...")
+
+
+if __name__ == '__main__':
+    executar()
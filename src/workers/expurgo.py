@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Job de exclusão de dispositivos
+
+Processa as exclusões de dispositivos abertas (ExclusaoDispositivo),
+removendo o histórico em blocos com commit. A API já dispara a exclusão em
+uma thread; este job retoma as que ficaram pela metade (processo
+reiniciado ou erro).
+
+Uso (a partir de src/):
+    python -m workers.expurgo              # pendentes, interrompidas e com erro
+    python -m workers.expurgo --pendentes  # só as que ainda não começaram
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def executar(retomar=True):
+    """Processa as exclusões abertas uma vez"""
+    from workers import app_worker
+    from model.exclusao_dispositivos import expurgo_dispositivos
+    app = app_worker()
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        concluidas = expurgo_dispositivos.executar_pendentes(retomar)
+        print(f"✅ Expurgo concluído: {concluidas} dispositivos excluídos em {time.perf_counter() - inicio:.1f}s")
+        return concluidas
+
+
+if __name__ == '__main__':
+    executar(retomar='--pendentes' not in sys.argv)
@@ -0,0 +1,158 @@
+# workers/gravador_lotes.py
+import queue
+import threading
+import time
+
+
+class GravadorLotes:
+    """
+    Fila limitada em memória com uma thread que grava leituras em micro-lotes.
+
+    O lote é gravado quando atinge tamanho_lote ou quando intervalo_flush
+    segundos se passam desde o último flush. Se a fila estiver cheia,
+    enfileirar() bloqueia por até timeout_enfileirar segundos (backpressure
+    para quem produz as leituras) e, depois disso, descarta a leitura;
+    enfileirar_sem_espera() descarta na hora, sem bloquear.
+    """
+
+    def __init__(self, app=None, tamanho_fila=10000, tamanho_lote=500,
+                 intervalo_flush=1.0, timeout_enfileirar=0.5, gravar=None):
+        self.app = app
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.timeout_enfileirar = timeout_enfileirar
+        self._gravar = gravar or self._gravar_no_banco
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._metricas = {
+            'recebidas': 0,
+            'gravadas': 0,
+            'rejeitadas': 0,
+            'descartadas': 0,
+            'esperas_fila_cheia': 0,
+            'lotes': 0,
+            'erros_gravacao': 0,
+            'profundidade_maxima': 0,
+            'ultimo_lote_tamanho': 0,
+            'ultimo_lote_ms': 0.0,
+        }
+
+    def _incrementar(self, chave, valor=1):
+        with self._lock:
+            self._metricas[chave] += valor
+
+    def enfileirar(self, leitura):
+        """Enfileira uma leitura; retorna False se ela foi descartada"""
+        self._incrementar('recebidas')
+        try:
+            self.fila.put_nowait(leitura)
+        except queue.Full:
+            self._incrementar('esperas_fila_cheia')
+            try:
+                self.fila.put(leitura, timeout=self.timeout_enfileirar)
+            except queue.Full:
+                self._incrementar('descartadas')
+                return False
+
+        self._registrar_profundidade()
+        return True
+
+    def enfileirar_sem_espera(self, leitura):
+        """
+        Enfileira sem nunca bloquear; com a fila cheia a leitura é descartada.
+
+        Para laços asyncio (poller, sockets): a espera de enfileirar()
+        travaria o event loop inteiro justamente sob backpressure.
+        """
+        self._incrementar('recebidas')
+        try:
+            self.fila.put_nowait(leitura)
+        except queue.Full:
+            self._incrementar('descartadas')
+            return False
+
+        self._registrar_profundidade()
+        return True
+
+    def _registrar_profundidade(self):
+        profundidade = self.fila.qsize()
+        with self._lock:
+            if profundidade > self._metricas['profundidade_maxima']:
+                self._metricas['profundidade_maxima'] = profundidade
+
+    def iniciar(self):
+        """Inicia a thread de gravação"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name='gravador-lotes', daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=10):
+        """Para a thread depois de gravar o que ainda estiver na fila"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _drenar(self, lote):
+        """Move para o lote o que já estiver disponível na fila, sem bloquear"""
+        while len(lote) < self.tamanho_lote:
+            try:
+                lote.append(self.fila.get_nowait())
+            except queue.Empty:
+                break
+
+    def _loop(self):
+        lote = []
+        prazo = time.monotonic() + self.intervalo_flush
+
+        while not self._parar.is_set() or not self.fila.empty():
+            # Espera limitada para perceber rapidamente o pedido de parada
+            restante = min(prazo - time.monotonic(), 0.25)
+            try:
+                lote.append(self.fila.get(timeout=max(restante, 0.01)))
+                self._drenar(lote)
+            except queue.Empty:
+                pass
+
+            if len(lote) >= self.tamanho_lote or time.monotonic() >= prazo:
+                if lote:
+                    self.flush(lote)
+                    lote = []
+                prazo = time.monotonic() + self.intervalo_flush
+
+        if lote:
+            self.flush(lote)
+
+    def flush(self, lote):
+        """Grava um lote e atualiza as métricas"""
+        inicio = time.perf_counter()
+        try:
+            resultado = self._gravar(lote)
+            self._incrementar('gravadas', resultado.get('aceitos', 0))
+            self._incrementar('rejeitadas', resultado.get('rejeitados', 0))
+        except Exception as e:
+            print(f"❌ Erro ao gravar lote de {len(lote)} leituras: {e}")
+            self._incrementar('erros_gravacao')
+            self._incrementar('rejeitadas', len(lote))
+
+        with self._lock:
+            self._metricas['lotes'] += 1
+            self._metricas['ultimo_lote_tamanho'] = len(lote)
+            self._metricas['ultimo_lote_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+
+    def _gravar_no_banco(self, lote):
+        from model.ingestao import IngestaoService
+
+        with self.app.app_context():
+            return IngestaoService.ingerir_lote(lote)
+
+    def metricas(self):
+        """Retorna uma cópia das métricas, incluindo a profundidade atual da fila"""
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas['profundidade_fila'] = self.fila.qsize()
+        metricas['capacidade_fila'] = self.fila.maxsize
+        return metricas
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Worker de ingestão MQTT
+
+Assina os tópicos configurados em Dispositivo.topico_mqtt, decodifica os
+payloads e grava as leituras em HistoricoDispositivo em micro-lotes.
+
+Uso (a partir de src/):
+    python -m workers.mqtt_ingestao
+
+Requer o pacote paho-mqtt.
+"""
+
+import json
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workers.gravador_lotes import GravadorLotes
+
+
+def topico_corresponde(filtro, topico):
+    """Verifica se um tópico corresponde a um filtro MQTT (com + e #)"""
+    niveis_filtro = filtro.split('/')
+    niveis_topico = topico.split('/')
+
+    for i, nivel in enumerate(niveis_filtro):
+        if nivel == '#':
+            return True
+        if i >= len(niveis_topico):
+            return False
+        if nivel != '+' and nivel != niveis_topico[i]:
+            return False
+
+    return len(niveis_filtro) == len(niveis_topico)
+
+
+class MapaTopicos:
+    """Mapeia tópicos MQTT para ids de dispositivos"""
+
+    def __init__(self):
+        self._exatos = {}
+        self._curingas = []
+
+    def carregar(self, pares):
+        """Carrega pares (dispositivo_id, topico_mqtt)"""
+        self._exatos = {}
+        self._curingas = []
+        for dispositivo_id, topico in pares:
+            if not topico:
+                continue
+            if '+' in topico or '#' in topico:
+                self._curingas.append((topico, dispositivo_id))
+            else:
+                self._exatos[topico] = dispositivo_id
+
+    def carregar_do_banco(self):
+        """Carrega os dispositivos MQTT cadastrados (requer app context)"""
+        from model.dispositivos import Dispositivo, ProtocoloComunicacao
+
+        dispositivos = Dispositivo.query.filter(
+            Dispositivo.protocolo == ProtocoloComunicacao.MQTT,
+            Dispositivo.topico_mqtt.isnot(None),
+            Dispositivo.nao_excluido()
+        ).with_entities(Dispositivo.id, Dispositivo.topico_mqtt).all()
+        self.carregar(dispositivos)
+
+    def assinaturas(self):
+        """Filtros a assinar no broker; tópicos exatos também assinam seus subtópicos"""
+        filtros = set(filtro for filtro, _ in self._curingas)
+        for topico in self._exatos:
+            filtros.add(topico)
+            filtros.add(f'{topico}/#')
+        return sorted(filtros)
+
+    def resolver(self, topico):
+        """
+        Retorna (dispositivo_id, campo) para um tópico recebido.
+
+        Firmwares como o iSpindel publicam cada valor em um subtópico
+        (ex.: ispindel/iSpindel01/temperature); nesse caso o último nível
+        é retornado como nome do campo.
+        """
+        if topico in self._exatos:
+            return self._exatos[topico], None
+
+        for filtro, dispositivo_id in self._curingas:
+            if topico_corresponde(filtro, topico):
+                return dispositivo_id, None
+
+        pai, _, campo = topico.rpartition('/')
+        if pai in self._exatos:
+            return self._exatos[pai], campo
+
+        return None, None
+
+
+def decodificar_payload(payload, campo=None):
+    """Decodifica um payload MQTT (JSON ou valor simples) em um dicionário de dados"""
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode('utf-8')
+
+    try:
+        valor = json.loads(payload)
+    except (TypeError, ValueError):
+        valor = payload.strip()
+
+    if isinstance(valor, dict):
+        return valor
+    return {campo or 'valor': valor}
+
+
+class IngestorMQTT:
+    """Recebe mensagens MQTT, resolve o dispositivo e enfileira a leitura"""
+
+    def __init__(self, gravador, mapa=None):
+        self.gravador = gravador
+        self.mapa = mapa or MapaTopicos()
+        self.mensagens = 0
+        self.sem_dispositivo = 0
+        self.payload_invalido = 0
+
+    def processar_mensagem(self, topico, payload):
+        """Callback de mensagem; retorna True se a leitura foi enfileirada"""
+        from model.ingestao import extrair_leitura
+
+        self.mensagens += 1
+        dispositivo_id, campo = self.mapa.resolver(topico)
+        if dispositivo_id is None:
+            self.sem_dispositivo += 1
+            return False
+
+        try:
+            dados = decodificar_payload(payload, campo)
+        except UnicodeDecodeError:
+            self.payload_invalido += 1
+            return False
+
+        return self.gravador.enfileirar(extrair_leitura(dados, dispositivo_id))
+
+    def metricas(self):
+        metricas = self.gravador.metricas()
+        metricas.update({
+            'mensagens': self.mensagens,
+            'sem_dispositivo': self.sem_dispositivo,
+            'payload_invalido': self.payload_invalido,
+        })
+        return metricas
+
+
+def criar_cliente_paho(ingestor, usuario=None, senha=None):
+    """Cria um cliente paho-mqtt ligado ao ingestor"""
+    try:
+        import paho.mqtt.client as mqtt
+    except ImportError:
+        raise RuntimeError("paho-mqtt não instalado. Execute: pip install paho-mqtt")
+
+    cliente = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id='brewstation-ingestao')
+    if usuario:
+        cliente.username_pw_set(usuario, senha or None)
+
+    def on_connect(client, userdata, flags, reason_code, properties=None):
+        print(f"✅ Conectado ao broker MQTT ({reason_code})")
+        for filtro in ingestor.mapa.assinaturas():
+            client.subscribe(filtro)
+
+    def on_message(client, userdata, msg):
+        ingestor.processar_mensagem(msg.topic, msg.payload)
+
+    cliente.on_connect = on_connect
+    cliente.on_message = on_message
+    return cliente
+
+
+def executar(intervalo_recarga=60):
+    """Executa o worker até ser interrompido"""
+    from workers import app_worker
+    from model.config import Configuracao
+    app = app_worker()
+
+    with app.app_context():
+        host = Configuracao.get_config('MQTT_BROKER_URL', 'localhost')
+        porta = int(Configuracao.get_config('MQTT_BROKER_PORT', 1883))
+        usuario = Configuracao.get_config('MQTT_USERNAME')
+        senha = Configuracao.get_config('MQTT_PASSWORD')
+        gravador = GravadorLotes(
+            app,
+            tamanho_fila=int(Configuracao.get_config('INGESTAO_TAMANHO_FILA', 10000)),
+            tamanho_lote=int(Configuracao.get_config('INGESTAO_TAMANHO_LOTE', 500)),
+            intervalo_flush=float(Configuracao.get_config('INGESTAO_INTERVALO_FLUSH', 1.0))
+        )
+        ingestor = IngestorMQTT(gravador)
+        ingestor.mapa.carregar_do_banco()
+
+    cliente = criar_cliente_paho(ingestor, usuario, senha)
+    gravador.iniciar()
+    cliente.connect(host, porta)
+    cliente.loop_start()
+    print(f"🚀 Worker MQTT em {host}:{porta} - {len(ingestor.mapa.assinaturas())} assinaturas")
+
+    try:
+        while True:
+            time.sleep(intervalo_recarga)
+            with app.app_context():
+                assinaturas_antigas = set(ingestor.mapa.assinaturas())
+                ingestor.mapa.carregar_do_banco()
+            for filtro in set(ingestor.mapa.assinaturas()) - assinaturas_antigas:
+                cliente.subscribe(filtro)
+            print(f"📊 Ingestão MQTT: {ingestor.metricas()}")
+    except KeyboardInterrupt:
+        print("Encerrando worker MQTT...")
+    finally:
+        cliente.loop_stop()
+        cliente.disconnect()
+        gravador.parar()
+
+
+if __name__ == '__main__':
+    executar()
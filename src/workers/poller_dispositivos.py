@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Worker de consulta (polling) de dispositivos HTTP e TCP
+
+Dispositivos que precisam ser consultados (controladores HTTP, sensores
+TCP) são agendados em um heap pelo próprio intervalo_atualizacao, com
+jitter. Um semáforo limita as consultas simultâneas e cada consulta
+respeita DISPOSITIVO_TIMEOUT e DISPOSITIVO_RETRY_ATTEMPTS. As leituras vão
+para o GravadorLotes, então centenas de dispositivos cabem em um processo.
+
+Uso (a partir de src/):
+    python -m workers.poller_dispositivos
+
+Dispositivos com configuracao {"polling": false} (ou iSpindel, que envia
+os dados por conta própria) não são consultados. Opções em configuracao:
+caminho (HTTP, padrão "/"), comando (TCP, padrão "READ\\n"), timeout.
+"""
+
+import asyncio
+import base64
+import heapq
+import itertools
+import random
+import sys
+import os
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workers.gravador_lotes import GravadorLotes
+from workers.mqtt_ingestao import decodificar_payload
+
+# Tamanho máximo de resposta aceito de um dispositivo
+MAX_BYTES_RESPOSTA = 64 * 1024
+
+
+class ErroConsulta(Exception):
+    """Falha ao consultar um dispositivo"""
+
+
+def _decodificar_chunked(corpo):
+    partes = []
+    while corpo:
+        tamanho, _, resto = corpo.partition(b'\r\n')
+        tamanho = int(tamanho.split(b';')[0], 16)
+        if tamanho == 0:
+            break
+        partes.append(resto[:tamanho])
+        corpo = resto[tamanho + 2:]
+    return b''.join(partes)
+
+
+async def consultar_http(dispositivo, timeout):
+    """GET HTTP/1.1 simples (Connection: close) sobre asyncio streams"""
+    endereco = dispositivo['endereco']
+    if '://' not in endereco:
+        caminho = (dispositivo['configuracao'] or {}).get('caminho', '/')
+        endereco = f"http://{endereco}:{dispositivo['porta'] or 80}{caminho}"
+    url = urlsplit(endereco)
+    https = url.scheme == 'https'
+    porta = url.port or dispositivo['porta'] or (443 if https else 80)
+    caminho = (url.path or '/') + (f'?{url.query}' if url.query else '')
+
+    cabecalhos = [f'GET {caminho} HTTP/1.1', f'Host: {url.hostname}', 'Accept: application/json', 'Connection: close']
+    if dispositivo['token_acesso']:
+        cabecalhos.append(f"Authorization: Bearer {dispositivo['token_acesso']}")
+    elif dispositivo['usuario']:
+        credenciais = base64.b64encode(f"{dispositivo['usuario']}:{dispositivo['senha'] or ''}".encode()).decode()
+        cabecalhos.append(f'Authorization: Basic {credenciais}')
+
+    async def requisitar():
+        reader, writer = await asyncio.open_connection(url.hostname, porta, ssl=https or None)
+        try:
+            writer.write(('\r\n'.join(cabecalhos) + '\r\n\r\n').encode())
+            await writer.drain()
+            partes, total = [], 0
+            while total < MAX_BYTES_RESPOSTA:
+                bloco = await reader.read(MAX_BYTES_RESPOSTA - total)
+                if not bloco:
+                    break
+                partes.append(bloco)
+                total += len(bloco)
+            return b''.join(partes)
+        finally:
+            writer.close()
+
+    resposta = await asyncio.wait_for(requisitar(), timeout)
+    cabecalho, _, corpo = resposta.partition(b'\r\n\r\n')
+    linhas = cabecalho.decode('latin-1').split('\r\n')
+    partes = linhas[0].split(' ')
+    if len(partes) < 2 or not partes[1].isdigit():
+        raise ErroConsulta('Resposta HTTP inválida')
+    if not 200 <= int(partes[1]) < 300:
+        raise ErroConsulta(f'HTTP {partes[1]}')
+    if any(linha.lower().startswith('transfer-encoding:') and 'chunked' in linha.lower() for linha in linhas[1:]):
+        corpo = _decodificar_chunked(corpo)
+    return decodificar_payload(corpo)
+
+
+async def consultar_tcp(dispositivo, timeout):
+    """Envia o comando configurado e lê uma linha (JSON ou valor simples)"""
+    comando = (dispositivo['configuracao'] or {}).get('comando', 'READ\n')
+
+    async def requisitar():
+        reader, writer = await asyncio.open_connection(dispositivo['endereco'], dispositivo['porta'])
+        try:
+            if comando:
+                writer.write(comando.encode())
+                await writer.drain()
+            return await reader.readline()
+        finally:
+            writer.close()
+
+    linha = await asyncio.wait_for(requisitar(), timeout)
+    if not linha:
+        raise ErroConsulta('Conexão encerrada sem dados')
+    return decodificar_payload(linha)
+
+
+CONSULTAS = {
+    'http': consultar_http,
+    'tcp': consultar_tcp,
+}
+
+
+def snapshot_dispositivo(dispositivo):
+    """Copia os campos usados na consulta (o worker não mantém objetos ORM)"""
+    return {
+        'id': dispositivo.id,
+        'nome': dispositivo.nome,
+        'protocolo': dispositivo.protocolo.value,
+        'endereco': dispositivo.endereco,
+        'porta': dispositivo.porta,
+        'usuario': dispositivo.usuario,
+        'senha': dispositivo.senha,
+        'token_acesso': dispositivo.token_acesso,
+        'configuracao': dispositivo.configuracao or {},
+        'intervalo': max(dispositivo.intervalo_atualizacao or 30, 1),
+    }
+
+
+def dispositivos_consultaveis():
+    """Dispositivos HTTP/TCP que devem ser consultados (requer app context)"""
+    from model.dispositivos import Dispositivo, ProtocoloComunicacao, TipoDispositivo
+
+    dispositivos = Dispositivo.query.filter(
+        Dispositivo.protocolo.in_([ProtocoloComunicacao.HTTP, ProtocoloComunicacao.TCP]),
+        Dispositivo.nao_excluido()
+    ).all()
+    return [
+        snapshot_dispositivo(d) for d in dispositivos
+        if (d.configuracao or {}).get('polling', d.tipo != TipoDispositivo.ISPINDEL)
+    ]
+
+
+class PollerDispositivos:
+    """
+    Agenda e executa as consultas dos dispositivos em um event loop asyncio.
+
+    O heap guarda (próxima execução, sequência, id). O laço dorme até o
+    próximo vencimento, dispara a consulta sem esperá-la (limitada pelo
+    semáforo) e reagenda o dispositivo no intervalo seguinte com jitter.
+    """
+
+    def __init__(self, gravador, limite_concorrencia=50, timeout=30, tentativas=3,
+                 jitter=0.1, consultas=None):
+        self.gravador = gravador
+        self.limite_concorrencia = limite_concorrencia
+        self.timeout = timeout
+        self.tentativas = max(int(tentativas), 1)
+        self.jitter = jitter
+        self.consultas = consultas or CONSULTAS
+        self._dispositivos = {}
+        self._heap = []
+        self._agendados = set()  # ids com entrada no heap
+        self._sequencia = itertools.count()
+        self._em_andamento = set()
+        self._mudou = None
+        self._metricas = {
+            'consultas': 0,
+            'sucessos': 0,
+            'falhas': 0,
+            'tentativas_extras': 0,
+            'atrasos': 0,
+            'em_andamento_max': 0,
+        }
+
+    def _com_jitter(self, intervalo):
+        return intervalo * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def carregar(self, dispositivos, agora=None):
+        """Substitui o conjunto de dispositivos; novos são espalhados no primeiro intervalo"""
+        agora = agora if agora is not None else time.monotonic()
+        novos = {d['id']: d for d in dispositivos}
+        for dispositivo_id, dispositivo in novos.items():
+            if dispositivo_id not in self._agendados:
+                self._agendados.add(dispositivo_id)
+                primeira = agora + random.uniform(0, dispositivo['intervalo'])
+                heapq.heappush(self._heap, (primeira, next(self._sequencia), dispositivo_id))
+        # Removidos saem do heap de forma preguiçosa, quando vencerem
+        self._dispositivos = novos
+        if self._mudou:
+            self._mudou.set()
+
+    async def _consultar(self, dispositivo, semaforo):
+        consulta = self.consultas.get(dispositivo['protocolo'])
+        timeout = dispositivo['configuracao'].get('timeout', self.timeout)
+        async with semaforo:
+            self._em_andamento.add(dispositivo['id'])
+            self._metricas['em_andamento_max'] = max(self._metricas['em_andamento_max'], len(self._em_andamento))
+            try:
+                for tentativa in range(self.tentativas):
+                    self._metricas['consultas'] += 1
+                    try:
+                        dados = await consulta(dispositivo, timeout)
+                        break
+                    except (OSError, asyncio.TimeoutError, ErroConsulta, ValueError) as e:
+                        if tentativa + 1 >= self.tentativas:
+                            self._metricas['falhas'] += 1
+                            print(f"⚠️  Dispositivo {dispositivo['nome']}: {type(e).__name__} {e}")
+                            return False
+                        self._metricas['tentativas_extras'] += 1
+                        await asyncio.sleep(min(0.5 * 2 ** tentativa, timeout))
+            finally:
+                self._em_andamento.discard(dispositivo['id'])
+
+        from model.ingestao import extrair_leitura
+        # Nunca bloqueia o event loop: com a fila cheia a leitura é descartada (métrica do gravador)
+        self.gravador.enfileirar_sem_espera(extrair_leitura(dados, dispositivo['id']))
+        self._metricas['sucessos'] += 1
+        return True
+
+    async def executar(self, parar):
+        """Laço do agendador até o evento parar ser sinalizado"""
+        semaforo = asyncio.Semaphore(self.limite_concorrencia)
+        self._mudou = asyncio.Event()
+        tarefas = set()
+
+        while not parar.is_set():
+            if not self._heap:
+                espera = 1.0
+            else:
+                espera = self._heap[0][0] - time.monotonic()
+
+            if espera > 0:
+                self._mudou.clear()
+                try:
+                    await asyncio.wait_for(self._mudou.wait(), min(espera, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            vencimento, _, dispositivo_id = heapq.heappop(self._heap)
+            dispositivo = self._dispositivos.get(dispositivo_id)
+            if dispositivo is None:
+                self._agendados.discard(dispositivo_id)
+                continue
+
+            if dispositivo_id in self._em_andamento:
+                # A consulta anterior ainda não terminou: pula esta rodada
+                self._metricas['atrasos'] += 1
+            else:
+                tarefa = asyncio.ensure_future(self._consultar(dispositivo, semaforo))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+            proxima = vencimento + self._com_jitter(dispositivo['intervalo'])
+            if proxima < time.monotonic():
+                proxima = time.monotonic() + self._com_jitter(dispositivo['intervalo'])
+            heapq.heappush(self._heap, (proxima, next(self._sequencia), dispositivo_id))
+
+        if tarefas:
+            await asyncio.wait(tarefas, timeout=self.timeout)
+
+    def metricas(self):
+        metricas = dict(self._metricas)
+        metricas['dispositivos'] = len(self._dispositivos)
+        metricas['em_andamento'] = len(self._em_andamento)
+        return metricas
+
+
+def executar(intervalo_recarga=60):
+    """Executa o worker até ser interrompido"""
+    from workers import app_worker
+    from model.config import Configuracao
+    app = app_worker()
+
+    with app.app_context():
+        gravador = GravadorLotes(
+            app,
+            tamanho_fila=int(Configuracao.get_config('INGESTAO_TAMANHO_FILA', 10000)),
+            tamanho_lote=int(Configuracao.get_config('INGESTAO_TAMANHO_LOTE', 500)),
+            intervalo_flush=float(Configuracao.get_config('INGESTAO_INTERVALO_FLUSH', 1.0))
+        )
+        poller = PollerDispositivos(
+            gravador,
+            limite_concorrencia=int(Configuracao.get_config('POLLER_CONCORRENCIA', 50)),
+            timeout=float(Configuracao.get_config('DISPOSITIVO_TIMEOUT', 30)),
+            tentativas=int(Configuracao.get_config('DISPOSITIVO_RETRY_ATTEMPTS', 3))
+        )
+        poller.carregar(dispositivos_consultaveis())
+
+    async def principal():
+        parar = asyncio.Event()
+        tarefa = asyncio.ensure_future(poller.executar(parar))
+        try:
+            while True:
+                await asyncio.sleep(intervalo_recarga)
+                with app.app_context():
+                    poller.carregar(dispositivos_consultaveis())
+                print(f"📊 Polling: {poller.metricas()} | Gravador: {gravador.metricas()}")
+        finally:
+            parar.set()
+            await tarefa
+
+    gravador.iniciar()
+    print(f"🚀 Worker de polling - {poller.metricas()['dispositivos']} dispositivos")
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        print("Encerrando worker de polling...")
+    finally:
+        gravador.parar()
+
+
+if __name__ == '__main__':
+    executar()
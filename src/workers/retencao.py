@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Job de retenção do histórico de dispositivos
+
+Move as leituras mais antigas que a política RETENCAO_HISTORICO_DIAS para
+arquivos .npz compactados (por dispositivo e mês) e as exclui do banco em
+blocos. As consultas de histórico por período continuam lendo esses arquivos.
+
+Uso (a partir de src/):
+    python -m workers.retencao              # executa uma vez (ex.: via cron)
+    python -m workers.retencao --continuo   # repete a cada 24 horas
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def executar(continuo=False, intervalo=24 * 3600):
+    """Executa a retenção uma vez ou continuamente"""
+    from workers import app_worker
+    from model.arquivo_historico import RetencaoService
+    app = app_worker()
+
+    while True:
+        with app.app_context():
+            inicio = time.perf_counter()
+            resultado = RetencaoService.executar()
+            total = sum(resultado.values())
+            print(f"✅ Retenção concluída: {total} leituras arquivadas em {time.perf_counter() - inicio:.1f}s")
+
+        if not continuo:
+            return resultado
+        time.sleep(intervalo)
+
+
+if __name__ == '__main__':
+    executar(continuo='--continuo' in sys.argv)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Worker de ingestão por socket (UDP e TCP)
+
+Recebe leituras de sensores de alta taxa em um formato compacto, resolve
+o dispositivo pelo endereço de origem (Dispositivo.endereco dos
+dispositivos UDP/TCP) e grava em HistoricoDispositivo em micro-lotes.
+
+Formatos aceitos (a mesma sequência de campos nos dois):
+
+    texto:   uma leitura por linha, campos separados por vírgula
+             timestamp,temperatura,gravidade,pressao,qualidade_sinal,bateria
+             campos vazios = ausentes; timestamp vazio ou 0 = agora
+             ex.: ",20.5,1.0480,,-67,4.05\\n"
+
+    binário: cabeçalho <BH (0xB5, quantidade) seguido de `quantidade`
+             registros <d5f (timestamp epoch, temperatura, gravidade,
+             pressao, qualidade_sinal, bateria); NaN = ausente
+
+Em UDP cada datagrama traz um quadro binário ou uma ou mais linhas; em TCP
+os quadros e linhas chegam em sequência no mesmo fluxo.
+
+Uso (a partir de src/):
+    python -m workers.socket_ingestao
+"""
+
+import asyncio
+import math
+import struct
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workers.gravador_lotes import GravadorLotes
+
+MAGICO_BINARIO = 0xB5
+CABECALHO = struct.Struct('<BH')
+REGISTRO = struct.Struct('<d5f')
+CAMPOS_REGISTRO = ('temperatura', 'gravidade', 'pressao', 'qualidade_sinal', 'bateria')
+
+# Buffer de recepção por conexão TCP; quadros ou linhas maiores encerram a conexão
+TAMANHO_BUFFER_TCP = 64 * 1024
+
+# `dados` das leituras por socket: não há payload bruto além dos campos.
+# O mesmo dicionário é compartilhado por todas as leituras (não alterar).
+DADOS_UDP = {'origem': 'udp'}
+DADOS_TCP = {'origem': 'tcp'}
+
+
+def _leitura(dispositivo_id, dados, timestamp, valores):
+    leitura = {'dispositivo_id': dispositivo_id, 'dados': dados}
+    if timestamp and timestamp > 0:
+        leitura['timestamp'] = timestamp
+    for campo, valor in zip(CAMPOS_REGISTRO, valores):
+        if valor is not None and not math.isnan(valor):
+            leitura[campo] = valor
+    return leitura
+
+
+def _linha(buffer, inicio, fim):
+    """Converte uma linha de texto em (timestamp, valores); None se inválida"""
+    partes = bytes(buffer[inicio:fim]).strip().split(b',')
+    if len(partes) != len(CAMPOS_REGISTRO) + 1:
+        return None
+    try:
+        valores = [float(p) if p else None for p in partes]
+    except ValueError:
+        return None
+    return valores[0], valores[1:]
+
+
+def decodificar(buffer, fim, dispositivo_id, dados, emitir, completo=True):
+    """
+    Decodifica os quadros binários e linhas de buffer[0:fim].
+
+    Registros binários são lidos com struct.unpack_from direto no buffer,
+    sem cópias. emitir é chamado com cada leitura. Com completo=False
+    (fluxo TCP) um quadro ou linha incompleto no final fica para a próxima
+    recepção. Retorna (bytes consumidos, leituras inválidas).
+    """
+    posicao = 0
+    invalidas = 0
+    while posicao < fim:
+        if buffer[posicao] == MAGICO_BINARIO:
+            if fim - posicao < CABECALHO.size:
+                break
+            _, quantidade = CABECALHO.unpack_from(buffer, posicao)
+            tamanho = CABECALHO.size + quantidade * REGISTRO.size
+            if fim - posicao < tamanho:
+                if completo:
+                    invalidas += 1
+                    posicao = fim
+                break
+            deslocamento = posicao + CABECALHO.size
+            for _ in range(quantidade):
+                registro = REGISTRO.unpack_from(buffer, deslocamento)
+                emitir(_leitura(dispositivo_id, dados, registro[0], registro[1:]))
+                deslocamento += REGISTRO.size
+            posicao += tamanho
+            continue
+
+        quebra = buffer.find(b'\n', posicao, fim)
+        if quebra < 0:
+            if not completo:
+                break
+            quebra = fim
+        if quebra > posicao:
+            linha = _linha(buffer, posicao, quebra)
+            if linha is None:
+                invalidas += 1
+            else:
+                emitir(_leitura(dispositivo_id, dados, linha[0], linha[1]))
+        posicao = quebra + 1
+
+    return min(posicao, fim), invalidas
+
+
+def codificar_binario(leituras):
+    """Monta um quadro binário a partir de dicts com timestamp e campos (para clientes e testes)"""
+    quadro = bytearray(CABECALHO.size + len(leituras) * REGISTRO.size)
+    CABECALHO.pack_into(quadro, 0, MAGICO_BINARIO, len(leituras))
+    for i, leitura in enumerate(leituras):
+        valores = [leitura.get(campo) for campo in CAMPOS_REGISTRO]
+        REGISTRO.pack_into(
+            quadro, CABECALHO.size + i * REGISTRO.size,
+            leitura.get('timestamp') or 0.0,
+            *[math.nan if v is None else v for v in valores]
+        )
+    return bytes(quadro)
+
+
+class MapaEnderecos:
+    """Mapeia endereços de origem (IP) para ids de dispositivos UDP/TCP"""
+
+    def __init__(self):
+        self._enderecos = {}
+
+    def carregar(self, pares):
+        """Carrega pares (dispositivo_id, endereco); aceita endereco com ou sem porta"""
+        self._enderecos = {}
+        for dispositivo_id, endereco in pares:
+            if not endereco:
+                continue
+            host = endereco.strip()
+            # host:porta (IPv6 sem colchetes tem vários ':' e fica como está)
+            if host.count(':') == 1:
+                host = host.split(':')[0]
+            self._enderecos.setdefault(host, dispositivo_id)
+
+    def carregar_do_banco(self):
+        """Carrega os dispositivos UDP/TCP cadastrados (requer app context)"""
+        from model.dispositivos import Dispositivo, ProtocoloComunicacao
+
+        dispositivos = Dispositivo.query.filter(
+            Dispositivo.protocolo.in_([ProtocoloComunicacao.UDP, ProtocoloComunicacao.TCP]),
+            Dispositivo.nao_excluido()
+        ).with_entities(Dispositivo.id, Dispositivo.endereco).all()
+        self.carregar(dispositivos)
+
+    def resolver(self, host):
+        return self._enderecos.get(host)
+
+    def __len__(self):
+        return len(self._enderecos)
+
+
+class _ProtocoloUDP(asyncio.DatagramProtocol):
+
+    def __init__(self, ingestor):
+        self.ingestor = ingestor
+
+    def datagram_received(self, data, addr):
+        self.ingestor.processar(data, len(data), addr[0], DADOS_UDP)
+
+
+class _ProtocoloTCP(asyncio.BufferedProtocol):
+    """Recebe direto em um buffer pré-alocado e decodifica os quadros completos"""
+
+    def __init__(self, ingestor):
+        self.ingestor = ingestor
+        self._buffer = bytearray(TAMANHO_BUFFER_TCP)
+        self._visao = memoryview(self._buffer)
+        self._fim = 0
+        self._host = None
+        self._transporte = None
+
+    def connection_made(self, transport):
+        self._transporte = transport
+        self._host = transport.get_extra_info('peername')[0]
+
+    def get_buffer(self, sizehint):
+        return self._visao[self._fim:]
+
+    def buffer_updated(self, nbytes):
+        self._fim += nbytes
+        consumidos = self.ingestor.processar(self._buffer, self._fim, self._host, DADOS_TCP, completo=False)
+        if consumidos is None:
+            self._transporte.close()
+            return
+        restante = self._fim - consumidos
+        if consumidos and restante:
+            self._buffer[:restante] = self._buffer[consumidos:self._fim]
+        self._fim = restante
+        if self._fim >= len(self._buffer):
+            # Quadro ou linha maior que o buffer
+            self.ingestor.invalidas += 1
+            self._transporte.close()
+
+
+class IngestorSocket:
+    """Servidores UDP e TCP que decodificam as leituras e alimentam o gravador em lote"""
+
+    def __init__(self, gravador, mapa=None):
+        self.gravador = gravador
+        self.mapa = mapa or MapaEnderecos()
+        self.pacotes = 0
+        self.bytes = 0
+        self.leituras = 0
+        self.sem_dispositivo = 0
+        self.invalidas = 0
+
+    def _emitir(self, leitura):
+        self.leituras += 1
+        # Chamado dentro do event loop: com a fila cheia descarta em vez de esperar
+        self.gravador.enfileirar_sem_espera(leitura)
+
+    def processar(self, buffer, fim, host, dados, completo=True):
+        """Decodifica buffer[0:fim] recebido de host; retorna os bytes consumidos (None = origem desconhecida)"""
+        self.pacotes += 1
+        self.bytes += fim
+        dispositivo_id = self.mapa.resolver(host)
+        if dispositivo_id is None:
+            self.sem_dispositivo += 1
+            return None
+        consumidos, invalidas = decodificar(buffer, fim, dispositivo_id, dados, self._emitir, completo)
+        self.invalidas += invalidas
+        return consumidos
+
+    async def iniciar(self, host='0.0.0.0', porta_udp=None, porta_tcp=None):
+        """Abre os servidores das portas informadas; retorna (transporte_udp, servidor_tcp)"""
+        loop = asyncio.get_running_loop()
+        transporte = servidor = None
+        if porta_udp is not None:
+            transporte, _ = await loop.create_datagram_endpoint(
+                lambda: _ProtocoloUDP(self), local_addr=(host, porta_udp)
+            )
+        if porta_tcp is not None:
+            servidor = await loop.create_server(lambda: _ProtocoloTCP(self), host, porta_tcp)
+        return transporte, servidor
+
+    def metricas(self):
+        metricas = self.gravador.metricas()
+        metricas.update({
+            'pacotes': self.pacotes,
+            'bytes': self.bytes,
+            'leituras': self.leituras,
+            'sem_dispositivo': self.sem_dispositivo,
+            'invalidas': self.invalidas,
+        })
+        return metricas
+
+
+def executar(intervalo_recarga=60):
+    """Executa o worker até ser interrompido"""
+    from workers import app_worker
+    from model.config import Configuracao
+    app = app_worker()
+
+    with app.app_context():
+        host = Configuracao.get_config('SOCKET_INGESTAO_HOST', '0.0.0.0')
+        porta_udp = int(Configuracao.get_config('SOCKET_INGESTAO_PORTA_UDP', 5514))
+        porta_tcp = int(Configuracao.get_config('SOCKET_INGESTAO_PORTA_TCP', 5515))
+        gravador = GravadorLotes(
+            app,
+            tamanho_fila=int(Configuracao.get_config('INGESTAO_TAMANHO_FILA', 10000)),
+            tamanho_lote=int(Configuracao.get_config('INGESTAO_TAMANHO_LOTE', 500)),
+            intervalo_flush=float(Configuracao.get_config('INGESTAO_INTERVALO_FLUSH', 1.0))
+        )
+        ingestor = IngestorSocket(gravador)
+        ingestor.mapa.carregar_do_banco()
+
+    async def principal():
+        transporte, servidor = await ingestor.iniciar(host, porta_udp or None, porta_tcp or None)
+        print(f"🚀 Worker de socket em {host} (UDP {porta_udp}, TCP {porta_tcp}) - {len(ingestor.mapa)} dispositivos")
+        try:
+            while True:
+                await asyncio.sleep(intervalo_recarga)
+                with app.app_context():
+                    ingestor.mapa.carregar_do_banco()
+                print(f"📊 Ingestão por socket: {ingestor.metricas()}")
+        finally:
+            if transporte:
+                transporte.close()
+            if servidor:
+                servidor.close()
+                await servidor.wait_closed()
+
+    gravador.iniciar()
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        print("Encerrando worker de socket...")
+    finally:
+        gravador.parar()
+
+
+if __name__ == '__main__':
+    executar()